@@ -1,11 +1,19 @@
 """API routes for home camera integration - 간단 버전 (Gemini 분석만)"""
 
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query
+import asyncio
+import os
+import shutil
+import tempfile
 import time  # 시간 측정을 위한 import 추가
 from sqlalchemy.orm import Session
 
 from app.services.gemini_service import GeminiService, get_gemini_service
+from app.services.analysis_cache import get_analysis_cache
 from app.services.analysis_service import AnalysisService
+from app.services.gemini_client import get_gemini_client
+from app.services.stage_cache import get_stage_cache
+from app.services.video_preprocessing import get_video_preprocessor
 from app.database import get_db
 from app.utils.auth_utils import get_current_user_id
 
@@ -51,6 +59,7 @@ async def analyze_video(
             detail="발달 단계는 '1', '2', '3', '4', '5', '6' 중 하나여야 합니다."
         )
     
+    upload_path = None
     try:
         print("[VLM 비디오 분석 시작]")
         start_time = time.time()  # 분석 시작 시간 기록
@@ -60,12 +69,12 @@ async def analyze_video(
         else:
             print("[발달 단계] 자동 판단 모드")
 
-        # 비디오 내용 읽기
-        video_content = await video.read()
+        # 업로드를 메모리에 통째로 읽지 않고 임시 파일로 복사 (전처리가 경로에서 직접 읽음)
+        upload_path = await asyncio.to_thread(_save_upload_to_temp, video)
         
-        # Gemini 서비스를 통해 분석 (video_file 대신 video_content 전달)
+        # Gemini 서비스를 통해 분석 (업로드 임시 파일 경로 전달)
         result = await gemini_service.analyze_video_vlm(
-            video_bytes=video_content,
+            video_path=upload_path,
             content_type=video.content_type or "video/mp4",
             stage=stage,
             age_months=age_months,
@@ -73,12 +82,19 @@ async def analyze_video(
                 "temperature": temperature,
                 "top_k": top_k,
                 "top_p": top_p
-            }
+            },
+            stage_cache_key=f"user:{user_id}",
         )
         
         end_time = time.time()  # 분석 종료 시간 기록
         analysis_time = end_time - start_time
         print(f"[VLM 비디오 분석 완료] 총 소요 시간: {analysis_time:.2f}초")
+        preprocess = result.get("_preprocess") or {}
+        if preprocess:
+            print(
+                f"  전처리 대기: {preprocess.get('queue_wait_seconds')}초, "
+                f"전처리 처리: {preprocess.get('processing_seconds')}초"
+            )
         
         # 데이터베이스에 저장 (save_to_db가 True인 경우)
         if save_to_db:
@@ -120,3 +136,64 @@ async def analyze_video(
             status_code=500,
             detail=f"비디오 분석 중 오류가 발생했습니다: {error_msg}"
         )
+    finally:
+        if upload_path and os.path.exists(upload_path):
+            os.remove(upload_path)
+
+
+def _save_upload_to_temp(video: UploadFile) -> str:
+    """업로드 파일을 블록 단위로 임시 파일에 복사하고 경로 반환"""
+    suffix = os.path.splitext(video.filename or "")[1] or ".mp4"
+    fd, path = tempfile.mkstemp(prefix="dailycam_upload_", suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        video.file.seek(0)
+        shutil.copyfileobj(video.file, f, 1024 * 1024)
+    return path
+
+
+@router.get("/preprocess-stats")
+async def get_preprocess_stats() -> dict:
+    """비디오 전처리 프로세스 풀 상태 (대기/처리 시간 통계)"""
+    return get_video_preprocessor().get_stats()
+
+
+@router.get("/gemini-stats")
+async def get_gemini_stats() -> dict:
+    """Gemini 호출 대기열 상태 (우선순위별 대기 수, 속도 제한, 429 재시도)"""
+    return get_gemini_client().get_stats()
+
+
+@router.get("/analysis-cache-stats")
+async def get_analysis_cache_stats() -> dict:
+    """분석 결과 캐시 상태 (적중/미스, 크기, 삭제 수)"""
+    return get_analysis_cache().get_stats()
+
+
+@router.get("/stage-cache-stats")
+async def get_stage_cache_stats() -> dict:
+    """발달 단계 캐시 상태 (2단계 판단 생략 수, 재검증 사유)"""
+    return get_stage_cache().get_stats()
+
+
+@router.get("/speculation-stats")
+async def get_speculation_stats(
+    gemini_service: GeminiService = Depends(get_gemini_service),
+) -> dict:
+    """2단계/3단계 추측 실행 통계 (적중률, 단축 시간)"""
+    return gemini_service.get_speculation_stats()
+
+
+@router.get("/parse-stats")
+async def get_parse_stats(
+    gemini_service: GeminiService = Depends(get_gemini_service),
+) -> dict:
+    """단계별 JSON 응답 검증 실패/수리 통계"""
+    return gemini_service.get_parse_stats()
+
+
+@router.get("/video-upload-stats")
+async def get_video_upload_stats(
+    gemini_service: GeminiService = Depends(get_gemini_service),
+) -> dict:
+    """1단계 영상 전달 방식(인라인/File API) 횟수와 File API 업로드/재사용/삭제 통계"""
+    return gemini_service.get_video_part_stats()
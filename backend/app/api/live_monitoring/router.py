@@ -1,11 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, Query, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Query, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse, Response, FileResponse
 from pathlib import Path
 from datetime import datetime, timedelta
 import asyncio
 import cv2
 import numpy as np
-from typing import Dict
+from typing import Dict, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 
@@ -13,6 +13,12 @@ from app.database.session import get_db
 from app.models.live_monitoring.models import RealtimeEvent, HourlyAnalysis, SegmentAnalysis, DailyReport
 from app.services.live_monitoring.fake_stream_generator import FakeLiveStreamGenerator
 from app.services.live_monitoring.hls_stream_generator import HLSStreamGenerator
+from app.services.live_monitoring.mjpeg_broadcaster import get_broadcaster
+from app.services.live_monitoring.segment_manifest import KIND_HOURLY, KIND_SEGMENT, get_segment_manifest
+from app.services.live_monitoring.hls_store import get_hls_store
+from app.services.live_monitoring.clip_index import get_clip_index
+from app.services.live_monitoring.event_writer import get_event_writer
+from app.services.live_monitoring.snapshot_batcher import get_snapshot_batcher
 from app.services.live_monitoring.segment_analyzer import (
     start_segment_analysis_for_camera,
     stop_segment_analysis_for_camera
@@ -72,7 +78,8 @@ async def start_stream(
     camera_id: str,
     enable_analysis: bool = Query(True, description="1시간 단위 분석 활성화"),
     enable_realtime_detection: bool = Query(True, description="실시간 이벤트 탐지 활성화"),
-    age_months: int = Query(None, description="아이의 개월 수 (실시간 분석 정확도 향상)")
+    age_months: int = Query(None, description="아이의 개월 수 (실시간 분석 정확도 향상)"),
+    user_id: int = Query(None, description="아이 프로필 사용자 ID (생년월일 기반 발달 단계 캐시)")
 ):
     """
     가짜 라이브 스트림 시작
@@ -112,7 +119,7 @@ async def start_stream(
     
     # 5분 단위 분석 스케줄러 시작 (새로운 방식)
     if enable_analysis:
-        await start_segment_analysis_for_camera(camera_id)
+        await start_segment_analysis_for_camera(camera_id, user_id=user_id, age_months=age_months)
     
     print(f"[API] 스트림 시작: {camera_id} (10분 단위 분석: {enable_analysis}, 실시간 탐지: {enable_realtime_detection}, 개월수: {age_months})")
     
@@ -135,13 +142,19 @@ async def start_hls_stream(
     camera_url: str = Query(None, description="홈캠 RTSP/HTTP URL (실제 카메라인 경우)"),
     enable_analysis: bool = Query(True, description="10분 단위 분석 활성화"),
     enable_realtime_detection: bool = Query(True, description="실시간 이벤트 탐지 활성화"),
-    age_months: int = Query(None, description="아이의 개월 수")
+    age_months: int = Query(None, description="아이의 개월 수"),
+    user_id: int = Query(None, description="아이 프로필 사용자 ID (생년월일 기반 발달 단계 캐시)"),
+    single_encode: bool = Query(True, description="FFmpeg 1회 인코딩으로 HLS + 10분 아카이브 동시 생성"),
+    low_latency: bool = Query(False, description="저지연 HLS (LL-HLS partial segment, 실시간 시청용)"),
+    part_target: float = Query(0.4, description="LL-HLS part 길이 (초)"),
+    latency_target: float = Query(3.0, description="LL-HLS 목표 지연 (초)")
 ):
     """
     HLS 스트림 시작 (진짜 실시간 스트림)
     - 백그라운드에서 계속 실행
     - 재연결 시 자동으로 현재 시간부터 재생
     - 가짜 영상 또는 실제 홈캠 지원
+    - low_latency=True: 2초 부모 세그먼트 + part 단위 LL-HLS (기본은 10초 세그먼트)
     """
     if camera_id in active_hls_streams:
         raise HTTPException(status_code=400, detail="이미 HLS 스트림이 실행 중입니다")
@@ -170,10 +183,14 @@ async def start_hls_stream(
         video_source=video_source,
         output_dir=output_dir,
         is_real_camera=is_real_camera,
-        segment_duration=10,  # 10초 단위 HLS 세그먼트
+        segment_duration=2 if low_latency else 10,  # HLS 세그먼트 (LL-HLS는 part를 묶은 부모 세그먼트)
         enable_realtime_detection=enable_realtime_detection,
         age_months=age_months,
-        event_loop=loop
+        event_loop=loop,
+        single_encode=single_encode,
+        low_latency=low_latency,
+        part_target=part_target,
+        latency_target=latency_target
     )
     active_hls_streams[camera_id] = generator
     
@@ -183,7 +200,7 @@ async def start_hls_stream(
     
     # 10분 단위 분석 스케줄러 시작
     if enable_analysis:
-        await start_segment_analysis_for_camera(camera_id)
+        await start_segment_analysis_for_camera(camera_id, user_id=user_id, age_months=age_months)
     
     stream_type = "실제 홈캠" if is_real_camera else "가짜 영상"
     print(f"[API] HLS 스트림 시작: {camera_id} ({stream_type}, 10분 단위 분석: {enable_analysis})")
@@ -194,6 +211,10 @@ async def start_hls_stream(
         "status": "running",
         "stream_type": stream_type,
         "analysis_enabled": enable_analysis,
+        "single_encode": single_encode,
+        "low_latency": low_latency,
+        "part_duration": generator.part_duration if low_latency else None,
+        "latency_target": latency_target if low_latency else None,
         "playlist_url": generator.get_playlist_url()
     }
 
@@ -204,9 +225,9 @@ async def stop_hls_stream(camera_id: str):
     if camera_id not in active_hls_streams:
         raise HTTPException(status_code=404, detail="실행 중인 HLS 스트림이 없습니다")
     
-    # 스트림 중지
+    # 스트림 중지 (워커 스레드 종료 대기는 블로킹이므로 스레드에서 실행)
     generator = active_hls_streams[camera_id]
-    generator.stop_streaming()
+    await asyncio.to_thread(generator.stop_streaming)
     
     # 태스크 취소
     if camera_id in hls_stream_tasks:
@@ -233,24 +254,85 @@ async def stop_hls_stream(camera_id: str):
     }
 
 
+@router.get("/hls-health/{camera_id}")
+async def get_hls_stream_health(camera_id: str):
+    """HLS 스트림 상태 조회 (캡처 워커, FFmpeg, 아카이브)"""
+    if camera_id not in active_hls_streams:
+        raise HTTPException(status_code=404, detail="실행 중인 HLS 스트림이 없습니다")
+    
+    generator = active_hls_streams[camera_id]
+    task = hls_stream_tasks.get(camera_id)
+    
+    health = generator.get_health()
+    health["task_done"] = task.done() if task else None
+    return health
+
+
+@router.get("/snapshot-batch-stats")
+async def get_snapshot_batch_stats() -> dict:
+    """실시간 스냅샷 배치 통계 (배치 크기, 단일 요청 대체, 줄어든 요청 수)"""
+    return get_snapshot_batcher().get_stats()
+
+
+@router.get("/event-writer-stats")
+async def get_event_writer_stats() -> dict:
+    """실시간 이벤트 일괄 저장 통계 (대기열 길이, 배치 크기, 재시도/버린 이벤트)"""
+    return get_event_writer().get_stats()
+
+
 @router.get("/hls/{camera_id}/{filename}")
-async def serve_hls_file(camera_id: str, filename: str):
-    """HLS 파일 제공 (.m3u8 플레이리스트 또는 .ts 세그먼트)"""
-    file_path = Path(f"temp_videos/hls_buffer/{camera_id}/hls/{filename}")
+async def serve_hls_file(
+    camera_id: str,
+    filename: str,
+    request: Request,
+    hls_msn: Optional[int] = Query(None, alias="_HLS_msn", description="이 번호의 세그먼트가 플레이리스트에 올라올 때까지 대기 (blocking reload)"),
+    hls_part: Optional[int] = Query(None, alias="_HLS_part", description="LL-HLS: _HLS_msn 세그먼트의 이 part까지 대기")
+):
+    """
+    HLS 파일 제공 (.m3u8 플레이리스트 또는 .ts 세그먼트)
     
-    # 파일이 생성될 때까지 잠시 대기 (최대 2초)
-    # FFmpeg가 파일을 생성하는 데 시간이 걸릴 수 있음
-    if not file_path.exists():
-        for _ in range(10):  # 0.2초 * 10 = 2초
-            await asyncio.sleep(0.2)
-            if file_path.exists():
-                break
+    - HLS 생성기가 발행한 인메모리 저장소에서 응답 (ETag, If-None-Match → 304)
+    - _HLS_msn 지정 시 다음 세그먼트가 나올 때까지 응답을 보류 (폴링 대신 대기)
+    - LL-HLS: _HLS_msn + _HLS_part로 part 단위 대기, 아직 없는 part(preload hint) 요청도 생성될 때까지 대기
+    - 저장소에 없으면 디스크에서 제공 (fallback)
+    """
+    store = get_hls_store(camera_id)
+    is_playlist = filename.endswith('.m3u8')
+    
+    if is_playlist and hls_msn is not None:
+        # 타겟 길이의 3배까지 대기 후 현재 플레이리스트 응답
+        if store.low_latency and hls_part is not None:
+            await store.wait_for_part(hls_msn, hls_part, timeout=store.target_duration * 3)
+        else:
+            await store.wait_for_msn(hls_msn, timeout=store.target_duration * 3)
+    
+    entry = store.get(filename)
+    if entry is None and is_playlist:
+        # 스트림 시작 직후: 첫 플레이리스트 발행까지 잠시 대기 (최대 2초)
+        entry = await store.wait_for_file(filename, timeout=2.0)
+    elif entry is None and store.low_latency:
+        # preload hint로 미리 요청된 part: 생성될 때까지 대기
+        entry = await store.wait_for_file(filename, timeout=store.part_target * 3 + 1.0)
+    
+    if entry is not None:
+        if is_playlist:
+            cache_control = "no-cache"
+        else:
+            # 세그먼트 파일명은 재시작해도 겹치지 않으므로 내용이 바뀌지 않음
+            cache_control = "public, max-age=86400, immutable"
+        headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+        
+        if request.headers.get("if-none-match") == entry.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.data, media_type=entry.media_type, headers=headers)
     
+    # 디스크 fallback (저장소에서 이미 밀려난 세그먼트 등)
+    file_path = Path(f"temp_videos/hls_buffer/{camera_id}/hls/{filename}")
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다")
     
     # MIME 타입 설정
-    if filename.endswith('.m3u8'):
+    if is_playlist:
         media_type = "application/vnd.apple.mpegurl"
     elif filename.endswith('.ts'):
         media_type = "video/mp2t"
@@ -323,147 +405,78 @@ async def stream_video(
     """
     # 세그먼트 파일 기반 스트리밍 (권장)
     if use_segments:
-        buffer_dir = Path(f"temp_videos/hourly_buffer/{camera_id}")
-        
-        # 완료된 세그먼트 파일만 필터링 (현재 작성 중인 파일 제외)
-        def is_segment_complete(seg_file: Path) -> bool:
-            """세그먼트 파일이 완료되었는지 확인"""
-            try:
-                # 파일이 최근 5초 이내에 수정되었으면 아직 작성 중일 수 있음
-                import time
-                file_mtime = seg_file.stat().st_mtime
-                current_time = time.time()
-                
-                # 5초 이내에 수정되었으면 아직 작성 중
-                if current_time - file_mtime < 5:
-                    return False
-                
-                # 파일 크기가 너무 작으면 아직 작성 중
-                if seg_file.stat().st_size < 1000:  # 1KB 미만
-                    return False
-                
-                # VideoCapture로 열어서 확인
-                cap = cv2.VideoCapture(str(seg_file))
-                if not cap.isOpened():
-                    cap.release()
-                    return False
-                
-                # 최소 1프레임이라도 읽을 수 있는지 확인
-                ret, _ = cap.read()
-                cap.release()
-                return ret
-            except Exception:
-                return False
-        
-        # 완료된 세그먼트 파일만 필터링
-        all_segment_files = sorted(buffer_dir.glob("segment_*.mp4"))
-        segment_files = [f for f in all_segment_files if is_segment_complete(f)]
+        # 완료된 세그먼트는 스트림 생성기가 매니페스트에 기록 (파일을 열어 확인하지 않음)
+        manifest = get_segment_manifest(camera_id)
+        segment_records = manifest.list_segments(KIND_SEGMENT)
         
-        if segment_files:
-            # 현재 시간에 해당하는 세그먼트 찾기
+        if segment_records:
+            # 현재 시간에 해당하는 세그먼트 찾기 (없으면 가장 최근 완료된 세그먼트)
             now = datetime.now()
-            current_segment = None
-            current_segment_index = 0
-            
-            for i, seg_file in enumerate(segment_files):
-                # 파일명에서 시간 추출: segment_YYYYMMDD_HHMMSS.mp4
-                try:
-                    time_str = seg_file.stem.replace('segment_', '')
-                    seg_time = datetime.strptime(time_str, '%Y%m%d_%H%M%S')
-                    seg_end = seg_time + timedelta(minutes=10)
-                    
-                    if seg_time <= now < seg_end:
-                        current_segment = seg_file
-                        current_segment_index = i
-                        break
-                    elif seg_time > now:
-                        # 현재 시간보다 미래 세그먼트면 이전 세그먼트 사용
-                        if i > 0:
-                            current_segment = segment_files[i - 1]
-                            current_segment_index = i - 1
-                        else:
-                            current_segment = segment_files[0]
-                            current_segment_index = 0
-                        break
-                except ValueError:
-                    continue
+            current_segment_index = len(segment_records) - 1
+            for i, record in enumerate(segment_records):
+                if record.start_time <= now < record.end_time:
+                    current_segment_index = i
+                    break
+                elif record.start_time > now:
+                    # 현재 시간보다 미래 세그먼트면 이전 세그먼트 사용
+                    current_segment_index = max(0, i - 1)
+                    break
             
-            # 현재 세그먼트가 없으면 가장 최근 완료된 세그먼트 사용
-            if current_segment is None:
-                current_segment = segment_files[-1] if segment_files else None
-                current_segment_index = len(segment_files) - 1
+            current_segment = segment_records[current_segment_index]
+            print(f"[스트림] 세그먼트 파일 기반 스트리밍: {current_segment.filename} (인덱스: {current_segment_index}, 완료된 세그먼트: {len(segment_records)}개)")
             
-            if current_segment:
-                print(f"[스트림] 세그먼트 파일 기반 스트리밍: {current_segment.name} (인덱스: {current_segment_index}, 완료된 세그먼트: {len(segment_files)}개)")
+            def iter_segment_frames():
+                """[브로드캐스터 스레드] 세그먼트 파일을 순서대로 디코딩"""
+                current_start = current_segment.start_time
                 
-                async def generate_frames_from_segments():
-                    segment_index = current_segment_index
-                    last_segment_count = len(segment_files)
+                while True:
+                    # 현재 세그먼트 다음으로 기록된 세그먼트 (새로운 세그먼트가 추가되었을 수 있음)
+                    records = manifest.list_segments(KIND_SEGMENT)
+                    next_records = [r for r in records if r.start_time >= current_start]
                     
-                    try:
-                        while True:
-                            # 세그먼트 파일 목록이 업데이트되었는지 확인 (새로운 세그먼트가 생성되었을 수 있음)
-                            current_segment_files = sorted([f for f in buffer_dir.glob("segment_*.mp4") if is_segment_complete(f)])
-                            
-                            if segment_index >= len(current_segment_files):
-                                if loop:
-                                    segment_index = 0
-                                else:
-                                    break
-                            
-                            current_seg = current_segment_files[segment_index]
-                            print(f"[스트림] 세그먼트 재생: {current_seg.name}")
-                            
-                            cap = cv2.VideoCapture(str(current_seg))
-                            if not cap.isOpened():
-                                print(f"[스트림] 세그먼트 파일을 열 수 없습니다: {current_seg}")
-                                segment_index += 1
-                                continue
-                            
-                            fps = cap.get(cv2.CAP_PROP_FPS)
-                            if fps <= 0:
-                                fps = 5.0  # 세그먼트는 5fps로 생성됨
-                            
-                            frame_count = 0
+                    if not next_records:
+                        if loop and records:
+                            next_records = records
+                        else:
+                            break
+                    
+                    record = next_records[0]
+                    print(f"[스트림] 세그먼트 재생: {record.filename}")
+                    
+                    cap = cv2.VideoCapture(record.path)
+                    if not cap.isOpened():
+                        print(f"[스트림] 세그먼트 파일을 열 수 없습니다: {record.path}")
+                    else:
+                        fps = record.fps if record.fps > 0 else 5.0  # 세그먼트는 5fps로 생성됨
+                        
+                        frame_count = 0
+                        try:
                             while True:
                                 ret, frame = cap.read()
                                 if not ret:
                                     break
                                 
                                 frame_count += 1
-                                
-                                # JPEG로 인코딩
-                                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                                if not ret:
-                                    continue
-                                
-                                frame_bytes = buffer.tobytes()
-                                
-                                # MJPEG 형식으로 전송
-                                yield (b'--frame\r\n'
-                                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                                
-                                # 속도 조절
-                                if speed > 0:
-                                    await asyncio.sleep(1.0 / (fps * speed))
-                            
+                                yield frame, fps
+                        finally:
                             cap.release()
-                            print(f"[스트림] 세그먼트 재생 완료: {current_seg.name} ({frame_count} 프레임)")
-                            
-                            segment_index += 1
-                            
-                    except asyncio.CancelledError:
-                        print(f"[스트림] 클라이언트 연결 끊김, 스트리밍 중지")
-                        raise
-                    finally:
-                        print(f"[스트림] 스트리밍 종료: {camera_id}")
-                
-                return StreamingResponse(
-                    generate_frames_from_segments(),
-                    media_type="multipart/x-mixed-replace; boundary=frame"
-                )
-            else:
-                print(f"[스트림] 완료된 세그먼트 파일이 없습니다. 원본 영상 기반 스트리밍으로 전환")
+                        print(f"[스트림] 세그먼트 재생 완료: {record.filename} ({frame_count} 프레임)")
+                    
+                    # 다음 세그먼트로 (같은 시작 시간의 중복 재생 방지)
+                    current_start = record.start_time + timedelta(microseconds=1)
+            
+            # 같은 카메라/옵션의 시청자는 디코딩 + JPEG 인코딩을 공유
+            broadcaster = get_broadcaster(
+                f"{camera_id}:segments:loop={loop}:speed={speed}",
+                iter_segment_frames,
+                speed=speed
+            )
+            return StreamingResponse(
+                broadcaster.stream(),
+                media_type="multipart/x-mixed-replace; boundary=frame"
+            )
+        else:
+            print(f"[스트림] 완료된 세그먼트 파일이 없습니다. 원본 영상 기반 스트리밍으로 전환")
     
     # 원본 영상 기반 스트리밍 (fallback)
     video_dir = Path(f"videos/{camera_id}")
@@ -496,81 +509,70 @@ async def stream_video(
     
     print(f"[스트림] 원본 영상 기반 스트리밍: {camera_id}, {len(video_files)}개 파일")
     
+    # 원본 fps는 클립 인덱스에서 조회 (바뀐 클립만 probe)
+    clip_index = get_clip_index(video_dir)
+    
     # MJPEG 스트리밍 생성 (여러 파일 순환 재생)
-    async def generate_frames():
-        import time
+    def iter_video_frames():
+        """[브로드캐스터 스레드] 원본 영상들을 순서대로 디코딩"""
         video_index = 0
         
-        try:
-            while True:
-                # 현재 비디오 파일 선택
-                current_video = video_files[video_index % len(video_files)]
+        while True:
+            # 현재 비디오 파일 선택
+            current_video = video_files[video_index % len(video_files)]
+            
+            cap = None
+            try:
+                cap = cv2.VideoCapture(str(current_video))
                 
-                cap = None
-                try:
-                    cap = cv2.VideoCapture(str(current_video))
-                    
-                    # VideoCapture가 제대로 열렸는지 확인
-                    if not cap.isOpened():
-                        print(f"[스트림] 비디오 파일을 열 수 없습니다: {current_video}")
-                        video_index += 1
-                        continue
-                    
-                    # 원본 영상의 fps 가져오기
-                    original_fps = cap.get(cv2.CAP_PROP_FPS)
-                    if original_fps <= 0:
-                        original_fps = 30  # 기본값
-                    
-                    print(f"[스트림] 재생 중: {current_video.name} (fps: {original_fps})")
-                    
-                    frame_count = 0
-                    while True:
-                        ret, frame = cap.read()
-                        if not ret:
-                            # 현재 비디오 끝, 다음 비디오로
-                            break
-                        
-                        frame_count += 1
-                        
-                        # JPEG로 인코딩
-                        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                        if not ret:
-                            continue
-                        
-                        frame_bytes = buffer.tobytes()
-                        
-                        # MJPEG 형식으로 전송
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                        
-                        # 속도 조절 (원본 fps 기준)
-                        if speed > 0:
-                            await asyncio.sleep(1.0 / (original_fps * speed))
-                    
-                    cap.release()
-                    print(f"[스트림] 재생 완료: {current_video.name} ({frame_count} 프레임)")
-                    
-                    # 다음 비디오로
+                # VideoCapture가 제대로 열렸는지 확인
+                if not cap.isOpened():
+                    print(f"[스트림] 비디오 파일을 열 수 없습니다: {current_video}")
                     video_index += 1
-                    
-                    # loop가 False면 모든 비디오 재생 후 종료
                     if not loop and video_index >= len(video_files):
                         break
-                        
-                except Exception as e:
-                    print(f"[스트림] 에러 발생: {e}")
-                    if cap is not None:
-                        cap.release()
-                    video_index += 1
                     continue
-        except asyncio.CancelledError:
-            print(f"[스트림] 클라이언트 연결 끊김, 스트리밍 중지")
-            raise
-        finally:
-            print(f"[스트림] 스트리밍 종료: {camera_id}")
+                
+                # 원본 영상의 fps 가져오기
+                metadata = clip_index.get(current_video)
+                clip_index.save()
+                original_fps = metadata.fps if metadata else 30  # 기본값
+                
+                print(f"[스트림] 재생 중: {current_video.name} (fps: {original_fps})")
+                
+                frame_count = 0
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        # 현재 비디오 끝, 다음 비디오로
+                        break
+                    
+                    frame_count += 1
+                    yield frame, original_fps
+                
+                print(f"[스트림] 재생 완료: {current_video.name} ({frame_count} 프레임)")
+                
+            except Exception as e:
+                print(f"[스트림] 에러 발생: {e}")
+            finally:
+                if cap is not None:
+                    cap.release()
+            
+            # 다음 비디오로
+            video_index += 1
+            
+            # loop가 False면 모든 비디오 재생 후 종료
+            if not loop and video_index >= len(video_files):
+                break
     
+    # 같은 카메라/옵션의 시청자는 디코딩 + JPEG 인코딩을 공유
+    broadcaster = get_broadcaster(
+        f"{camera_id}:videos:{video_path or ''}:loop={loop}:speed={speed}",
+        iter_video_frames,
+        speed=speed
+    )
     return StreamingResponse(
-        generate_frames(),
+        broadcaster.stream(),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
@@ -580,38 +582,34 @@ async def get_stream_status(camera_id: str):
     """스트림 상태 조회"""
     is_running = camera_id in active_streams
     
-    buffer_dir = Path(f"temp_videos/hourly_buffer/{camera_id}")
-    segment_files = list(buffer_dir.glob("segment_*.mp4"))
-    hourly_files = list(buffer_dir.glob("hourly_*.mp4"))  # 레거시
+    manifest = get_segment_manifest(camera_id)
+    segment_records = manifest.list_segments(KIND_SEGMENT)
+    hourly_records = manifest.list_segments(KIND_HOURLY)  # 레거시
     
     return {
         "camera_id": camera_id,
         "is_running": is_running,
-        "segment_files_count": len(segment_files),
-        "segment_files": [f.name for f in sorted(segment_files)[-10:]],  # 최근 10개 (5분 단위)
-        "hourly_files_count": len(hourly_files),  # 레거시
-        "hourly_files": [f.name for f in sorted(hourly_files)[-5:]]  # 레거시
+        "segment_files_count": len(segment_records),
+        "segment_files": [r.filename for r in segment_records[-10:]],  # 최근 10개 (10분 단위)
+        "latest_segment_end": segment_records[-1].end_time.isoformat() if segment_records else None,
+        "hourly_files_count": len(hourly_records),  # 레거시
+        "hourly_files": [r.filename for r in hourly_records[-5:]]  # 레거시
     }
 
 
-@router.get("/list-hourly-files/{camera_id}")
-async def list_hourly_files(camera_id: str):
-    """1시간 단위 버퍼 파일 목록 조회 (레거시)"""
-    buffer_dir = Path(f"temp_videos/hourly_buffer/{camera_id}")
-    
-    if not buffer_dir.exists():
-        return {"camera_id": camera_id, "files": []}
-    
-    hourly_files = sorted(buffer_dir.glob("hourly_*.mp4"))
-    
+def _segment_records_response(camera_id: str, records: list) -> dict:
+    """매니페스트 레코드 → 파일 목록 응답"""
     files_info = []
-    for file_path in hourly_files:
-        stat = file_path.stat()
+    for record in records:
         files_info.append({
-            "filename": file_path.name,
-            "path": str(file_path),
-            "size_mb": round(stat.st_size / (1024 * 1024), 2),
-            "created_at": datetime.fromtimestamp(stat.st_ctime).isoformat()
+            "filename": record.filename,
+            "path": record.path,
+            "size_mb": round(record.byte_size / (1024 * 1024), 2),
+            "created_at": record.end_time.isoformat(),
+            "start_time": record.start_time.isoformat(),
+            "end_time": record.end_time.isoformat(),
+            "frame_count": record.frame_count,
+            "fps": record.fps
         })
     
     return {
@@ -621,31 +619,22 @@ async def list_hourly_files(camera_id: str):
     }
 
 
+@router.get("/list-hourly-files/{camera_id}")
+async def list_hourly_files(camera_id: str):
+    """1시간 단위 버퍼 파일 목록 조회 (레거시)"""
+    records = get_segment_manifest(camera_id).list_segments(KIND_HOURLY)
+    return _segment_records_response(camera_id, records)
+
+
 @router.get("/list-segment-files/{camera_id}")
-async def list_segment_files(camera_id: str):
-    """5분 단위 버퍼 파일 목록 조회"""
-    buffer_dir = Path(f"temp_videos/hourly_buffer/{camera_id}")
-    
-    if not buffer_dir.exists():
-        return {"camera_id": camera_id, "files": []}
-    
-    segment_files = sorted(buffer_dir.glob("segment_*.mp4"))
-    
-    files_info = []
-    for file_path in segment_files:
-        stat = file_path.stat()
-        files_info.append({
-            "filename": file_path.name,
-            "path": str(file_path),
-            "size_mb": round(stat.st_size / (1024 * 1024), 2),
-            "created_at": datetime.fromtimestamp(stat.st_ctime).isoformat()
-        })
-    
-    return {
-        "camera_id": camera_id,
-        "total_files": len(files_info),
-        "files": files_info
-    }
+async def list_segment_files(
+    camera_id: str,
+    start: datetime = Query(None, description="이 시간 이후 구간과 겹치는 세그먼트만 조회"),
+    end: datetime = Query(None, description="이 시간 이전 구간과 겹치는 세그먼트만 조회")
+):
+    """10분 단위 세그먼트 파일 목록 조회 (매니페스트 기준)"""
+    records = get_segment_manifest(camera_id).list_segments(KIND_SEGMENT, start, end)
+    return _segment_records_response(camera_id, records)
 
 
 @router.delete("/reset/{camera_id}")
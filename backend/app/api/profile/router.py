@@ -8,6 +8,7 @@ from typing import Optional
 
 from app.database import get_db
 from app.models.user import User
+from app.services.stage_cache import get_stage_cache
 from app.utils.auth_utils import get_current_user_id
 
 
@@ -55,6 +56,7 @@ async def setup_profile(
         if request.child_birthdate is not None:
             birthdate = date.fromisoformat(request.child_birthdate)
             user.child_birthdate = birthdate
+            get_stage_cache().invalidate(f"user:{user_id}")
         
         # 프로필 사진 업데이트
         if request.picture is not None:
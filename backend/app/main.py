@@ -31,6 +31,9 @@ from .api.content.router import router as content_router
 from .database import Base, engine
 from .database.session import test_db_connection
 from app.database import SessionLocal
+from app.services.prompt_registry import get_prompt_registry
+from app.services.video_preprocessing import get_video_preprocessor
+from app.services.live_monitoring.event_writer import get_event_writer
 
 
 def create_app() -> FastAPI:
@@ -73,7 +76,13 @@ def create_app() -> FastAPI:
         else:
             print("⚠️  데이터베이스 연결 실패 - 일부 기능이 제한될 수 있습니다")
 
-        # ✅ 2) 자동결제 워커 시작
+        # ✅ 2) 프롬프트 번들 로드 + 검증 (분석 요청마다 파일을 다시 읽지 않도록)
+        try:
+            get_prompt_registry().load_all()
+        except (FileNotFoundError, ValueError) as e:
+            print(f"⚠️  프롬프트 번들 로드 실패: {e}")
+
+        # ✅ 3) 자동결제 워커 시작
         async def billing_worker():
             while True:
                 db = SessionLocal()
@@ -102,6 +111,8 @@ def create_app() -> FastAPI:
     async def shutdown_event():
         """애플리케이션 종료 시"""
         print("\n👋 DailyCam Backend 종료 중...")
+        get_video_preprocessor().shutdown()
+        await asyncio.to_thread(get_event_writer().stop)
 
     # ----------------------------------------------------
     # 루트 엔드포인트
@@ -0,0 +1,225 @@
+"""
+analyze_video_vlm 결과 캐시 (콘텐츠 주소 방식, 디스크 저장)
+
+같은 영상을 다시 올리거나 실패/재시작 후 같은 세그먼트를 다시 분석할 때 Gemini 3단계 호출을 건너뛴다.
+- 키: 최적화된 비디오 내용 해시 + 프롬프트 번들 버전 + 모델 이름 + 생성 파라미터
+- 1단계 VLM 메타데이터(metadata)와 최종 결과(result)를 따로 저장
+  → 2/3단계 파라미터만 바뀌면 비싼 영상 호출 없이 텍스트 호출만 다시 실행
+- LRU + 전체 크기/개수 상한으로 삭제, 적중/미스 통계 노출
+
+저장 위치: temp_videos/analysis_cache/{namespace}/{key}.json
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.prompt_registry import get_prompt_registry
+
+
+CACHE_ROOT = Path(os.getenv("ANALYSIS_CACHE_DIR", "temp_videos/analysis_cache"))
+
+NAMESPACE_METADATA = "metadata"  # 1단계 VLM 메타데이터
+NAMESPACE_RESULT = "result"      # 최종 분석 결과
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str, block_size: int = 1024 * 1024) -> str:
+    """파일 내용 sha256 (블록 단위로 읽어 hash_bytes와 같은 값)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_key(**parts: Any) -> str:
+    """키 구성 요소(dict) → 안정적인 sha256 키"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def extraction_prompt_version() -> str:
+    """1단계(VLM 메타데이터 추출) 프롬프트 버전"""
+    return get_prompt_registry().file_version("vlm_metadata.ko.txt")
+
+
+def analysis_prompt_version() -> str:
+    """2/3단계(단계 판단 + 단계별 상세 분석) 프롬프트 번들 버전 (stage 파일 + common + config.yaml)"""
+    return get_prompt_registry().bundle_version()
+
+
+class AnalysisCache:
+    """
+    디스크 기반 LRU 캐시
+
+    - get()/put(): namespace별 JSON 항목 (접근 시 mtime 갱신 → LRU 순서)
+    - 전체 크기(max_bytes) 또는 개수(max_entries)를 넘으면 가장 오래 안 쓴 항목부터 삭제
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_ROOT,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes or int(os.getenv("ANALYSIS_CACHE_MAX_MB", "200")) * 1024 * 1024
+        self.max_entries = max_entries or int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "2000"))
+
+        self._lock = threading.Lock()
+        # 경로 → (크기, 마지막 접근 시각)
+        self._entries: Dict[Path, Tuple[int, float]] = {}
+        self._total_bytes = 0
+
+        # 통계
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.evicted_count = 0
+
+        self._scan()
+
+    def _scan(self):
+        """기존 캐시 파일을 인덱스로 로드"""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._entries[path] = (stat.st_size, stat.st_mtime)
+            self._total_bytes += stat.st_size
+        if self._entries:
+            print(f"[분석 캐시] 로드: {len(self._entries)}개 ({self._total_bytes/1024/1024:.1f}MB)")
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.cache_dir / namespace / f"{key}.json"
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        path = self._path(namespace, key)
+        with self._lock:
+            known = path in self._entries
+
+        value = None
+        if known:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[분석 캐시] 손상된 항목 삭제 ({namespace}/{key[:12]}): {e}")
+                self._remove(path)
+
+        with self._lock:
+            if value is None:
+                self.misses[namespace] = self.misses.get(namespace, 0) + 1
+                return None
+            self.hits[namespace] = self.hits.get(namespace, 0) + 1
+            now = time.time()
+            size, _ = self._entries.get(path, (0, now))
+            self._entries[path] = (size, now)
+
+        try:
+            os.utime(path, (now, now))  # 재시작 후에도 LRU 순서 유지
+        except OSError:
+            pass
+        return value
+
+    def put(self, namespace: str, key: str, value: dict):
+        path = self._path(namespace, key)
+        data = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[분석 캐시] 저장 실패 ({namespace}/{key[:12]}): {e}")
+            return
+
+        with self._lock:
+            previous = self._entries.get(path)
+            if previous:
+                self._total_bytes -= previous[0]
+            self._entries[path] = (len(data), time.time())
+            self._total_bytes += len(data)
+            victims = self._select_victims()
+
+        for victim in victims:
+            self._remove(victim, evicted=True)
+
+    def _select_victims(self):
+        """[lock 보유] 상한을 넘는 만큼 가장 오래 안 쓴 항목 선택"""
+        if self._total_bytes <= self.max_bytes and len(self._entries) <= self.max_entries:
+            return []
+        victims = []
+        total = self._total_bytes
+        count = len(self._entries)
+        for path, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes and count <= self.max_entries:
+                break
+            victims.append(path)
+            total -= size
+            count -= 1
+        return victims
+
+    def _remove(self, path: Path, evicted: bool = False):
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry:
+                self._total_bytes -= entry[0]
+                if evicted:
+                    self.evicted_count += 1
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            paths = list(self._entries)
+        for path in paths:
+            self._remove(path)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            namespaces = sorted(set(self.hits) | set(self.misses) | {NAMESPACE_METADATA, NAMESPACE_RESULT})
+            stats = {}
+            for namespace in namespaces:
+                hits = self.hits.get(namespace, 0)
+                misses = self.misses.get(namespace, 0)
+                stats[namespace] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                }
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "evicted": self.evicted_count,
+                "namespaces": stats,
+            }
+
+
+# 싱글톤 인스턴스
+_analysis_cache: Optional[AnalysisCache] = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """분석 결과 캐시 인스턴스를 반환합니다."""
+    global _analysis_cache
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = AnalysisCache()
+        return _analysis_cache
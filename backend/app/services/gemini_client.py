@@ -0,0 +1,361 @@
+"""
+프로세스 전역 Gemini 클라이언트
+
+모든 Gemini 호출(업로드 분석, 10분/1시간 스케줄러, 실시간 스냅샷)이 이 클라이언트 하나를 공유한다.
+- genai.configure는 1회만 호출하고 모델 객체는 설정별로 재사용
+- 블로킹 SDK 호출은 전용 스레드 풀에서 실행 (이벤트 루프를 막지 않음)
+- 전역 동시 실행 제한 + 우선순위 대기열 (실시간 > 10분 세그먼트 > 업로드 분석)
+- API 키별 토큰 버킷으로 요청 속도 제한, 429 응답은 백오프 후 재시도
+- 대기열 깊이/대기 시간 통계 노출 (get_stats)
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+
+# 우선순위 (숫자가 작을수록 먼저 처리)
+PRIORITY_REALTIME = 0  # 실시간 스냅샷 (RealtimeEventDetector)
+PRIORITY_SEGMENT = 1   # 10분/1시간 세그먼트 분석 (스케줄러)
+PRIORITY_UPLOAD = 2    # 업로드 영상 분석/재분석 (홈캠 라우터)
+
+PRIORITY_NAMES = {
+    PRIORITY_REALTIME: "realtime",
+    PRIORITY_SEGMENT: "segment",
+    PRIORITY_UPLOAD: "upload",
+}
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+class TokenBucket:
+    """
+    요청 속도 제한 (분당 rate_per_minute개, 최대 burst개 연속 허용)
+
+    토큰이 모자라면 우선순위가 가장 높은(숫자가 작은) 대기자부터, 같은 우선순위면 acquire() 호출 순서로 받는다.
+    (429 폭주 중에도 나중에 온 실시간 요청이 먼저 대기 중인 세그먼트/업로드 요청을 앞지름)
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters: List[Tuple[int, int]] = []  # (priority, seq) 힙
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.limited_count = 0
+
+    def _refill(self):
+        """[lock 보유] 경과 시간만큼 토큰 보충"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, waiter: Optional[Tuple[int, int]]) -> float:
+        """
+        [lock 보유] 차례가 되었고 토큰이 있으면 1개 가져가고 0 반환, 아니면 다시 확인할 때까지 기다릴 시간(초)
+
+        waiter가 None이면 대기자가 없을 때만 바로 가져감 (빠른 경로)
+        """
+        self._refill()
+        if waiter is None:
+            if self._waiters or self._tokens < 1.0:
+                return -1.0
+        elif self._waiters[0] != waiter:
+            # 앞선 대기자 수만큼 토큰이 더 필요 (그 사이 순서가 바뀌면 깨어나서 다시 계산)
+            ahead = sum(1 for other in self._waiters if other < waiter)
+            return max(0.01, (ahead + 1.0 - self._tokens) / self.rate)
+        elif self._tokens < 1.0:
+            return max(0.01, (1.0 - self._tokens) / self.rate)
+        else:
+            heapq.heappop(self._waiters)
+        self._tokens -= 1.0
+        return 0.0
+
+    async def acquire(self, priority: int = PRIORITY_UPLOAD):
+        with self._lock:
+            if self._try_take(None) == 0.0:
+                return
+            waiter = (priority, next(self._seq))
+            heapq.heappush(self._waiters, waiter)
+            self.limited_count += 1
+
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_take(waiter)
+                if wait == 0.0:
+                    return
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+            raise
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "loop", "future", "granted", "cancelled")
+
+    def __init__(self, priority: int, seq: int, loop: asyncio.AbstractEventLoop, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.loop = loop
+        self.future = future
+        self.granted = False
+        self.cancelled = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class PrioritySlots:
+    """
+    우선순위 세마포어 (동시 실행 limit개)
+
+    빈 슬롯은 우선순위가 가장 높은(숫자가 작은) 대기자에게, 같은 우선순위면 먼저 온 순서로 넘겨준다.
+    여러 이벤트 루프/스레드에서 호출해도 안전하다.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    async def acquire(self, priority: int):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_use < self.limit and not self._waiters:
+                self.in_use += 1
+                return
+            waiter = _Waiter(priority, next(self._seq), loop, loop.create_future())
+            heapq.heappush(self._waiters, waiter)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                waiter.cancelled = True
+            if granted:
+                # 슬롯을 넘겨받은 직후 취소됨 → 다음 대기자에게 전달
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = heapq.heappop(self._waiters)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                return
+            self.in_use -= 1
+
+    def queue_depth(self) -> Dict[str, int]:
+        """우선순위별 대기 중인 요청 수"""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        with self._lock:
+            for waiter in self._waiters:
+                if not waiter.cancelled:
+                    name = PRIORITY_NAMES.get(waiter.priority, str(waiter.priority))
+                    depth[name] = depth.get(name, 0) + 1
+        return depth
+
+
+class GeminiClient:
+    """
+    Gemini 호출 공용 계층
+
+    사용법:
+        client = get_gemini_client()
+        model = client.get_model(temperature=0.4, top_k=30, top_p=0.95)
+        response = await client.generate(model, contents, priority=PRIORITY_SEGMENT)
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        burst: Optional[int] = None,
+    ):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY 환경 변수가 설정되지 않았습니다.")
+        genai.configure(api_key=self.api_key)
+
+        self.max_concurrency = max_concurrency or int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+        self.requests_per_minute = requests_per_minute or float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+        self.burst = burst or int(os.getenv("GEMINI_BURST", "5"))
+        self.max_retries = 2  # 429 재시도 횟수
+        self.retry_backoff = 2.0  # 초 (재시도마다 2배)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gemini")
+        self._slots = PrioritySlots(self.max_concurrency)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._models: Dict[Tuple[Any, ...], genai.GenerativeModel] = {}
+        self._lock = threading.Lock()
+
+        # 통계
+        self.completed_count = 0
+        self.failed_count = 0
+        self.retried_count = 0
+        self._wait_totals: Dict[int, float] = {}
+        self._wait_counts: Dict[int, int] = {}
+
+        print(
+            f"[Gemini 클라이언트] 초기화 (동시 {self.max_concurrency}개, "
+            f"분당 {self.requests_per_minute:g}회, 버스트 {self.burst})"
+        )
+
+    def get_model(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        temperature: Optional[float] = None,
+        top_k: Optional[int] = None,
+        top_p: Optional[float] = None,
+    ) -> genai.GenerativeModel:
+        """설정별 모델 객체 (같은 설정이면 재사용)"""
+        key = (model_name, temperature, top_k, top_p)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                generation_config = None
+                if temperature is not None or top_k is not None or top_p is not None:
+                    generation_config = genai.types.GenerationConfig(
+                        temperature=temperature,
+                        top_k=top_k,
+                        top_p=top_p,
+                    )
+                model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+                self._models[key] = model
+            return model
+
+    def _bucket(self) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(self.api_key)
+            if bucket is None:
+                bucket = TokenBucket(self.requests_per_minute, self.burst)
+                self._buckets[self.api_key] = bucket
+            return bucket
+
+    async def generate(
+        self,
+        model: genai.GenerativeModel,
+        contents: Any,
+        priority: int = PRIORITY_UPLOAD,
+        generation_config: Optional[Any] = None,
+    ):
+        """
+        model.generate_content를 우선순위/속도 제한을 거쳐 스레드 풀에서 실행
+
+        Raises:
+            SDK 예외 그대로 (429는 max_retries번 재시도 후)
+        """
+        submitted_at = time.monotonic()
+        # 속도 제한 대기는 슬롯을 잡기 전에 (토큰을 기다리는 요청이 동시 실행 슬롯을 차지하지 않도록)
+        bucket = self._bucket()
+        await bucket.acquire(priority)
+        await self._slots.acquire(priority)
+        holding_slot = True
+        try:
+            self._record_wait(priority, time.monotonic() - submitted_at)
+
+            loop = asyncio.get_running_loop()
+            call = partial(model.generate_content, contents, generation_config=generation_config)
+            attempt = 0
+            while True:
+                try:
+                    response = await loop.run_in_executor(self._executor, call)
+                    with self._lock:
+                        self.completed_count += 1
+                    return response
+                except (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests) as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    backoff = self.retry_backoff * (2 ** attempt)
+                    attempt += 1
+                    with self._lock:
+                        self.retried_count += 1
+                    print(f"[Gemini 클라이언트] 429 응답, {backoff:.1f}초 후 재시도 ({attempt}/{self.max_retries}): {e}")
+                    # 백오프/토큰 대기 동안에는 슬롯을 반납 (더 높은 우선순위 요청이 먼저 실행되도록)
+                    self._slots.release()
+                    holding_slot = False
+                    await asyncio.sleep(backoff)
+                    await bucket.acquire(priority)
+                    await self._slots.acquire(priority)
+                    holding_slot = True
+        except Exception:
+            with self._lock:
+                self.failed_count += 1
+            raise
+        finally:
+            if holding_slot:
+                self._slots.release()
+
+    def _record_wait(self, priority: int, wait: float):
+        with self._lock:
+            self._wait_totals[priority] = self._wait_totals.get(priority, 0.0) + wait
+            self._wait_counts[priority] = self._wait_counts.get(priority, 0) + 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            avg_wait = {
+                PRIORITY_NAMES.get(priority, str(priority)): round(total / self._wait_counts[priority], 3)
+                for priority, total in self._wait_totals.items()
+            }
+            completed = self.completed_count
+            failed = self.failed_count
+            retried = self.retried_count
+        bucket = self._bucket()
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._slots.in_use,
+            "queue_depth": self._slots.queue_depth(),
+            "avg_queue_wait_seconds": avg_wait,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_available": round(bucket.available(), 2),
+            "rate_limited": bucket.limited_count,
+            "retried_429": retried,
+            "completed": completed,
+            "failed": failed,
+        }
+
+
+# 싱글톤 인스턴스 (프로세스 전역)
+_gemini_client: Optional[GeminiClient] = None
+_gemini_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient:
+    """Gemini 클라이언트 인스턴스를 반환합니다."""
+    global _gemini_client
+    with _gemini_client_lock:
+        if _gemini_client is None:
+            _gemini_client = GeminiClient()
+        return _gemini_client
@@ -0,0 +1,312 @@
+"""
+Gemini File API 업로드 (영상 참조 전달)
+
+1단계 VLM 호출에 영상을 base64로 인라인하면 영상 바이트 + base64 문자열(1.33배) + 요청 직렬화 사본이 한꺼번에 메모리에 올라간다.
+큰 영상은 디스크의 최적화 파일을 File API로 스트리밍 업로드하고, 요청에는 file_uri 참조만 넣는다.
+- 재사용: 같은 콘텐츠 해시의 업로드 핸들은 TTL 동안 재사용 (재분석/실패 후 재시도 시 재업로드 없음)
+- 정리: TTL이 지난 핸들은 원격 파일 삭제 후 제거 (서버 보관 기한 48시간보다 짧게)
+- 엔드포인트: GEMINI_FILE_API_BASE_URL로 바꿀 수 있어 로컬 대역 서버로 테스트 가능
+
+SDK의 genai.upload_file은 디스커버리 URL이 고정이고 상태 조회가 gRPC라 대역 서버를 쓸 수 없어
+REST resumable 업로드 프로토콜(start → upload, finalize → 상태 폴링)을 직접 호출한다.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import requests
+
+from app.services.analysis_cache import hash_file
+
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+API_VERSION = "v1beta"
+
+STATE_ACTIVE = "ACTIVE"
+STATE_FAILED = "FAILED"
+
+
+def _parse_expiration(value: Optional[str]) -> Optional[float]:
+    """서버 expirationTime ("2024-01-01T00:00:00.123456Z") → epoch 초"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class UploadedFile:
+    """File API에 업로드된 영상 1건 (콘텐츠 해시 기준)"""
+
+    def __init__(
+        self,
+        name: str,
+        uri: str,
+        mime_type: str,
+        content_hash: str,
+        size: int,
+        uploaded_at: float,
+        expires_at: float,
+    ):
+        self.name = name  # "files/abc123"
+        self.uri = uri
+        self.mime_type = mime_type
+        self.content_hash = content_hash
+        self.size = size
+        self.uploaded_at = uploaded_at
+        self.expires_at = expires_at
+        self.use_count = 0
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.expires_at
+
+    def to_part(self) -> dict:
+        """generate_content contents에 넣을 file_data 파트"""
+        return {"file_data": {"mime_type": self.mime_type, "file_uri": self.uri}}
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "uri": self.uri,
+            "mime_type": self.mime_type,
+            "content_hash": self.content_hash,
+            "size": self.size,
+            "uploaded_at": datetime.fromtimestamp(self.uploaded_at).isoformat(),
+            "expires_at": datetime.fromtimestamp(self.expires_at).isoformat(),
+            "use_count": self.use_count,
+        }
+
+
+class GeminiFileStore:
+    """
+    콘텐츠 해시 → 업로드 핸들 저장소
+
+    - ensure_uploaded(): 유효한 핸들이 있으면 재사용, 없으면 스트리밍 업로드 후 ACTIVE가 될 때까지 대기
+    - 같은 해시의 동시 요청은 한 번만 업로드 (해시별 lock)
+    - 블로킹 HTTP 호출이므로 이벤트 루프에서는 asyncio.to_thread로 호출
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.base_url = (base_url or os.getenv("GEMINI_FILE_API_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.ttl_seconds = ttl_seconds or float(os.getenv("GEMINI_FILE_TTL_HOURS", "24")) * 3600
+        self.expiry_margin_seconds = 600  # 서버 만료 직전 핸들은 쓰지 않음
+        self.poll_interval = 1.0
+        self.poll_timeout = float(os.getenv("GEMINI_FILE_ACTIVE_TIMEOUT", "300"))
+        self.request_timeout = 60
+        self.cleanup_interval = 300
+
+        self._handles: Dict[str, UploadedFile] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = time.time()
+        self._session = requests.Session()
+
+        # 통계
+        self.upload_count = 0
+        self.reuse_count = 0
+        self.failed_count = 0
+        self.deleted_count = 0
+        self.uploaded_bytes = 0
+        self.total_upload_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # REST 호출
+    # ------------------------------------------------------------------
+    def _headers(self, **extra: str) -> dict:
+        headers = {"x-goog-api-key": self.api_key or ""}
+        headers.update(extra)
+        return headers
+
+    def _upload(self, path: str, mime_type: str, content_hash: str) -> UploadedFile:
+        size = os.path.getsize(path)
+        started = time.time()
+
+        start = self._session.post(
+            f"{self.base_url}/upload/{API_VERSION}/files",
+            headers=self._headers(**{
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(size),
+                "X-Goog-Upload-Header-Content-Type": mime_type,
+            }),
+            json={"file": {"display_name": f"dailycam-{content_hash[:16]}"}},
+            timeout=self.request_timeout,
+        )
+        start.raise_for_status()
+        upload_url = start.headers.get("X-Goog-Upload-URL")
+        if not upload_url:
+            raise RuntimeError("File API 업로드 URL을 받지 못했습니다.")
+
+        # 파일 객체를 그대로 넘기면 requests가 블록 단위로 읽어 전송 (영상 전체를 메모리에 올리지 않음)
+        with open(path, "rb") as f:
+            finalize = self._session.post(
+                upload_url,
+                headers={
+                    "Content-Length": str(size),
+                    "X-Goog-Upload-Offset": "0",
+                    "X-Goog-Upload-Command": "upload, finalize",
+                },
+                data=f,
+                timeout=self.request_timeout + size / (256 * 1024),
+            )
+        finalize.raise_for_status()
+        info = finalize.json().get("file") or {}
+        info = self._wait_active(info)
+
+        uploaded_at = time.time()
+        expires_at = uploaded_at + self.ttl_seconds
+        server_expiry = _parse_expiration(info.get("expirationTime"))
+        if server_expiry is not None:
+            expires_at = min(expires_at, server_expiry - self.expiry_margin_seconds)
+
+        with self._lock:
+            self.upload_count += 1
+            self.uploaded_bytes += size
+            self.total_upload_seconds += uploaded_at - started
+        print(
+            f"[File API] 업로드 완료: {info['name']} ({size/1024/1024:.2f}MB, {uploaded_at - started:.1f}초)"
+        )
+        return UploadedFile(
+            name=info["name"],
+            uri=info["uri"],
+            mime_type=info.get("mimeType") or mime_type,
+            content_hash=content_hash,
+            size=size,
+            uploaded_at=uploaded_at,
+            expires_at=expires_at,
+        )
+
+    def _wait_active(self, info: dict) -> dict:
+        """영상은 서버 처리(PROCESSING)가 끝나야 generate_content에 쓸 수 있음"""
+        deadline = time.time() + self.poll_timeout
+        while info.get("state") not in (None, STATE_ACTIVE):
+            if info.get("state") == STATE_FAILED:
+                raise RuntimeError(f"File API 처리 실패: {info.get('name')} {info.get('error')}")
+            if time.time() >= deadline:
+                raise TimeoutError(f"File API 처리 대기 시간 초과: {info.get('name')}")
+            time.sleep(self.poll_interval)
+            response = self._session.get(
+                f"{self.base_url}/{API_VERSION}/{info['name']}",
+                headers=self._headers(),
+                timeout=self.request_timeout,
+            )
+            response.raise_for_status()
+            info = response.json()
+        return info
+
+    def _delete(self, handle: UploadedFile):
+        try:
+            response = self._session.delete(
+                f"{self.base_url}/{API_VERSION}/{handle.name}",
+                headers=self._headers(),
+                timeout=self.request_timeout,
+            )
+            if response.status_code not in (200, 204, 404):
+                response.raise_for_status()
+            with self._lock:
+                self.deleted_count += 1
+        except requests.RequestException as e:
+            # 삭제 실패해도 서버 보관 기한(48시간)이 지나면 자동 삭제됨
+            print(f"[File API] 삭제 실패 ({handle.name}): {e}")
+
+    # ------------------------------------------------------------------
+    # 공개 API
+    # ------------------------------------------------------------------
+    def ensure_uploaded(self, path: str, mime_type: str, content_hash: Optional[str] = None) -> UploadedFile:
+        """
+        path의 영상에 대한 업로드 핸들 (같은 콘텐츠 해시의 유효한 핸들이 있으면 재사용)
+
+        Raises:
+            requests.RequestException / RuntimeError / TimeoutError: 업로드 실패 (호출 측에서 인라인으로 대체)
+        """
+        content_hash = content_hash or hash_file(path)
+        self._maybe_cleanup()
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(content_hash, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                handle = self._handles.get(content_hash)
+                if handle is not None and not handle.is_expired():
+                    handle.use_count += 1
+                    self.reuse_count += 1
+                    print(f"[File API] 업로드 재사용: {handle.name} (영상 {content_hash[:12]})")
+                    return handle
+
+            if handle is not None:
+                self._delete(handle)
+
+            try:
+                handle = self._upload(path, mime_type, content_hash)
+            except Exception:
+                with self._lock:
+                    self.failed_count += 1
+                    self._handles.pop(content_hash, None)
+                raise
+
+            handle.use_count = 1
+            with self._lock:
+                self._handles[content_hash] = handle
+            return handle
+
+    def _maybe_cleanup(self):
+        with self._lock:
+            if time.time() - self._last_cleanup < self.cleanup_interval:
+                return
+            self._last_cleanup = time.time()
+        self.cleanup_expired()
+
+    def cleanup_expired(self) -> int:
+        """TTL이 지난 핸들의 원격 파일 삭제, 삭제한 개수 반환"""
+        now = time.time()
+        with self._lock:
+            expired = [handle for handle in self._handles.values() if handle.is_expired(now)]
+            for handle in expired:
+                self._handles.pop(handle.content_hash, None)
+                self._key_locks.pop(handle.content_hash, None)
+        for handle in expired:
+            self._delete(handle)
+        if expired:
+            print(f"[File API] 만료된 업로드 {len(expired)}개 삭제")
+        return len(expired)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            uploads = self.upload_count
+            return {
+                "base_url": self.base_url,
+                "ttl_hours": round(self.ttl_seconds / 3600, 2),
+                "active_handles": len(self._handles),
+                "uploads": uploads,
+                "reused": self.reuse_count,
+                "failed": self.failed_count,
+                "deleted": self.deleted_count,
+                "uploaded_mb": round(self.uploaded_bytes / 1024 / 1024, 2),
+                "avg_upload_seconds": round(self.total_upload_seconds / uploads, 3) if uploads else 0.0,
+                "handles": [handle.to_dict() for handle in self._handles.values()],
+            }
+
+
+# 싱글톤 인스턴스
+_gemini_file_store: Optional[GeminiFileStore] = None
+_gemini_file_store_lock = threading.Lock()
+
+
+def get_gemini_file_store() -> GeminiFileStore:
+    """File API 업로드 저장소 인스턴스를 반환합니다."""
+    global _gemini_file_store
+    with _gemini_file_store_lock:
+        if _gemini_file_store is None:
+            _gemini_file_store = GeminiFileStore()
+        return _gemini_file_store
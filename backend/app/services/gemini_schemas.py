@@ -0,0 +1,185 @@
+"""
+Gemini 3단계 응답 스키마 (구조화 출력)
+
+각 단계 응답을 JSON 전용(response_mime_type=application/json)으로 받고, 아래 모델로 검증한다.
+- 1단계 VlmMetadata: vlm_metadata.ko.txt 출력
+- 2단계 StageDetermination: header.ko.txt 출력 (Gemini response_schema로도 전달)
+- 3단계 DetailedAnalysis: 단계별 번들(safety_rules.ko.txt) 출력
+- 실시간 배치 SnapshotBatch: 여러 카메라 스냅샷을 한 번에 보낸 응답 (이미지 id별 결과)
+
+behavior_summary처럼 키가 행동 이름인 객체는 Gemini 스키마(OpenAPI 부분집합)로 표현할 수 없어
+1/3단계는 JSON 전용 모드 + 로컬 검증만 하고, 2단계만 response_schema를 함께 보낸다.
+프롬프트에 없는 필드도 버리지 않도록 모든 모델은 extra="allow".
+"""
+
+from typing import Any, Dict, List, Optional, Type, Union
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+# 스키마/구조화 출력 방식 버전 (분석 캐시 키에 포함)
+SCHEMA_VERSION = "1"
+
+STAGE_IDS = [str(stage) for stage in range(1, 12)]
+CONFIDENCE_LEVELS = ["높음", "중간", "낮음"]
+
+
+class _Lenient(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+# ----------------------------------------------------------------------
+# 1단계: VLM 메타데이터
+# ----------------------------------------------------------------------
+class TimelineObservation(_Lenient):
+    timestamp: Optional[str] = None
+    category: Optional[str] = None
+    action: Optional[str] = None
+    detail: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    skill_level: Optional[str] = None
+    success: Optional[bool] = None
+    importance: Optional[float] = None
+
+
+class SafetyObservation(_Lenient):
+    timestamp: Optional[str] = None
+    risk_type: Optional[str] = None
+    severity: Optional[str] = None
+    description: Optional[str] = None
+    trigger_behavior: Optional[str] = None
+    environment_factor: Optional[str] = None
+    has_safety_device: Optional[bool] = None
+    adult_intervention: Optional[bool] = None
+
+
+class VlmMetadata(_Lenient):
+    video_metadata: Dict[str, Any] = {}
+    timeline_observations: List[TimelineObservation]
+    behavior_summary: Dict[str, Any] = {}
+    advanced_behaviors: List[Dict[str, Any]] = []
+    environment: Dict[str, Any] = {}
+    safety_observations: List[SafetyObservation] = []
+    adult_presence: Dict[str, Any] = {}
+
+
+# ----------------------------------------------------------------------
+# 2단계: 발달 단계 판단
+# ----------------------------------------------------------------------
+class AlternativeStage(_Lenient):
+    stage: Optional[str] = None
+    reason: Optional[str] = None
+
+
+class StageDetermination(_Lenient):
+    detected_stage: str
+    confidence: Optional[str] = None
+    evidence: List[str] = []
+    age_months_estimate: Optional[int] = None
+    alternative_stages: List[AlternativeStage] = []
+
+    @field_validator("detected_stage", mode="before")
+    @classmethod
+    def _normalize_stage(cls, value: Any) -> str:
+        stage = str(value).strip().replace("단계", "")
+        if stage not in STAGE_IDS:
+            raise ValueError(f"지원하지 않는 발달 단계: {value}")
+        return stage
+
+
+STAGE_DETERMINATION_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "detected_stage": {"type": "string", "enum": STAGE_IDS},
+        "confidence": {"type": "string", "enum": CONFIDENCE_LEVELS},
+        "evidence": {"type": "array", "items": {"type": "string"}},
+        "age_months_estimate": {"type": "integer", "nullable": True},
+        "alternative_stages": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "stage": {"type": "string"},
+                    "reason": {"type": "string"},
+                },
+            },
+        },
+    },
+    "required": ["detected_stage", "confidence", "evidence"],
+}
+
+
+# ----------------------------------------------------------------------
+# 3단계: 단계별 상세 분석
+# ----------------------------------------------------------------------
+class IncidentEvent(_Lenient):
+    event_id: Optional[str] = None
+    severity: Optional[str] = None
+    timestamp_range: Optional[str] = None
+    description: Optional[str] = None
+    has_safety_device: Optional[bool] = None
+
+
+class SafetyAnalysis(_Lenient):
+    overall_safety_level: Optional[str] = None
+    incident_events: List[IncidentEvent] = []
+    critical_events: List[Dict[str, Any]] = []
+    environment_risks: List[Dict[str, Any]] = []
+    safety_events: List[Dict[str, Any]] = []
+
+
+class DevelopmentAnalysis(_Lenient):
+    summary: Optional[str] = None
+    development_score: Optional[Union[int, float]] = None
+    skills: List[Dict[str, Any]] = []
+    next_stage_signs: List[Any] = []
+
+
+class DetailedAnalysis(_Lenient):
+    meta: Dict[str, Any] = {}
+    development_analysis: DevelopmentAnalysis
+    safety_analysis: SafetyAnalysis
+
+
+# ----------------------------------------------------------------------
+# 실시간 스냅샷 배치 (realtime_snapshot_batch.ko.txt)
+# ----------------------------------------------------------------------
+class SnapshotResult(_Lenient):
+    image_id: str
+    current_activity: Dict[str, Any] = {}
+    safety_status: Dict[str, Any] = {}
+    developmental_observation: Dict[str, Any] = {}
+    event_summary: Dict[str, Any] = {}
+
+
+class SnapshotBatch(_Lenient):
+    results: List[SnapshotResult]
+
+
+# 단계 이름 → (검증 모델, Gemini response_schema)
+STAGE_SCHEMAS: Dict[str, tuple] = {
+    "metadata": (VlmMetadata, None),
+    "stage": (StageDetermination, STAGE_DETERMINATION_RESPONSE_SCHEMA),
+    "detail": (DetailedAnalysis, None),
+    "snapshot_batch": (SnapshotBatch, None),
+}
+
+
+def validate_stage_output(model: Type[BaseModel], data: Any) -> dict:
+    """
+    응답 dict를 스키마로 검증하고 정규화된 dict로 반환
+
+    Raises:
+        ValidationError: 필수 필드 누락/타입 불일치
+    """
+    return model.model_validate(data).model_dump(mode="json", exclude_unset=True)
+
+
+def describe_errors(error: Exception, limit: int = 5) -> str:
+    """수리 요청 프롬프트용 오류 요약"""
+    if isinstance(error, ValidationError):
+        lines = [
+            f"- {'.'.join(str(part) for part in item['loc']) or '(root)'}: {item['msg']}"
+            for item in error.errors()[:limit]
+        ]
+        return "\n".join(lines)
+    return f"- {error}"
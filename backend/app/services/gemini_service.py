@@ -1,17 +1,58 @@
 """Gemini AI 비디오 분석 서비스 (3단계 메타데이터 기반, 최적화 버전)"""
 
+import asyncio
 import base64
 import json
 import os
 import tempfile
+import threading
+import time
 from pathlib import Path
 from typing import Optional, Dict, Any, Tuple, List
 
-import cv2
 import google.generativeai as genai
-import yaml
+from pydantic import ValidationError
 from dotenv import load_dotenv
 
+from app.services.analysis_cache import (
+    NAMESPACE_METADATA,
+    NAMESPACE_RESULT,
+    analysis_prompt_version,
+    extraction_prompt_version,
+    get_analysis_cache,
+    hash_file,
+    make_key,
+)
+from app.services.gemini_client import (
+    DEFAULT_MODEL,
+    PRIORITY_REALTIME,
+    PRIORITY_UPLOAD,
+    get_gemini_client,
+)
+from app.services.gemini_files import get_gemini_file_store
+from app.services.gemini_schemas import (
+    SCHEMA_VERSION,
+    STAGE_SCHEMAS,
+    describe_errors,
+    validate_stage_output,
+)
+from app.services.metadata_compaction import (
+    COMPACTION_VERSION,
+    DEFAULT_TOKEN_BUDGET,
+    compact_metadata,
+    format_timestamp,
+    merge_chunk_metadata,
+)
+from app.services.prompt_registry import get_prompt_registry
+from app.services.roi_crop import ROI_PROMPT_NOTE
+from app.services.stage_cache import get_stage_cache
+from app.services.video_preprocessing import (
+    PreprocessResult,
+    get_video_preprocessor,
+    preprocess_video_file,
+    probe_video,
+)
+
 # .env 파일 로드
 env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
@@ -28,14 +69,17 @@ class GeminiService:
       3단계: LLM 호출 → 단계별 상세 분석 (stage_xx + common prompt 조합)
 
     변경 포인트:
-      - timeline_observations 최대 400개, safety_observations 최대 150개로 잘라서 사용
+      - timeline_observations 최대 400개, safety_observations 최대 150개로 압축
+        (연속 행동 병합 + 시간 구간별 고른 샘플링, 주의 이상 안전 관찰은 모두 유지, 토큰 예산 적용)
       - metadata JSON은 pretty-print 대신 compact 형식으로 전송해 토큰 절감
+      - 세 단계 모두 JSON 전용 응답 + 스키마 검증, 실패한 단계만 텍스트로 수리 요청
       - 비디오 최적화(_optimize_video) 유지: 480p / 1fps로 다운샘플링
     """
 
     # 메타데이터 상한 (토큰/시간 절감용)
     MAX_TIMELINE_OBS = 400
     MAX_SAFETY_OBS = 150
+    REPAIR_MAX_CHARS = 60000  # 수리 요청에 다시 보내는 원래 응답 길이 상한
 
     def __init__(self) -> None:
         """Gemini API 클라이언트 초기화"""
@@ -47,56 +91,47 @@ class GeminiService:
                 f".env 파일 경로: {env_path}"
             )
 
-        genai.configure(api_key=api_key)
+        # 프로세스 전역 클라이언트 공유 (genai.configure 1회, 동시 실행/속도 제한/우선순위)
+        self.client = get_gemini_client()
 
         # 기본 GenerationConfig (말투/자연스러움 위주)
-        generation_config = genai.types.GenerationConfig(
+        self.model = self.client.get_model(
+            DEFAULT_MODEL,
             temperature=0.4,
             top_k=30,
             top_p=0.95,
         )
 
-        self.model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-            generation_config=generation_config,
-        )
-
-        # 프롬프트 캐시 딕셔너리 초기화
-        self.prompt_cache: Dict[str, str] = {}
+        self._stats_lock = threading.Lock()
+
+        # 2단계/3단계 추측 실행 (옵트인) + 통계
+        self.speculative_stage_detail = os.getenv("GEMINI_SPECULATIVE_STAGE_DETAIL", "0") == "1"
+        self._speculation_stats = {
+            "attempts": 0,
+            "hits": 0,
+            "misses": 0,
+            "failures": 0,
+            "saved_seconds": 0.0,
+        }
+
+        # 구조화 출력: 검증 실패 시 해당 단계만 수리 요청 (횟수) + 단계별 파싱 실패 통계
+        self.json_repair_attempts = int(os.getenv("GEMINI_JSON_REPAIR_ATTEMPTS", "1"))
+        self._parse_stats = {
+            stage_name: {"responses": 0, "parse_failures": 0, "repaired": 0, "repair_failed": 0}
+            for stage_name in STAGE_SCHEMAS
+        }
+
+        # 이 크기 이상인 영상(청크)은 base64 인라인 대신 File API 업로드 참조로 전달 (음수면 항상 인라인)
+        self.file_upload_min_bytes = int(float(os.getenv("GEMINI_FILE_UPLOAD_MIN_MB", "8")) * 1024 * 1024)
+        self._video_part_stats = {"inline": 0, "file": 0, "file_fallback": 0}
 
     # ------------------------------------------------------------------
     # 공통 유틸
     # ------------------------------------------------------------------
     def _load_prompt(self, filename: str) -> str:
-        """프롬프트 파일을 캐시하여 반환합니다."""
-        if filename in self.prompt_cache:
-            return self.prompt_cache[filename]
-
-        prompts_dir = Path(__file__).parent.parent / "prompts"
-        prompt_path = prompts_dir / filename
-
+        """프롬프트 파일 내용 (모듈 전역 레지스트리 캐시, 파일이 바뀌면 다시 읽음)"""
         try:
-            # 1. 직접 경로 시도
-            if (prompts_dir / filename).exists():
-                prompt_path = prompts_dir / filename
-            # 2. baby_dev_safety/common 시도
-            elif (prompts_dir / "baby_dev_safety" / "common" / filename).exists():
-                prompt_path = prompts_dir / "baby_dev_safety" / "common" / filename
-            # 3. baby_dev_safety/stages 시도
-            elif (prompts_dir / "baby_dev_safety" / "stages" / filename).exists():
-                prompt_path = prompts_dir / "baby_dev_safety" / "stages" / filename
-            # 4. baby_dev_safety/extraction 시도
-            elif (prompts_dir / "baby_dev_safety" / "extraction" / filename).exists():
-                prompt_path = prompts_dir / "baby_dev_safety" / "extraction" / filename
-            else:
-                # 못 찾으면 기본 경로로 설정하고 에러 발생 유도
-                prompt_path = prompts_dir / filename
-
-            with open(prompt_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                self.prompt_cache[filename] = content
-                print(f"[프롬프트 캐시 등록] {filename} ({len(content)}자)")
-                return content
+            return get_prompt_registry().get_prompt(filename)
         except FileNotFoundError:
             error_msg = f"프롬프트 파일을 찾을 수 없습니다: {filename}"
             print(f"❌ {error_msg}")
@@ -161,72 +196,12 @@ class GeminiService:
     ) -> str:
         """
         VLM 발달 단계별 프롬프트를 로드합니다.
-        공통 파일(입력 전제, 분석 단계, 필드 정의, 안전 규칙)과 단계별 프롬프트를 조합합니다.
+        공통 파일(입력 전제, 분석 단계, 필드 정의, 안전 규칙)과 단계별 프롬프트의 조합은
+        프롬프트 레지스트리가 미리 만들어 두고, 여기서는 메타데이터 섹션만 이어 붙입니다.
         """
-        prompts_dir = Path(__file__).parent.parent / "prompts"
-        baby_dev_safety_dir = prompts_dir / "baby_dev_safety"
-
-        if not baby_dev_safety_dir.exists():
-            raise FileNotFoundError(
-                f"VLM 프롬프트 디렉토리를 찾을 수 없습니다: {baby_dev_safety_dir}"
-            )
-
-        # 1. 공통 입력 전제
-        input_premise_path = baby_dev_safety_dir / "common" / "input_premise.ko.txt"
-        with open(input_premise_path, "r", encoding="utf-8") as f:
-            input_premise = f.read()
-
-        # 2. 공통 분석 단계 템플릿
-        analysis_steps_path = (
-            baby_dev_safety_dir / "common" / "analysis_steps_template.ko.txt"
-        )
-        with open(analysis_steps_path, "r", encoding="utf-8") as f:
-            analysis_steps = f.read()
-
-        # 3. 공통 필드 정의
-        field_definitions_path = (
-            baby_dev_safety_dir / "common" / "field_definitions.ko.txt"
-        )
-        with open(field_definitions_path, "r", encoding="utf-8") as f:
-            field_definitions = f.read()
-
-        # 4. config.yaml 읽기 (단계별 prompt_file 매핑)
-        config_path = baby_dev_safety_dir / "config.yaml"
-        if not config_path.exists():
-            raise FileNotFoundError(f"설정 파일을 찾을 수 없습니다: {config_path}")
-
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = yaml.safe_load(f)
-
-        if "stages" not in config or stage not in config["stages"]:
-            raise ValueError(
-                f"지원하지 않는 발달 단계입니다: {stage}. "
-                f"지원 단계: {list(config.get('stages', {}).keys())}"
-            )
-
-        stage_config = config["stages"][stage]
-        prompt_file = stage_config["prompt_file"]
-
-        # 5. 단계별 프롬프트
-        stage_prompt_path = baby_dev_safety_dir / "stages" / prompt_file
-        if not stage_prompt_path.exists():
-            raise FileNotFoundError(
-                f"단계별 프롬프트 파일을 찾을 수 없습니다: {stage_prompt_path}"
-            )
-
-        with open(stage_prompt_path, "r", encoding="utf-8") as f:
-            stage_prompt = f.read()
+        bundle = get_prompt_registry().get_bundle(stage)
 
-        # 6. 공통 안전 규칙
-        common_rules_path = baby_dev_safety_dir / "common" / "safety_rules.ko.txt"
-        if not common_rules_path.exists():
-            raise FileNotFoundError(
-                f"공통 안전 규칙 파일을 찾을 수 없습니다: {common_rules_path}"
-            )
-        with open(common_rules_path, "r", encoding="utf-8") as f:
-            common_safety_rules = f.read()
-
-        # 7. 메타데이터 섹션
+        # 메타데이터 섹션 (호출마다 달라지는 부분)
         metadata_items: List[str] = []
         if age_months is not None:
             metadata_items.append(f"- age_months: {age_months}")
@@ -243,15 +218,7 @@ class GeminiService:
         if metadata_items:
             metadata_section = "\n\n[메타데이터]\n" + "\n".join(metadata_items) + "\n"
 
-        combined_prompt = f"""{stage_prompt}
-
-{input_premise}
-
-{analysis_steps}
-
-{field_definitions}
-
-{common_safety_rules}{metadata_section}"""
+        combined_prompt = bundle.render(metadata_section)
 
         print(
             f"[VLM 프롬프트 로드 완료] 단계: {stage}, 길이: {len(combined_prompt)}자"
@@ -264,140 +231,45 @@ class GeminiService:
     def _get_video_duration(
         self, video_bytes: bytes, mime_type: str = "video/mp4"
     ) -> Optional[float]:
-        """비디오 바이트 데이터에서 비디오 길이(초)를 계산합니다."""
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_file:
-                temp_file.write(video_bytes)
-                temp_path = temp_file.name
-
-            try:
-                cap = cv2.VideoCapture(temp_path)
-                if not cap.isOpened():
-                    print("[비디오 길이 계산 실패] 비디오를 열 수 없습니다.")
-                    return None
-
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-                cap.release()
+        """
+        비디오 바이트 데이터에서 비디오 길이(초)를 계산합니다. (동기 버전)
 
-                if fps > 0 and frame_count > 0:
-                    duration = frame_count / fps
-                    print(
-                        f"[비디오 길이 계산 성공] FPS: {fps}, 프레임 수: {frame_count}, 길이: {duration}초"
-                    )
-                    return duration
-                else:
-                    print(
-                        f"[비디오 길이 계산 실패] FPS 또는 프레임 수가 유효하지 않습니다. "
-                        f"FPS: {fps}, 프레임 수: {frame_count}"
-                    )
-                    return None
-            finally:
-                try:
-                    os.unlink(temp_path)
-                except Exception as e:
-                    print(f"[비디오 길이 계산] 임시 파일 삭제 실패: {e}")
-        except Exception as e:
-            print(f"[비디오 길이 계산 오류] {str(e)}")
+        analyze_video_vlm은 전처리 단계의 프로브 결과를 사용하므로 이 함수를 호출하지 않습니다.
+        """
+        with tempfile.TemporaryDirectory(prefix="dailycam_probe_") as work_dir:
+            temp_path = os.path.join(work_dir, "input.mp4")
+            with open(temp_path, "wb") as f:
+                f.write(video_bytes)
+            probe = probe_video(temp_path)
+
+        if probe is None or probe.duration is None:
+            print("[비디오 길이 계산 실패] 비디오를 열 수 없거나 FPS/프레임 수가 유효하지 않습니다.")
             return None
+        print(
+            f"[비디오 길이 계산 성공] FPS: {probe.fps}, 프레임 수: {probe.frame_count}, 길이: {probe.duration}초"
+        )
+        return probe.duration
 
     def _optimize_video(self, video_bytes: bytes) -> bytes:
         """
-        비디오 최적화: 해상도 축소 및 FPS 조정
+        비디오 최적화: 해상도 축소 및 FPS 조정 (동기 버전, 호출 스레드에서 실행)
         - 해상도: 높이 480px (비율 유지)
         - FPS: 1fps (초당 1프레임)
         - 이미 충분히 낮은 경우(높이 <=480, fps <=2)는 원본 사용
-        """
-        print("[비디오 최적화] 전처리 시작...")
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as input_temp:
-            input_temp.write(video_bytes)
-            input_path = input_temp.name
-
-        output_path = input_path.replace(".mp4", "_opt.mp4")
-
-        try:
-            cap = cv2.VideoCapture(input_path)
-            if not cap.isOpened():
-                print("[비디오 최적화] 비디오 열기 실패, 원본 사용")
-                return video_bytes
-
-            orig_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            orig_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            orig_fps = cap.get(cv2.CAP_PROP_FPS)
-
-            target_height = 480
-            target_fps = 1.0
-
-            # 이미 최적화된 상태면 패스
-            if orig_height <= target_height and orig_fps <= 2:
-                print(
-                    f"[비디오 최적화] 이미 최적화된 상태 ({orig_width}x{orig_height}, {orig_fps}fps)"
-                )
-                cap.release()
-                return video_bytes
-
-            scale = target_height / float(orig_height)
-            target_width = int(orig_width * scale)
-
-            print(
-                f"[비디오 최적화] {orig_width}x{orig_height} {orig_fps}fps "
-                f"-> {target_width}x{target_height} {target_fps}fps"
-            )
-
-            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-            out = cv2.VideoWriter(
-                output_path, fourcc, target_fps, (target_width, target_height)
-            )
-
-            step = int(orig_fps / target_fps) if orig_fps > 0 else 1
-            if step < 1:
-                step = 1
-
-            count = 0
-            processed_frames = 0
-
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                if count % step == 0:
-                    resized = cv2.resize(frame, (target_width, target_height))
-                    out.write(resized)
-                    processed_frames += 1
-
-                count += 1
-
-            cap.release()
-            out.release()
-
-            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
-                print("[비디오 최적화] 출력 파일 생성 실패, 원본 사용")
+        analyze_video_vlm은 같은 처리를 프로세스 풀(get_video_preprocessor)에서 실행합니다.
+        """
+        with tempfile.TemporaryDirectory(prefix="dailycam_preprocess_") as work_dir:
+            input_path = os.path.join(work_dir, "input.mp4")
+            output_path = os.path.join(work_dir, "optimized.mp4")
+            with open(input_path, "wb") as f:
+                f.write(video_bytes)
+
+            outcome = preprocess_video_file(input_path, output_path, submitted_at=time.time())
+            if not outcome["optimized"]:
                 return video_bytes
-
             with open(output_path, "rb") as f:
-                optimized_bytes = f.read()
-
-            reduction_ratio = (1 - len(optimized_bytes) / len(video_bytes)) * 100
-            print(
-                f"[비디오 최적화 완료] "
-                f"{len(video_bytes)/1024/1024:.2f}MB -> {len(optimized_bytes)/1024/1024:.2f}MB "
-                f"({reduction_ratio:.1f}% 감소)"
-            )
-            return optimized_bytes
-
-        except Exception as e:
-            print(f"[비디오 최적화 오류] {e}")
-            return video_bytes
-        finally:
-            try:
-                if os.path.exists(input_path):
-                    os.unlink(input_path)
-                if os.path.exists(output_path):
-                    os.unlink(output_path)
-            except Exception as e:
-                print(f"[비디오 최적화] 임시 파일 삭제 실패: {e}")
+                return f.read()
 
     # ------------------------------------------------------------------
     # 안전 점수 계산
@@ -576,135 +448,215 @@ class GeminiService:
             raise ValueError(f"JSON 파싱 실패: {str(e)}")
 
     # ------------------------------------------------------------------
-    # 메인 엔트리: 3단계 메타데이터 기반 분석
+    # 구조화 출력 (JSON 전용 응답 + 스키마 검증 + 단계별 수리)
     # ------------------------------------------------------------------
-    async def analyze_video_vlm(
+    async def _generate_structured(
         self,
-        video_bytes: bytes,
-        content_type: str,
-        stage: Optional[str] = None,
-        age_months: Optional[int] = None,
-        generation_params: Optional[dict] = None,
+        stage_name: str,
+        contents: Any,
+        priority: int,
+        params: Optional[dict] = None,
     ) -> dict:
         """
-        메타데이터 방식으로 비디오를 분석합니다.
-        3단계 프로세스:
-          1) VLM으로 메타데이터 추출 (영상 기반)
-          2) LLM으로 발달 단계 판단 (메타데이터 기반)
-          3) LLM으로 단계별 상세 분석 (메타데이터 + 단계별 프롬프트)
+        JSON 전용 모드로 호출하고 STAGE_SCHEMAS[stage_name]으로 검증
 
-        NOTE:
-          - 홈캠 8시간짜리 영상은 1시간 단위로 잘라서 이 함수에 전달하는 것을 권장합니다.
-          - 이 함수는 "최대 1시간 분량의 클립"을 한 번 분석하는 단위로 설계되었습니다.
-        """
-        try:
-            mime_type = content_type or "video/mp4"
+        검증에 실패하면 해당 단계만 텍스트로 수리 요청 (비디오 재전송/전체 재실행 없음)
 
-            # ----------------------------------------------------------
-            # 0단계: 비디오 최적화 (해상도/FPS 다운샘플링)
-            # ----------------------------------------------------------
-            optimized_video_bytes = self._optimize_video(video_bytes)
+        Raises:
+            ValueError: 수리 후에도 검증 실패
+        """
+        schema_model, response_schema = STAGE_SCHEMAS[stage_name]
+        generation_config = dict(params or {})
+        generation_config["response_mime_type"] = "application/json"
+        if response_schema is not None:
+            generation_config["response_schema"] = response_schema
+
+        response = await self.client.generate(
+            self.model, contents, priority=priority, generation_config=generation_config
+        )
+        if not response or not hasattr(response, "text"):
+            raise ValueError(f"Gemini {stage_name} 응답이 올바르지 않습니다.")
 
-            # ----------------------------------------------------------
-            # 1단계: VLM 호출 → 메타데이터 추출
-            # ----------------------------------------------------------
-            print("[1차 VLM] 비디오에서 메타데이터 추출 중...")
+        text = response.text.strip()
+        self._record_parse(stage_name, "responses")
+        try:
+            return validate_stage_output(schema_model, self._extract_and_parse_json(text))
+        except (ValueError, ValidationError) as e:
+            error = e
+
+        self._record_parse(stage_name, "parse_failures")
+        print(f"⚠️ [{stage_name}] 응답 검증 실패 ({len(text)}자):\n{describe_errors(error)}")
+
+        for attempt in range(1, self.json_repair_attempts + 1):
+            print(f"[{stage_name}] JSON 수리 요청 ({attempt}/{self.json_repair_attempts})")
+            repair_prompt = self._build_repair_prompt(schema_model, text, error)
+            response = await self.client.generate(
+                self.model,
+                repair_prompt,
+                priority=priority,
+                generation_config={"temperature": 0.0, "response_mime_type": "application/json"},
+            )
+            if not response or not hasattr(response, "text"):
+                continue
+            text = response.text.strip()
+            try:
+                data = validate_stage_output(schema_model, self._extract_and_parse_json(text))
+                self._record_parse(stage_name, "repaired")
+                print(f"[{stage_name}] JSON 수리 성공")
+                return data
+            except (ValueError, ValidationError) as e:
+                error = e
+
+        self._record_parse(stage_name, "repair_failed")
+        raise ValueError(f"AI 응답을 파싱할 수 없습니다 ({stage_name}): {describe_errors(error)}")
+
+    def _build_repair_prompt(self, schema_model, text: str, error: Exception) -> str:
+        schema_json = json.dumps(schema_model.model_json_schema(), ensure_ascii=False, separators=(",", ":"))
+        return f"""[응답 수정 요청]
+아래 응답은 JSON 스키마 검증에 실패했습니다.
+원래 응답의 내용은 그대로 유지하고, 오류만 고쳐서 스키마에 맞는 단일 JSON 객체만 출력하세요.
+응답이 중간에 끊겼다면 끊긴 항목은 버리고 JSON을 올바르게 닫으세요.
+
+[오류]
+{describe_errors(error)}
+
+[JSON 스키마]
+{schema_json}
+
+[원래 응답]
+{text[:self.REPAIR_MAX_CHARS]}
+"""
 
-            video_base64 = base64.b64encode(optimized_video_bytes).decode("utf-8")
-            metadata_prompt = self._load_prompt("vlm_metadata.ko.txt")
+    def _record_parse(self, stage_name: str, outcome: str):
+        with self._stats_lock:
+            self._parse_stats[stage_name][outcome] += 1
 
-            vlm_generation_config = genai.types.GenerationConfig(
-                temperature=0.0,  # 사실 기반 추출
-                top_k=30,
-                top_p=0.95,
-            )
+    def get_parse_stats(self) -> dict:
+        """단계별 응답 수 / 검증 실패 / 수리 성공·실패"""
+        with self._stats_lock:
+            stats = {stage_name: dict(counts) for stage_name, counts in self._parse_stats.items()}
+        for counts in stats.values():
+            responses = counts["responses"]
+            counts["parse_failure_rate"] = round(counts["parse_failures"] / responses, 3) if responses else 0.0
+        return stats
 
-            response = self.model.generate_content(
-                [
-                    {
-                        "mime_type": mime_type,
-                        "data": video_base64,
-                    },
-                    metadata_prompt,
-                ],
-                generation_config=vlm_generation_config,
-            )
+    # ------------------------------------------------------------------
+    # 실시간 스냅샷 분석 (RealtimeEventDetector)
+    # ------------------------------------------------------------------
+    async def analyze_realtime_snapshot(
+        self,
+        frame_or_video: bytes,
+        content_type: str = "image/jpeg",
+        age_months: Optional[int] = None,
+        context_image: Optional[bytes] = None,
+    ) -> dict:
+        """
+        현재 프레임(또는 짧은 클립)을 분석하여 즉시 필요한 안전/활동 정보를 반환합니다.
+        프롬프트: live_monitoring/realtime_snapshot.ko.txt
 
-            if not response or not hasattr(response, "text"):
-                raise ValueError("Gemini VLM 응답이 올바르지 않습니다.")
+        context_image(JPEG)를 주면 frame_or_video는 아이 주변 크롭으로 보고 전체 장면 썸네일을 앞에 함께 보냅니다.
 
-            metadata_text = response.text.strip()
-            metadata = self._extract_and_parse_json(metadata_text)
+        Returns:
+            current_activity, safety_status, developmental_observation, event_summary
+        """
+        snapshot_prompt = self._load_prompt("live_monitoring/realtime_snapshot.ko.txt")
 
-            print(
-                f"[1차 완료] 관찰 {len(metadata.get('timeline_observations', []))}개, "
-                f"안전 이벤트 {len(metadata.get('safety_observations', []))}개"
+        age_hint = ""
+        if age_months is not None:
+            age_hint = (
+                f"\n\n[개월 수 정보]\n- 이 아이의 개월 수: {age_months}개월\n"
+                f"- 개월 수에 맞는 안전/발달 기준으로 판단하세요.\n"
             )
 
-            # 1-1) 비디오 길이 계산 (OpenCV → 메타데이터 보정)
-            calculated_duration = self._get_video_duration(video_bytes, mime_type)
-            if calculated_duration:
-                video_duration_seconds = calculated_duration
-                if "video_metadata" not in metadata:
-                    metadata["video_metadata"] = {}
-                metadata["video_metadata"]["total_duration_seconds"] = calculated_duration
-                print(f"[비디오 길이] OpenCV 측정값 사용: {calculated_duration}초")
-            else:
-                video_duration_seconds = metadata.get("video_metadata", {}).get(
-                    "total_duration_seconds"
-                )
-                print(f"[비디오 길이] VLM 추정값 사용: {video_duration_seconds}초")
+        snapshot_generation_config = genai.types.GenerationConfig(
+            temperature=0.2,
+            top_k=30,
+            top_p=0.95,
+        )
 
-            video_duration_minutes = (
-                round(video_duration_seconds / 60, 2)
-                if video_duration_seconds
-                else None
-            )
-            print(
-                f"[비디오 길이] {video_duration_seconds}초 ({video_duration_minutes}분)"
-            )
+        contents: List[Any] = []
+        if context_image is not None:
+            contents.append({"mime_type": "image/jpeg", "data": base64.b64encode(context_image).decode("utf-8")})
+            age_hint += ROI_PROMPT_NOTE
+        contents.append({
+            "mime_type": content_type or "image/jpeg",
+            "data": base64.b64encode(frame_or_video).decode("utf-8"),
+        })
+        contents.append(snapshot_prompt + age_hint)
+
+        response = await self.client.generate(
+            self.model,
+            contents,
+            priority=PRIORITY_REALTIME,
+            generation_config=snapshot_generation_config,
+        )
 
-            # 1-2) 메타데이터 상한 적용 (토큰 절감)
-            timeline_obs = metadata.get("timeline_observations")
-            if isinstance(timeline_obs, list) and len(timeline_obs) > self.MAX_TIMELINE_OBS:
-                print(
-                    f"[메타데이터 압축] timeline_observations "
-                    f"{len(timeline_obs)}개 → {self.MAX_TIMELINE_OBS}개로 축소"
-                )
-                metadata["timeline_observations"] = timeline_obs[: self.MAX_TIMELINE_OBS]
+        if not response or not hasattr(response, "text"):
+            raise ValueError("Gemini 실시간 스냅샷 응답이 올바르지 않습니다.")
 
-            safety_obs = metadata.get("safety_observations")
-            if isinstance(safety_obs, list) and len(safety_obs) > self.MAX_SAFETY_OBS:
-                print(
-                    f"[메타데이터 압축] safety_observations "
-                    f"{len(safety_obs)}개 → {self.MAX_SAFETY_OBS}개로 축소"
-                )
-                metadata["safety_observations"] = safety_obs[: self.MAX_SAFETY_OBS]
+        return self._extract_and_parse_json(response.text.strip())
 
-            # ----------------------------------------------------------
-            # 2단계: LLM 호출 → 발달 단계 판단
-            # ----------------------------------------------------------
-            detected_stage = stage
-            stage_determination_result = None
-            initial_stage_from_age = None
+    async def analyze_realtime_snapshot_batch(
+        self,
+        snapshots: List[Tuple[str, bytes, str, Optional[int], Optional[bytes]]],
+    ) -> Dict[str, dict]:
+        """
+        여러 카메라의 스냅샷을 요청 1번으로 분석합니다 (SnapshotBatcher).
+        프롬프트: realtime_snapshot_batch.ko.txt + realtime_snapshot.ko.txt (한 번만 전송)
 
-            if stage is None:
-                if age_months is not None:
-                    initial_stage_from_age = self._determine_stage_from_age_months(
-                        age_months
-                    )
-                    print(
-                        f"[발달 단계 초기화] age_months={age_months}개월 "
-                        f"→ 초기 단계: {initial_stage_from_age}단계"
-                    )
+        Args:
+            snapshots: (이미지 id, 이미지 바이트, content_type, 개월 수, 전체 장면 썸네일 또는 None) 목록
+                썸네일이 있으면 이미지 바이트는 아이 주변 크롭 (같은 id로 썸네일 → 크롭 순서)
 
-                print("[2차 LLM] 메타데이터로 발달 단계 판단 중...")
+        Returns:
+            이미지 id → analyze_realtime_snapshot과 같은 형식의 결과 (응답에 없는 id는 빠짐)
+        """
+        batch_prompt = self._load_prompt("live_monitoring/realtime_snapshot_batch.ko.txt")
+        snapshot_prompt = self._load_prompt("live_monitoring/realtime_snapshot.ko.txt")
+
+        contents: List[Any] = [batch_prompt + snapshot_prompt]
+        for image_id, image_bytes, content_type, age_months, context_image in snapshots:
+            age_label = f"{age_months}개월" if age_months is not None else "개월 수 정보 없음"
+            contents.append(f"[이미지 id={image_id}] ({age_label})")
+            if context_image is not None:
+                contents.append({"mime_type": "image/jpeg", "data": base64.b64encode(context_image).decode("utf-8")})
+            contents.append({
+                "mime_type": content_type or "image/jpeg",
+                "data": base64.b64encode(image_bytes).decode("utf-8"),
+            })
+        contents.append(f"위 이미지 {len(snapshots)}장 각각에 대해 results 배열로 응답하세요.")
+
+        data = await self._generate_structured(
+            "snapshot_batch",
+            contents,
+            priority=PRIORITY_REALTIME,
+            params={"temperature": 0.2, "top_k": 30, "top_p": 0.95},
+        )
 
-                stage_header_prompt = self._load_prompt("header.ko.txt")
+        expected = {snapshot[0] for snapshot in snapshots}
+        results: Dict[str, dict] = {}
+        for item in data.get("results", []):
+            image_id = str(item.pop("image_id", "")).strip()
+            if image_id in expected and image_id not in results:
+                results[image_id] = item
+        return results
 
-                age_hint = ""
-                if age_months is not None and initial_stage_from_age is not None:
-                    age_hint = f"""
+    # ------------------------------------------------------------------
+    # 2단계/3단계 LLM 호출
+    # ------------------------------------------------------------------
+    async def _determine_stage(
+        self,
+        metadata: dict,
+        age_months: Optional[int],
+        initial_stage_from_age: Optional[str],
+        priority: int,
+    ) -> dict:
+        """2단계: 메타데이터로 발달 단계 판단 (header.ko.txt) → 판단 결과 dict"""
+        stage_header_prompt = self._load_prompt("header.ko.txt")
+
+        age_hint = ""
+        if age_months is not None and initial_stage_from_age is not None:
+            age_hint = f"""
 [개월 수 정보]
 - 이 아이의 개월 수: {age_months}개월
 - 개월 수 기반 예상 단계: {initial_stage_from_age}단계
@@ -712,10 +664,10 @@ class GeminiService:
 - 관찰된 행동이 예상 단계와 다르다면, 관찰 결과를 우선하여 판단하세요.
 """
 
-                # compact JSON으로 토큰 절감
-                metadata_json_str = json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
+        # compact JSON으로 토큰 절감
+        metadata_json_str = json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
 
-                combined_prompt_stage = f"""[입력 방식]
+        combined_prompt_stage = f"""[입력 방식]
 비디오 대신 비디오에서 추출된 메타데이터를 제공합니다.
 이 메타데이터를 바탕으로 발달 단계를 판단하세요.
 {age_hint}
@@ -733,53 +685,27 @@ class GeminiService:
 - evidence에는 구체적인 빈도/지속시간을 포함
 """
 
-                response = self.model.generate_content(combined_prompt_stage)
-
-                if not response or not hasattr(response, "text"):
-                    raise ValueError("Gemini 단계 판단 응답이 올바르지 않습니다.")
-
-                result_text = response.text.strip()
-                stage_determination_result = self._extract_and_parse_json(result_text)
-                detected_stage = stage_determination_result.get("detected_stage")
-
-                if not detected_stage:
-                    raise ValueError("발달 단계를 판단할 수 없습니다.")
-
-                if initial_stage_from_age and detected_stage != initial_stage_from_age:
-                    print(
-                        f"[발달 단계 조정] 초기 {initial_stage_from_age}단계 "
-                        f"→ AI 판단 {detected_stage}단계 "
-                        f"(신뢰도: {stage_determination_result.get('confidence')})"
-                    )
-                else:
-                    print(
-                        f"[2차 완료] 판단된 단계: {detected_stage}, "
-                        f"신뢰도: {stage_determination_result.get('confidence')}"
-                    )
-            else:
-                print(f"[발달 단계] 제공된 단계 사용: {stage}단계")
-                detected_stage = stage
-
-            # ----------------------------------------------------------
-            # 3단계: LLM 호출 → 단계별 상세 분석
-            # ----------------------------------------------------------
-            print(f"[3차 LLM] {detected_stage}단계 기준으로 상세 분석 중...")
-
-            if age_months is None and stage_determination_result:
-                estimated_age = stage_determination_result.get("age_months_estimate")
-                if estimated_age:
-                    age_months = estimated_age
-                    print(f"[개월 수] 판단 결과에서 추정: {age_months}개월")
+        return await self._generate_structured("stage", combined_prompt_stage, priority)
 
-            stage_prompt = self._load_vlm_prompt(
-                stage=detected_stage,
-                age_months=age_months,
-                video_duration_seconds=video_duration_seconds,
-            )
+    async def _analyze_stage_detail(
+        self,
+        metadata: dict,
+        stage: str,
+        age_months: Optional[int],
+        video_duration_seconds: Optional[float],
+        generation_params: Optional[dict],
+        priority: int,
+    ) -> dict:
+        """3단계: 단계별 프롬프트로 상세 분석 → 검증된 분석 결과 dict"""
+        stage_prompt = self._load_vlm_prompt(
+            stage=stage,
+            age_months=age_months,
+            video_duration_seconds=video_duration_seconds,
+        )
 
-            metadata_json_str = json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
+        metadata_json_str = json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
 
-            combined_prompt_detail = f"""[입력 방식 - 중요!]
+        combined_prompt_detail = f"""[입력 방식 - 중요!]
 비디오를 직접 보는 것이 아니라, 비디오에서 이미 추출된 메타데이터를 분석합니다.
 메타데이터에는 timeline_observations, behavior_summary, safety_observations 등이 포함되어 있습니다.
 
@@ -831,121 +757,563 @@ class GeminiService:
    - 모든 필수 필드를 포함할 것
 """
 
-            generation_config = None
-            if generation_params:
-                print(f"[Generation Config] 사용자 설정 적용: {generation_params}")
-                generation_config = genai.types.GenerationConfig(
-                    temperature=generation_params.get("temperature", 0.4),
-                    top_k=generation_params.get("top_k", 30),
-                    top_p=generation_params.get("top_p", 0.95),
+        params = None
+        if generation_params:
+            print(f"[Generation Config] 사용자 설정 적용: {generation_params}")
+            params = {
+                "temperature": generation_params.get("temperature", 0.4),
+                "top_k": generation_params.get("top_k", 30),
+                "top_p": generation_params.get("top_p", 0.95),
+            }
+
+        print("[Gemini API 호출 시작 (LLM 상세 분석 모드)]")
+        analysis_data = await self._generate_structured(
+            "detail", combined_prompt_detail, priority, params=params
+        )
+        print("[Gemini API 호출 완료]")
+        return analysis_data
+
+
+    async def _extract_metadata(
+        self,
+        chunk: PreprocessResult,
+        video_hash: str,
+        metadata_key: str,
+        mime_type: str,
+        vlm_params: dict,
+        priority: int,
+        chunk_count: int = 1,
+    ) -> Tuple[dict, str]:
+        """1단계: 영상(청크) 1개 → VLM 메타데이터 (청크 기준 timestamp) → (메타데이터, 캐시 상태 hit/miss)"""
+        cache = get_analysis_cache()
+        label = f" 청크 {format_timestamp(chunk.offset_seconds)}~" if chunk_count > 1 else ""
+
+        metadata = await asyncio.to_thread(cache.get, NAMESPACE_METADATA, metadata_key)
+        if metadata is not None:
+            print(f"[분석 캐시] 1차 메타데이터 적중{label} → VLM 호출 생략")
+            return metadata, "hit"
+
+        print(f"[1차 VLM] 비디오에서 메타데이터 추출 중...{label}")
+        video_part = await self._video_part(chunk, video_hash, mime_type)
+        metadata_prompt = self._load_prompt("vlm_metadata.ko.txt")
+        contents = [video_part, metadata_prompt]
+        if chunk.context_path:
+            # 크롭 영상: 전체 장면 썸네일을 앞에 붙이고 이미지 구성 안내 추가
+            context_image = await asyncio.to_thread(chunk.read_context)
+            contents = [
+                {"mime_type": "image/jpeg", "data": base64.b64encode(context_image).decode("utf-8")},
+                video_part,
+                metadata_prompt + ROI_PROMPT_NOTE,
+            ]
+
+        # temperature 0: 사실 기반 추출
+        metadata = await self._generate_structured(
+            "metadata",
+            contents,
+            priority,
+            params=vlm_params,
+        )
+        await asyncio.to_thread(cache.put, NAMESPACE_METADATA, metadata_key, metadata)
+        return metadata, "miss"
+
+    async def _video_part(self, chunk: PreprocessResult, video_hash: str, mime_type: str) -> dict:
+        """
+        1단계 영상 파트: 큰 영상은 File API 참조(디스크에서 스트리밍 업로드, 같은 해시면 재사용),
+        작은 영상이나 업로드 실패 시 base64 인라인
+        """
+        if 0 <= self.file_upload_min_bytes <= chunk.size and chunk.video_path:
+            try:
+                handle = await asyncio.to_thread(
+                    get_gemini_file_store().ensure_uploaded, chunk.video_path, mime_type, video_hash
+                )
+                self._record_video_part("file")
+                return handle.to_part()
+            except Exception as e:
+                self._record_video_part("file_fallback")
+                print(f"[File API] ⚠️ 업로드 실패 → base64 인라인으로 전송: {e}")
+
+        self._record_video_part("inline")
+        video_bytes = await asyncio.to_thread(chunk.read_bytes)
+        return {
+            "mime_type": mime_type,
+            "data": base64.b64encode(video_bytes).decode("utf-8"),
+        }
+
+    def _record_video_part(self, kind: str):
+        with self._stats_lock:
+            self._video_part_stats[kind] += 1
+
+    def get_video_part_stats(self) -> dict:
+        """1단계 영상 전달 방식별 횟수 + File API 업로드 통계"""
+        with self._stats_lock:
+            stats = dict(self._video_part_stats)
+        stats["file_upload_min_mb"] = round(self.file_upload_min_bytes / 1024 / 1024, 2)
+        stats["file_store"] = get_gemini_file_store().get_stats()
+        return stats
+
+    @staticmethod
+    async def _timed(coro) -> Tuple[Any, float]:
+        started = time.monotonic()
+        result = await coro
+        return result, time.monotonic() - started
+
+    async def _resolve_speculation(
+        self,
+        task: "asyncio.Task",
+        speculative_stage: str,
+        detected_stage: str,
+        stage_seconds: float,
+    ) -> Optional[dict]:
+        """
+        추측 실행한 3단계 결과 확인
+
+        Returns:
+            2단계 판단과 단계가 같으면 3단계 분석 결과, 다르거나 실패하면 None (3단계 재실행)
+        """
+        if str(detected_stage) != str(speculative_stage):
+            task.cancel()
+            self._record_speculation("misses")
+            print(f"[추측 실행] 불일치: 예상 {speculative_stage}단계 ≠ 판단 {detected_stage}단계 → 3차 재실행")
+            return None
+
+        try:
+            analysis_data, detail_seconds = await task
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record_speculation("failures")
+            print(f"[추측 실행] 3차 분석 실패 → 재실행: {e}")
+            return None
+
+        # 순차 실행(2단계 + 3단계) 대비 줄어든 시간 = 두 호출 중 짧은 쪽
+        saved = min(stage_seconds, detail_seconds)
+        self._record_speculation("hits", saved)
+        print(f"[추측 실행] 적중: {detected_stage}단계 결과 재사용 (약 {saved:.1f}초 단축)")
+        return analysis_data
+
+    def _record_speculation(self, outcome: str, saved_seconds: float = 0.0):
+        with self._stats_lock:
+            self._speculation_stats["attempts"] += 1
+            self._speculation_stats[outcome] += 1
+            self._speculation_stats["saved_seconds"] += saved_seconds
+
+    def get_speculation_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._speculation_stats)
+        attempts = stats["attempts"]
+        stats["enabled_by_default"] = self.speculative_stage_detail
+        stats["hit_rate"] = round(stats["hits"] / attempts, 3) if attempts else 0.0
+        stats["avg_saved_seconds"] = round(stats["saved_seconds"] / stats["hits"], 3) if stats["hits"] else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        return stats
+
+    # ------------------------------------------------------------------
+    # 메인 엔트리: 3단계 메타데이터 기반 분석
+    # ------------------------------------------------------------------
+    async def analyze_video_vlm(
+        self,
+        video_bytes: Optional[bytes] = None,
+        content_type: str = "video/mp4",
+        stage: Optional[str] = None,
+        age_months: Optional[int] = None,
+        generation_params: Optional[dict] = None,
+        video_path: Optional[str] = None,
+        priority: int = PRIORITY_UPLOAD,
+        stage_cache_key: Optional[str] = None,
+        speculative: Optional[bool] = None,
+        chunk_seconds: Optional[float] = None,
+        roi_crop: bool = False,
+    ) -> dict:
+        """
+        메타데이터 방식으로 비디오를 분석합니다.
+        3단계 프로세스:
+          1) VLM으로 메타데이터 추출 (영상 기반)
+          2) LLM으로 발달 단계 판단 (메타데이터 기반)
+          3) LLM으로 단계별 상세 분석 (메타데이터 + 단계별 프롬프트)
+
+        NOTE:
+          - 홈캠 8시간짜리 영상은 1시간 단위로 잘라서 이 함수에 전달하는 것을 권장합니다.
+          - 이 함수는 "최대 1시간 분량의 클립"을 한 번 분석하는 단위로 설계되었습니다.
+          - 디스크에 있는 비디오는 video_path로 넘기면 바이트를 읽어 임시 파일로 다시 쓰지 않습니다.
+          - priority: Gemini 호출 대기열 우선순위 (스케줄러는 PRIORITY_SEGMENT)
+          - 같은 (최적화 영상, 프롬프트 버전, 모델, 파라미터)의 결과는 분석 캐시에서 바로 반환합니다.
+          - stage_cache_key("user:{id}" / "camera:{id}")를 주면 검증된 발달 단계가 유효한 동안 2단계 판단을 생략합니다.
+          - speculative=True(기본값: GEMINI_SPECULATIVE_STAGE_DETAIL)이고 age_months가 있으면
+            개월 수 기반 단계로 3단계를 2단계와 동시에 실행하고, 단계가 다를 때만 3단계를 다시 실행합니다.
+          - chunk_seconds를 주면 긴 영상을 그 길이의 서브 클립으로 나눠 1단계를 청크별로 동시에 실행하고
+            (전역 Gemini 동시 호출 한도 안에서), 오프셋을 보정해 병합한 메타데이터로 2/3단계를 한 번 실행합니다.
+            청크별 메타데이터는 따로 캐시되므로 일부 청크 실패 후 재시도 시 성공한 청크는 다시 호출하지 않습니다.
+          - roi_crop=True면 0단계에서 움직임 영역(아이 주변)만 잘라 인코딩하고, 1단계에 전체 장면 썸네일을 함께 보냅니다.
+        """
+        chunks: List[PreprocessResult] = []
+        try:
+            mime_type = content_type or "video/mp4"
+
+            # ----------------------------------------------------------
+            # 0단계: 비디오 최적화 (해상도/FPS 다운샘플링) + 프로브 (프로세스 풀)
+            #        결과는 디스크에 남겨 두고 1단계에서 업로드/인라인 직전에만 읽음
+            # ----------------------------------------------------------
+            preprocessor = get_video_preprocessor()
+            chunked = False
+            missing_ranges = []
+            if chunk_seconds:
+                chunked_result = await preprocessor.preprocess_chunks(
+                    video_bytes=video_bytes,
+                    video_path=video_path,
+                    chunk_seconds=chunk_seconds,
+                    keep_file=True,
+                    roi=roi_crop,
+                )
+                chunks = chunked_result.chunks
+                chunked = chunked_result.chunked
+                missing_ranges = chunked_result.missing_ranges
+            else:
+                chunks = [
+                    await preprocessor.preprocess(
+                        video_bytes=video_bytes, video_path=video_path, keep_file=True, roi=roi_crop
+                    )
+                ]
+            video_bytes = None  # 업로드 원본 참조 해제 (이후에는 디스크의 최적화 파일만 사용)
+            # 청크 모드는 계획한 구간 수로 판단 (1개만 살아남아도 오프셋 보정/병합을 거침)
+            if chunked:
+                # 일부 청크가 실패해도 길이는 원본 영상 기준 (실패 구간은 missing_ranges로 표시)
+                preprocess_info = chunked_result.to_dict()
+                total_duration = chunked_result.duration
+            else:
+                preprocess_info = chunks[0].to_dict()
+                total_duration = chunks[0].duration
+            if missing_ranges:
+                print(
+                    f"[비디오 분석] ⚠️ 청크 {len(missing_ranges)}개 전처리 실패 → 부분 분석 "
+                    f"(누락 구간: {', '.join(f'{start:.0f}~{end:.0f}초' for start, end in missing_ranges)})"
                 )
 
-            print("[Gemini API 호출 시작 (LLM 상세 분석 모드)]")
-            response = self.model.generate_content(
-                combined_prompt_detail,
-                generation_config=generation_config,
+            # 0-1) 발달 단계 캐시 (유효한 단계가 있으면 2단계 LLM 생략)
+            stage_cache = get_stage_cache() if stage is None and stage_cache_key else None
+            cached_estimate = None
+            age_stage = (
+                self._determine_stage_from_age_months(age_months) if age_months is not None else None
+            )
+            if stage_cache is not None:
+                cached_estimate, reason = stage_cache.lookup(stage_cache_key, age_stage)
+                if cached_estimate is None:
+                    print(f"[단계 캐시] {stage_cache_key}: 2단계 판단 필요 ({reason})")
+
+            # 0-2) 분석 캐시 키 (영상 해시 + 프롬프트 버전 + 모델 + 파라미터)
+            cache = get_analysis_cache()
+            vlm_params = {"temperature": 0.0, "top_k": 30, "top_p": 0.95}
+            video_hashes = await asyncio.gather(
+                *(asyncio.to_thread(hash_file, chunk.video_path) for chunk in chunks)
+            )
+            video_hash = video_hashes[0]
+            metadata_keys = [
+                make_key(
+                    video=chunk_hash,
+                    mime_type=mime_type,
+                    prompt=extraction_prompt_version(),
+                    schema=SCHEMA_VERSION,
+                    model=DEFAULT_MODEL,
+                    params=vlm_params,
+                    **({"roi": chunk.roi} if chunk.roi else {}),
+                )
+                for chunk, chunk_hash in zip(chunks, video_hashes)
+            ]
+            result_key = make_key(
+                metadata=(
+                    [[chunk.offset_seconds, key] for chunk, key in zip(chunks, metadata_keys)]
+                    if chunked
+                    else metadata_keys[0]
+                ),
+                prompt=analysis_prompt_version(),
+                schema=SCHEMA_VERSION,
+                model=DEFAULT_MODEL,
+                params=generation_params or {},
+                stage=stage or (cached_estimate.stage if cached_estimate else None),
+                age_months=age_months,
+                duration=total_duration,
+                compaction=[COMPACTION_VERSION, self.MAX_TIMELINE_OBS, self.MAX_SAFETY_OBS, DEFAULT_TOKEN_BUDGET],
             )
-            print("[Gemini API 호출 완료]")
 
-            if not response or not hasattr(response, "text"):
-                raise ValueError("Gemini 상세 분석 응답이 올바르지 않습니다.")
+            # 부분 분석은 결과 캐시에 저장하지 않으므로 조회도 생략
+            cached_result = (
+                None if missing_ranges else await asyncio.to_thread(cache.get, NAMESPACE_RESULT, result_key)
+            )
+            if cached_result is not None:
+                print(f"[분석 캐시] 결과 적중 → Gemini 호출 생략 (영상 {video_hash[:12]})")
+                cached_result["_preprocess"] = preprocess_info
+                cached_result["_cache"] = {"metadata": "hit", "result": "hit"}
+                return cached_result
 
-            result_text = response.text.strip()
-            print(f"[Gemini 원본 응답 길이] {len(result_text)}자")
-            print(f"[Gemini 원본 응답 미리보기 (처음 500자)]\n{result_text[:500]}")
+            # ----------------------------------------------------------
+            # 1단계: VLM 호출 → 메타데이터 추출 (청크별 동시 실행, 캐시 적중 시 생략)
+            # ----------------------------------------------------------
+            extracted = await asyncio.gather(
+                *(
+                    self._extract_metadata(chunk, chunk_hash, key, mime_type, vlm_params, priority, len(chunks))
+                    for chunk, chunk_hash, key in zip(chunks, video_hashes, metadata_keys)
+                )
+            )
+            statuses = {status for _, status in extracted}
+            metadata_cache_status = statuses.pop() if len(statuses) == 1 else "partial"
 
-            try:
-                analysis_data = self._extract_and_parse_json(result_text)
-                print(f"[JSON 파싱 성공] 파싱된 키: {list(analysis_data.keys())}")
-
-                # 단계 판단 결과 추가
-                if stage_determination_result:
-                    analysis_data["stage_determination"] = {
-                        "detected_stage": stage_determination_result.get(
-                            "detected_stage"
-                        ),
-                        "confidence": stage_determination_result.get("confidence"),
-                        "evidence": stage_determination_result.get("evidence", []),
-                        "alternative_stages": stage_determination_result.get(
-                            "alternative_stages", []
-                        ),
-                    }
-
-                    if "meta" not in analysis_data:
-                        analysis_data["meta"] = {}
-
-                    if (
-                        "assumed_stage" not in analysis_data["meta"]
-                        or not analysis_data["meta"].get("assumed_stage")
-                    ):
-                        analysis_data["meta"]["assumed_stage"] = detected_stage
+            if chunked:
+                metadata = merge_chunk_metadata(
+                    [(chunk.offset_seconds, chunk_metadata) for chunk, (chunk_metadata, _) in zip(chunks, extracted)]
+                )
+                print(
+                    f"[1차 병합] 청크 {len(chunks)}/{len(chunked_result.planned_ranges)}개 메타데이터 병합 "
+                    f"(타임스탬프 오프셋 보정)"
+                )
+            else:
+                metadata = extracted[0][0]
+
+            print(
+                f"[1차 완료] 관찰 {len(metadata.get('timeline_observations', []))}개, "
+                f"안전 이벤트 {len(metadata.get('safety_observations', []))}개"
+            )
+
+            # 1-1) 비디오 길이 (전처리 프로브 결과 → 메타데이터 보정)
+            calculated_duration = total_duration
+            if calculated_duration:
+                video_duration_seconds = calculated_duration
+                if "video_metadata" not in metadata:
+                    metadata["video_metadata"] = {}
+                metadata["video_metadata"]["total_duration_seconds"] = calculated_duration
+                print(f"[비디오 길이] OpenCV 측정값 사용: {calculated_duration}초")
+            else:
+                video_duration_seconds = metadata.get("video_metadata", {}).get(
+                    "total_duration_seconds"
+                )
+                print(f"[비디오 길이] VLM 추정값 사용: {video_duration_seconds}초")
+
+            video_duration_minutes = (
+                round(video_duration_seconds / 60, 2)
+                if video_duration_seconds
+                else None
+            )
+            print(
+                f"[비디오 길이] {video_duration_seconds}초 ({video_duration_minutes}분)"
+            )
+
+            # 1-2) 메타데이터 압축 (영상 전체 분포 유지 + 토큰 예산, 토큰 절감)
+            metadata, compaction = compact_metadata(
+                metadata,
+                duration_seconds=video_duration_seconds,
+                max_timeline=self.MAX_TIMELINE_OBS,
+                max_safety=self.MAX_SAFETY_OBS,
+            )
+            print(
+                f"[메타데이터 압축] timeline_observations "
+                f"{compaction['timeline']['original']}개 → {compaction['timeline']['kept']}개 "
+                f"(구간 병합 {compaction['timeline']['runs']}개, 시간대 커버리지 {compaction['coverage']:.0%}), "
+                f"safety_observations {compaction['safety']['original']}개 → {compaction['safety']['kept']}개, "
+                f"추정 토큰 {compaction['tokens_before']} → {compaction['tokens_after']}"
+                f"{' (예산 초과)' if compaction['over_budget'] else ''}"
+            )
+
+            # ----------------------------------------------------------
+            # 2단계: LLM 호출 → 발달 단계 판단
+            # ----------------------------------------------------------
+            detected_stage = stage
+            stage_determination_result = None
+            initial_stage_from_age = None
+            speculative_task = None
+            stage_seconds = 0.0
 
-                    if age_months is None:
-                        estimated_age = stage_determination_result.get(
-                            "age_months_estimate"
+            if stage is None and cached_estimate is not None:
+                detected_stage = cached_estimate.stage
+                stage_determination_result = cached_estimate.to_determination()
+                print(
+                    f"[단계 캐시] {stage_cache_key}: {detected_stage}단계 사용 → 2차 LLM 생략 "
+                    f"(신뢰도: {cached_estimate.confidence})"
+                )
+            elif stage is None:
+                if age_months is not None:
+                    initial_stage_from_age = age_stage
+                    print(
+                        f"[발달 단계 초기화] age_months={age_months}개월 "
+                        f"→ 초기 단계: {initial_stage_from_age}단계"
+                    )
+
+                # 추측 실행: 개월 수 기반 단계로 3차 상세 분석을 2차 판단과 동시에 시작
+                if speculative is None:
+                    speculative = self.speculative_stage_detail
+                if speculative and initial_stage_from_age is not None:
+                    print(f"[추측 실행] {initial_stage_from_age}단계 기준 3차 분석을 2차 판단과 동시에 시작")
+                    speculative_task = asyncio.create_task(
+                        self._timed(
+                            self._analyze_stage_detail(
+                                metadata,
+                                initial_stage_from_age,
+                                age_months,
+                                video_duration_seconds,
+                                generation_params,
+                                priority,
+                            )
                         )
-                        if estimated_age and (
-                            "age_months" not in analysis_data["meta"]
-                            or analysis_data["meta"].get("age_months") is None
-                        ):
-                            analysis_data["meta"]["age_months"] = estimated_age
+                    )
+                    speculative_task.add_done_callback(_consume_task_result)
 
+                print("[2차 LLM] 메타데이터로 발달 단계 판단 중...")
+
+                stage_started = time.monotonic()
+                try:
+                    stage_determination_result = await self._determine_stage(
+                        metadata, age_months, initial_stage_from_age, priority
+                    )
+                    detected_stage = stage_determination_result.get("detected_stage")
+                    if not detected_stage:
+                        raise ValueError("발달 단계를 판단할 수 없습니다.")
+                except BaseException:
+                    if speculative_task is not None:
+                        speculative_task.cancel()
+                    raise
+                stage_seconds = time.monotonic() - stage_started
+
+                if stage_cache is not None:
+                    stage_cache.update(
+                        stage_cache_key,
+                        stage_determination_result,
+                        age_months=age_months,
+                        age_stage=age_stage,
+                    )
+
+                if initial_stage_from_age and detected_stage != initial_stage_from_age:
                     print(
-                        f"[2단계 정보 병합] 최종 발달 단계: {detected_stage}단계 "
+                        f"[발달 단계 조정] 초기 {initial_stage_from_age}단계 "
+                        f"→ AI 판단 {detected_stage}단계 "
                         f"(신뢰도: {stage_determination_result.get('confidence')})"
                     )
-
-                # 비디오 길이 meta 설정
-                if video_duration_minutes is not None:
-                    if "meta" not in analysis_data:
-                        analysis_data["meta"] = {}
-                    analysis_data["meta"][
-                        "observation_duration_minutes"
-                    ] = video_duration_minutes
+                else:
                     print(
-                        f"[비디오 길이 자동 설정] observation_duration_minutes: {video_duration_minutes}분"
+                        f"[2차 완료] 판단된 단계: {detected_stage}, "
+                        f"신뢰도: {stage_determination_result.get('confidence')}"
                     )
+            else:
+                print(f"[발달 단계] 제공된 단계 사용: {stage}단계")
+                detected_stage = stage
 
-                # safety_score / overall_safety_level 재계산
-                if "safety_analysis" in analysis_data:
-                    safety_analysis = analysis_data["safety_analysis"]
-                    safety_score, incident_summary = self._calculate_safety_score(
-                        safety_analysis
-                    )
-                    safety_analysis["safety_score"] = safety_score
-                    safety_analysis["incident_summary"] = incident_summary
+            # ----------------------------------------------------------
+            # 3단계: LLM 호출 → 단계별 상세 분석 (추측 실행 결과가 맞으면 재사용)
+            # ----------------------------------------------------------
+            analysis_data = None
+            if speculative_task is not None:
+                analysis_data = await self._resolve_speculation(
+                    speculative_task, initial_stage_from_age, detected_stage, stage_seconds
+                )
+
+            if analysis_data is None:
+                print(f"[3차 LLM] {detected_stage}단계 기준으로 상세 분석 중...")
+
+                if age_months is None and stage_determination_result:
+                    estimated_age = stage_determination_result.get("age_months_estimate")
+                    if estimated_age:
+                        age_months = estimated_age
+                        print(f"[개월 수] 판단 결과에서 추정: {age_months}개월")
+
+                analysis_data = await self._analyze_stage_detail(
+                    metadata,
+                    detected_stage,
+                    age_months,
+                    video_duration_seconds,
+                    generation_params,
+                    priority,
+                )
+            print(f"[JSON 검증 완료] 키: {list(analysis_data.keys())}")
+
+            # 단계 판단 결과 추가
+            if stage_determination_result:
+                analysis_data["stage_determination"] = {
+                    "detected_stage": stage_determination_result.get(
+                        "detected_stage"
+                    ),
+                    "confidence": stage_determination_result.get("confidence"),
+                    "evidence": stage_determination_result.get("evidence", []),
+                    "alternative_stages": stage_determination_result.get(
+                        "alternative_stages", []
+                    ),
+                    "cached": bool(stage_determination_result.get("cached")),
+                }
+
+                if "meta" not in analysis_data:
+                    analysis_data["meta"] = {}
+
+                if (
+                    "assumed_stage" not in analysis_data["meta"]
+                    or not analysis_data["meta"].get("assumed_stage")
+                ):
+                    analysis_data["meta"]["assumed_stage"] = detected_stage
 
-                    if isinstance(
-                        safety_analysis.get("safety_score"), (int, float)
+                if age_months is None:
+                    estimated_age = stage_determination_result.get(
+                        "age_months_estimate"
+                    )
+                    if estimated_age and (
+                        "age_months" not in analysis_data["meta"]
+                        or analysis_data["meta"].get("age_months") is None
                     ):
-                        score = safety_analysis["safety_score"]
-                        if score >= 90:
-                            level = "매우높음"
-                        elif score >= 75:
-                            level = "높음"
-                        elif score >= 65:
-                            level = "중간"
-                        elif score >= 55:
-                            level = "낮음"
-                        else:
-                            level = "매우낮음"
-                        safety_analysis["overall_safety_level"] = level
-                        print(
-                            f"[안전도 레벨 자동 설정] safety_score: {score} → overall_safety_level: {level}"
-                        )
+                        analysis_data["meta"]["age_months"] = estimated_age
 
-                # 디버깅용: 추출 메타데이터도 함께 반환
-                analysis_data["_extracted_metadata"] = metadata
+                print(
+                    f"[2단계 정보 병합] 최종 발달 단계: {detected_stage}단계 "
+                    f"(신뢰도: {stage_determination_result.get('confidence')})"
+                )
 
-                print("[3차 완료] 상세 분석 완료")
-                return analysis_data
+            # 비디오 길이 meta 설정
+            if video_duration_minutes is not None:
+                if "meta" not in analysis_data:
+                    analysis_data["meta"] = {}
+                analysis_data["meta"][
+                    "observation_duration_minutes"
+                ] = video_duration_minutes
+                print(
+                    f"[비디오 길이 자동 설정] observation_duration_minutes: {video_duration_minutes}분"
+                )
+
+            # safety_score / overall_safety_level 재계산
+            if "safety_analysis" in analysis_data:
+                safety_analysis = analysis_data["safety_analysis"]
+                safety_score, incident_summary = self._calculate_safety_score(
+                    safety_analysis
+                )
+                safety_analysis["safety_score"] = safety_score
+                safety_analysis["incident_summary"] = incident_summary
+
+                if isinstance(
+                    safety_analysis.get("safety_score"), (int, float)
+                ):
+                    score = safety_analysis["safety_score"]
+                    if score >= 90:
+                        level = "매우높음"
+                    elif score >= 75:
+                        level = "높음"
+                    elif score >= 65:
+                        level = "중간"
+                    elif score >= 55:
+                        level = "낮음"
+                    else:
+                        level = "매우낮음"
+                    safety_analysis["overall_safety_level"] = level
+                    print(
+                        f"[안전도 레벨 자동 설정] safety_score: {score} → overall_safety_level: {level}"
+                    )
 
-            except json.JSONDecodeError as json_err:
-                print("⚠️ JSON 파싱 실패.")
-                print(f"[추출된 JSON 텍스트 (처음 500자)]\n{result_text[:500]}")
-                print(f"[추출된 JSON 텍스트 (마지막 500자)]\n{result_text[-500:]}")
-                print(f"[에러 위치] {json_err}")
-                raise ValueError(f"AI 응답을 파싱할 수 없습니다: {str(json_err)}")
+            # 디버깅용: 추출 메타데이터와 전처리 소요 시간도 함께 반환
+            analysis_data["_extracted_metadata"] = metadata
+            analysis_data["_compaction"] = compaction
+            analysis_data["_preprocess"] = preprocess_info
+            if missing_ranges:
+                # 일부 구간이 빠진 결과: 표시만 하고 결과 캐시에는 저장하지 않음
+                # (재시도 시 성공한 청크는 메타데이터 캐시에서 재사용)
+                analysis_data["partial"] = True
+                analysis_data["missing_ranges"] = preprocess_info["missing_ranges"]
+                analysis_data["_cache"] = {"metadata": metadata_cache_status, "result": "skipped_partial"}
+            else:
+                await asyncio.to_thread(cache.put, NAMESPACE_RESULT, result_key, analysis_data)
+                analysis_data["_cache"] = {"metadata": metadata_cache_status, "result": "miss"}
+
+            print("[3차 완료] 상세 분석 완료")
+            return analysis_data
 
         except json.JSONDecodeError as e:
             import traceback
@@ -964,15 +1332,26 @@ class GeminiService:
             print(f"❌ Gemini 메타데이터 기반 비디오 분석 오류: {error_msg}")
             print(f"상세 에러:\n{error_trace}")
             raise Exception(f"비디오 분석 중 오류 발생: {error_msg}")
+        finally:
+            for chunk in chunks:
+                chunk.cleanup()
+
+
+def _consume_task_result(task: "asyncio.Task"):
+    """버려진 추측 실행 태스크의 예외를 회수 (경고 로그 방지)"""
+    if not task.cancelled():
+        task.exception()
 
 
-# 싱글톤 인스턴스
+# 싱글톤 인스턴스 (홈캠 라우터, 분석 스케줄러, 실시간 탐지기가 공유)
 _gemini_service: Optional[GeminiService] = None
+_gemini_service_lock = threading.Lock()
 
 
 def get_gemini_service() -> GeminiService:
     """Gemini 서비스 인스턴스를 반환합니다."""
     global _gemini_service
-    if _gemini_service is None:
-        _gemini_service = GeminiService()
-    return _gemini_service
+    with _gemini_service_lock:
+        if _gemini_service is None:
+            _gemini_service = GeminiService()
+        return _gemini_service
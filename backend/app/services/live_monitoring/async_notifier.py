@@ -0,0 +1,65 @@
+"""워커 스레드 → asyncio 이벤트 루프 변경 알림"""
+
+import asyncio
+import threading
+from typing import Optional, Set, Tuple
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class AsyncNotifier:
+    """
+    스레드 안전한 변경 알림
+
+    - 생산자(임의의 스레드)는 notify()만 호출
+    - 소비자(이벤트 루프)는 version을 읽고 상태를 확인한 뒤 wait(version)으로 대기
+      → 확인과 대기 사이에 발생한 알림도 놓치지 않음
+    - 여러 이벤트 루프의 대기자를 동시에 깨울 수 있음 (loop.call_soon_threadsafe)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+        self.version = 0
+
+    def notify(self):
+        """대기 중인 모든 소비자를 깨움"""
+        with self._lock:
+            self.version += 1
+            waiters = list(self._waiters)
+            self._waiters.clear()
+
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # 이벤트 루프가 이미 닫힘
+                pass
+
+    async def wait(self, version: int, timeout: Optional[float] = None) -> bool:
+        """
+        version 이후 알림이 올 때까지 대기
+
+        Returns:
+            알림을 받았으면 True, 타임아웃이면 False
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+
+        with self._lock:
+            if self.version != version:
+                return True
+            self._waiters.add(waiter)
+
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
@@ -0,0 +1,207 @@
+"""
+정규화된 소스 클립 캐시
+
+가짜 스트림 생성기가 실제로 쓰는 형식(640x480, target fps)으로 클립을 한 번만 변환해 둔다.
+변환은 백그라운드 스레드 1개가 순서대로 처리하고, 캐시가 준비되기 전에는 생성기가
+원본을 읽되 버릴 프레임은 grab()으로 디코딩 없이 건너뛴다.
+
+저장 위치: temp_videos/clip_cache/{원본이름}_{해시}_{W}x{H}_{fps}fps.mp4
+(해시 = 원본 경로 + mtime + 크기 → 원본이 바뀌면 새 캐시 파일)
+"""
+
+import hashlib
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+import cv2
+import numpy as np
+
+
+CACHE_ROOT = Path("temp_videos/clip_cache")
+
+
+def fit_frame(frame: np.ndarray, width: int, height: int) -> np.ndarray:
+    """높이 기준으로 리사이즈한 뒤 가운데 크롭 또는 좌우 패딩 (생성기와 동일한 규칙)"""
+    src_height, src_width = frame.shape[:2]
+    if src_height == height and src_width == width:
+        return frame
+
+    scale = height / src_height
+    new_width = int(src_width * scale)
+    frame = cv2.resize(frame, (new_width, height))
+
+    if new_width > width:
+        start_x = (new_width - width) // 2
+        # 슬라이스는 비연속 메모리 → VideoWriter/파이프용으로 연속 배열로 변환
+        frame = np.ascontiguousarray(frame[:, start_x:start_x + width])
+    elif new_width < width:
+        pad_left = (width - new_width) // 2
+        pad_right = width - new_width - pad_left
+        frame = cv2.copyMakeBorder(
+            frame, 0, 0, pad_left, pad_right,
+            cv2.BORDER_CONSTANT, value=(0, 0, 0)
+        )
+    return frame
+
+
+class ClipCache:
+    """
+    백그라운드 클립 변환기 + 캐시 조회
+
+    - get(): 캐시 파일이 있으면 경로 반환 (없으면 None)
+    - request()/prefetch(): 변환 작업 예약 (중복 예약은 무시)
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_ROOT):
+        self.cache_dir = cache_dir
+        self._queue: "queue.Queue[tuple[Path, Path, int, int, float]]" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        # 통계
+        self.transcoded_count = 0
+        self.failed_count = 0
+        self.transcode_seconds = 0.0
+
+    def cache_path(self, source: Path, width: int, height: int, fps: float) -> Optional[Path]:
+        """원본 클립 + 출력 형식에 해당하는 캐시 파일 경로 (원본이 없으면 None)"""
+        try:
+            stat = source.stat()
+        except OSError:
+            return None
+        key = f"{source.resolve().as_posix()}|{stat.st_mtime_ns}|{stat.st_size}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        return self.cache_dir / f"{source.stem}_{digest}_{width}x{height}_{fps:g}fps.mp4"
+
+    def get(self, source: Path, width: int, height: int, fps: float) -> Optional[Path]:
+        path = self.cache_path(source, width, height, fps)
+        if path and path.exists():
+            return path
+        return None
+
+    def request(self, source: Path, width: int, height: int, fps: float):
+        """변환 예약 (이미 캐시되었거나 예약된 클립은 무시)"""
+        dest = self.cache_path(source, width, height, fps)
+        if dest is None or dest.exists():
+            return
+
+        with self._lock:
+            if dest in self._pending:
+                return
+            self._pending.add(dest)
+            self._queue.put((source, dest, width, height, fps))
+            self._ensure_thread()
+
+    def prefetch(self, sources: Iterable[Path], width: int, height: int, fps: float):
+        """큐에 있는 클립들을 미리 변환 예약"""
+        for source in dict.fromkeys(sources):  # 순서 유지 + 중복 제거
+            self.request(source, width, height, fps)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="clip-transcoder", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                source, dest, width, height, fps = self._queue.get(timeout=30)
+            except queue.Empty:
+                # 유휴 상태면 스레드 종료 (다음 request 때 다시 시작)
+                with self._lock:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+
+            try:
+                started = time.time()
+                if self._transcode(source, dest, width, height, fps):
+                    self.transcoded_count += 1
+                    self.transcode_seconds += time.time() - started
+                    print(f"[클립 캐시] 변환 완료: {source.name} → {dest.name} ({time.time() - started:.1f}초)")
+                else:
+                    self.failed_count += 1
+            except Exception as e:
+                self.failed_count += 1
+                print(f"[클립 캐시] 변환 오류 ({source.name}): {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(dest)
+
+    def _transcode(self, source: Path, dest: Path, width: int, height: int, fps: float) -> bool:
+        """원본 → width x height @ fps (버릴 프레임은 grab()으로 디코딩 없이 건너뜀)"""
+        cap = cv2.VideoCapture(str(source))
+        if not cap.isOpened():
+            print(f"[클립 캐시] 영상 열기 실패: {source.name}")
+            return False
+
+        src_fps = cap.get(cv2.CAP_PROP_FPS)
+        if src_fps <= 0:
+            src_fps = 30.0
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = dest.with_name(dest.stem + ".part.mp4")
+        writer = cv2.VideoWriter(str(tmp_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        if not writer.isOpened():
+            cap.release()
+            print(f"[클립 캐시] VideoWriter 열기 실패: {tmp_path}")
+            return False
+
+        # 시간 기준 샘플링: 출력 프레임 k는 원본 시간 k/fps 이후 첫 프레임
+        frames_written = 0
+        source_index = 0
+        try:
+            while True:
+                next_source_index = int(frames_written * src_fps / fps + 1e-6)
+                if source_index < next_source_index:
+                    if not cap.grab():
+                        break
+                    source_index += 1
+                    continue
+
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                source_index += 1
+                writer.write(fit_frame(frame, width, height))
+                frames_written += 1
+        finally:
+            cap.release()
+            writer.release()
+
+        if frames_written == 0:
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+        os.replace(tmp_path, dest)
+        return True
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "transcoded": self.transcoded_count,
+            "failed": self.failed_count,
+            "transcode_seconds": round(self.transcode_seconds, 2),
+        }
+
+
+# 전역 클립 캐시 (변환 스레드 1개 공유)
+_clip_cache: Optional[ClipCache] = None
+_clip_cache_lock = threading.Lock()
+
+
+def get_clip_cache() -> ClipCache:
+    """클립 캐시 싱글톤"""
+    global _clip_cache
+    with _clip_cache_lock:
+        if _clip_cache is None:
+            _clip_cache = ClipCache()
+        return _clip_cache
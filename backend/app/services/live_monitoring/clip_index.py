@@ -0,0 +1,194 @@
+"""
+소스 클립 메타데이터 인덱스
+
+videos/{camera_id}의 클립마다 (경로, mtime, 크기) → 길이/fps/해상도/코덱을 디스크에 캐시한다.
+클립이 바뀌지 않았으면 cv2.VideoCapture로 다시 열지 않는다.
+
+저장 위치: {video_dir}/.clip_index.json
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import cv2
+
+
+INDEX_FILENAME = ".clip_index.json"
+
+
+class ClipMetadata:
+    """클립 1개의 메타데이터"""
+
+    def __init__(
+        self,
+        mtime: float,
+        size: int,
+        duration: float,
+        fps: float,
+        frame_count: int,
+        width: int,
+        height: int,
+        codec: str,
+    ):
+        self.mtime = mtime
+        self.size = size
+        self.duration = duration
+        self.fps = fps
+        self.frame_count = frame_count
+        self.width = width
+        self.height = height
+        self.codec = codec
+
+    def to_dict(self) -> dict:
+        return {
+            "mtime": self.mtime,
+            "size": self.size,
+            "duration": self.duration,
+            "fps": self.fps,
+            "frame_count": self.frame_count,
+            "width": self.width,
+            "height": self.height,
+            "codec": self.codec,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ClipMetadata":
+        return cls(
+            mtime=float(data["mtime"]),
+            size=int(data["size"]),
+            duration=float(data["duration"]),
+            fps=float(data["fps"]),
+            frame_count=int(data["frame_count"]),
+            width=int(data["width"]),
+            height=int(data["height"]),
+            codec=str(data.get("codec", "")),
+        )
+
+
+def probe_clip(path: Path, stat: Optional[os.stat_result] = None) -> Optional[ClipMetadata]:
+    """cv2로 클립을 열어 메타데이터 추출 (인덱스에 없거나 파일이 바뀐 경우에만 호출)"""
+    stat = stat or path.stat()
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if not cap.isOpened():
+            return None
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if fps <= 0:
+            fps = 30.0  # 기본값
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        codec = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ")
+
+        return ClipMetadata(
+            mtime=stat.st_mtime,
+            size=stat.st_size,
+            duration=frame_count / fps if frame_count > 0 else 0.0,
+            fps=fps,
+            frame_count=frame_count,
+            width=width,
+            height=height,
+            codec=codec,
+        )
+    finally:
+        cap.release()
+
+
+class ClipIndex:
+    """
+    디렉토리 1개의 클립 메타데이터 캐시
+
+    - get(): stat만 해서 mtime/크기가 같으면 캐시 사용, 다르면 다시 probe
+    - save(): 변경분이 있을 때만 원자적으로 저장 (임시 파일 → os.replace)
+    """
+
+    def __init__(self, video_dir: Path):
+        self.video_dir = video_dir
+        self.index_path = video_dir / INDEX_FILENAME
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, ClipMetadata] = {}
+        self._dirty = False
+        self.probe_count = 0
+
+        self._load()
+
+    def _load(self):
+        if not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for key, value in data.get("clips", {}).items():
+                self._entries[key] = ClipMetadata.from_dict(value)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[클립 인덱스] 인덱스 파일 무시 ({self.index_path}): {e}")
+            self._entries = {}
+
+    def _key(self, path: Path) -> str:
+        try:
+            return path.resolve().relative_to(self.video_dir.resolve()).as_posix()
+        except ValueError:
+            return path.resolve().as_posix()
+
+    def get(self, path: Path) -> Optional[ClipMetadata]:
+        """클립 메타데이터 (캐시 미스면 probe 후 인덱스에 추가)"""
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+
+        key = self._key(path)
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached and cached.mtime == stat.st_mtime and cached.size == stat.st_size:
+            return cached
+
+        metadata = probe_clip(path, stat)
+        if metadata is None:
+            print(f"[클립 인덱스] 영상 열기 실패: {path.name}")
+            return None
+
+        with self._lock:
+            self._entries[key] = metadata
+            self._dirty = True
+            self.probe_count += 1
+        return metadata
+
+    def save(self):
+        """변경된 인덱스를 디스크에 저장"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"clips": {key: meta.to_dict() for key, meta in self._entries.items()}}
+            self._dirty = False
+
+        try:
+            tmp_path = self.index_path.with_suffix(".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"[클립 인덱스] 저장 실패 ({self.index_path}): {e}")
+
+
+# 전역 인덱스 관리 (디렉토리당 1개)
+_indexes: Dict[str, ClipIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_clip_index(video_dir: Path) -> ClipIndex:
+    """디렉토리별 클립 인덱스 싱글톤"""
+    key = str(Path(video_dir).resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = ClipIndex(Path(video_dir))
+            _indexes[key] = index
+        return index
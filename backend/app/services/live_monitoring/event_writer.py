@@ -0,0 +1,280 @@
+"""
+실시간 이벤트 일괄 저장 (프로세스 전역)
+
+RealtimeEventDetector.save_events는 이벤트 몇 개마다 세션을 새로 열고 커밋했고,
+스트림 프레임 루프와 Gemini 분석 태스크가 그 완료를 기다렸다.
+- submit(): 메모리 대기열에 넣고 바로 반환 (이벤트 루프/워커 스레드 어디서든 블로킹 없음)
+- 전용 스레드가 flush_interval_ms마다 또는 batch_size개가 모이면 여러 카메라 이벤트를 INSERT 1번(executemany)으로 저장
+- DB 오류는 백오프 후 같은 배치를 재시도, 한도를 넘으면 한 행씩 저장해 문제 행만 버림
+- 대기열이 max_pending을 넘으면 가장 오래된 safe/info 이벤트부터 버림 (danger/warning 우선 보존)
+- sync=True(REALTIME_EVENT_WRITER=sync)면 대기열 없이 호출 스레드에서 바로 저장 (테스트/스크립트용)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert
+
+from app.database.session import SessionLocal
+from app.models.live_monitoring.models import RealtimeEvent
+
+
+# 대기열이 가득 찼을 때도 버리지 않는 심각도
+CRITICAL_SEVERITIES = ("danger", "warning")
+
+EVENT_COLUMNS = (
+    "camera_id",
+    "timestamp",
+    "event_type",
+    "severity",
+    "title",
+    "description",
+    "location",
+    "event_metadata",
+)
+
+
+def event_to_row(event: RealtimeEvent) -> dict:
+    """ORM 객체 → INSERT 행 (created_at은 컬럼 기본값)"""
+    return {column: getattr(event, column) for column in EVENT_COLUMNS}
+
+
+class EventWriter:
+    """
+    RealtimeEvent 일괄 저장기
+
+    - submit(events): 대기열에 추가, 받아들인 개수 반환
+    - flush(timeout): 지금까지 넣은 이벤트가 저장될 때까지 대기 (종료/테스트용)
+    - stop(): 남은 이벤트를 저장하고 스레드 종료
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        sync: Optional[bool] = None,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or int(os.getenv("REALTIME_EVENT_BATCH_SIZE", "200"))
+        self.flush_interval = (flush_interval_ms or float(os.getenv("REALTIME_EVENT_FLUSH_MS", "500"))) / 1000.0
+        self.max_pending = max_pending or int(os.getenv("REALTIME_EVENT_QUEUE_MAX", "10000"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("REALTIME_EVENT_MAX_RETRIES", "5"))
+        self.sync = sync if sync is not None else os.getenv("REALTIME_EVENT_WRITER", "async") == "sync"
+        self.retry_base_delay = 0.5
+        self.retry_max_delay = 30.0
+
+        self._pending: Deque[dict] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._submitted_seq = 0   # 받아들인 이벤트 누적 수
+        self._done_seq = 0        # 저장/폐기가 끝난 이벤트 누적 수
+
+        # 통계
+        self.written = 0
+        self.dropped: Dict[str, int] = {}
+        self.flushes = 0
+        self.retries = 0
+        self.max_batch = 0
+        self.total_flush_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # 생산자
+    # ------------------------------------------------------------------
+    def submit(self, events: Iterable[RealtimeEvent]) -> int:
+        rows = [event_to_row(event) for event in events]
+        if not rows:
+            return 0
+        if self.sync:
+            try:
+                self._write_batch(rows)
+            except Exception as e:
+                self.last_error = str(e)
+                self._record_drop("db_error", len(rows))
+                print(f"[실시간 탐지] 이벤트 저장 실패: {e}")
+                return 0
+            return len(rows)
+
+        accepted = 0
+        with self._cond:
+            for row in rows:
+                if len(self._pending) >= self.max_pending and not self._make_room(row):
+                    self._record_drop("queue_full")
+                    continue
+                self._pending.append(row)
+                accepted += 1
+            self._submitted_seq += accepted
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        self._ensure_thread()
+        return accepted
+
+    def _make_room(self, row: dict) -> bool:
+        """[lock 보유] 가장 오래된 safe/info 이벤트 1개를 버려 자리 확보 (새 이벤트도 safe/info면 새 이벤트를 버림)"""
+        if row.get("severity") not in CRITICAL_SEVERITIES:
+            return False
+        for index, pending in enumerate(self._pending):
+            if pending.get("severity") not in CRITICAL_SEVERITIES:
+                del self._pending[index]
+                self._submitted_seq -= 1
+                self._record_drop("evicted")
+                return True
+        return False
+
+    def _record_drop(self, reason: str, count: int = 1):
+        self.dropped[reason] = self.dropped.get(reason, 0) + count
+
+    def _ensure_thread(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="realtime-event-writer", daemon=True)
+            self._thread.start()
+        print(
+            f"[이벤트 저장] 일괄 저장 스레드 시작 ({self.flush_interval * 1000:.0f}ms 또는 {self.batch_size}개마다)"
+        )
+
+    # ------------------------------------------------------------------
+    # 저장 스레드
+    # ------------------------------------------------------------------
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopping and not self._pending:
+                    return
+                count = min(len(self._pending), self.batch_size)
+                batch = [self._pending.popleft() for _ in range(count)]
+
+            if batch:
+                self._flush_batch(batch)
+                with self._cond:
+                    self._done_seq += len(batch)
+                    self._cond.notify_all()
+
+    def _flush_batch(self, batch: List[dict]):
+        """재시도 포함 배치 1개 저장 (한도를 넘으면 한 행씩 저장해 문제 행만 버림)"""
+        delay = self.retry_base_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._write_batch(batch)
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                if attempt == self.max_retries:
+                    break
+                self.retries += 1
+                print(f"[이벤트 저장] ⚠️ {len(batch)}개 저장 실패, {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries}): {e}")
+                with self._cond:
+                    # 종료 중이면 오래 기다리지 않음
+                    self._cond.wait_for(lambda: self._stopping, timeout=delay)
+                delay = min(delay * 2, self.retry_max_delay)
+
+        print(f"[이벤트 저장] ⚠️ 재시도 한도 초과 → {len(batch)}개를 한 행씩 저장")
+        for row in batch:
+            try:
+                self._write_batch([row])
+            except Exception as e:
+                self.last_error = str(e)
+                self._record_drop("db_error")
+                print(f"[이벤트 저장] 이벤트 버림 ({row.get('camera_id')}, {row.get('title')}): {e}")
+
+    def _write_batch(self, rows: List[dict]):
+        started = time.monotonic()
+        db = self.session_factory()
+        try:
+            db.execute(insert(RealtimeEvent), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        elapsed = time.monotonic() - started
+        self.written += len(rows)
+        self.flushes += 1
+        self.max_batch = max(self.max_batch, len(rows))
+        self.total_flush_seconds += elapsed
+        if self.sync:
+            print(f"[실시간 탐지] {len(rows)}개 이벤트 저장됨")
+
+    # ------------------------------------------------------------------
+    # 제어
+    # ------------------------------------------------------------------
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        지금까지 submit한 이벤트가 모두 처리될 때까지 대기
+
+        Returns:
+            제한 시간 안에 끝났으면 True
+        """
+        if self.sync:
+            return True
+        with self._cond:
+            target = self._submitted_seq
+            if self._done_seq >= target:
+                return True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._done_seq >= target, timeout=timeout)
+
+    def stop(self, timeout: float = 10.0):
+        """남은 이벤트 저장 후 스레드 종료 (앱 종료 시)"""
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        thread.join(timeout)
+        if thread.is_alive():
+            print(f"[이벤트 저장] ⚠️ 제한 시간 안에 종료되지 않았습니다 (대기 {len(self._pending)}개)")
+        else:
+            print(f"[이벤트 저장] 종료 (누적 저장 {self.written}개)")
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        flushes = self.flushes
+        return {
+            "mode": "sync" if self.sync else "async",
+            "batch_size": self.batch_size,
+            "flush_interval_ms": round(self.flush_interval * 1000),
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "written": self.written,
+            "flushes": flushes,
+            "avg_batch_size": round(self.written / flushes, 2) if flushes else 0.0,
+            "max_batch_size": self.max_batch,
+            "avg_flush_ms": round(self.total_flush_seconds / flushes * 1000, 2) if flushes else 0.0,
+            "retries": self.retries,
+            "dropped": dict(self.dropped),
+            "last_error": self.last_error,
+        }
+
+
+# 싱글톤 인스턴스
+_event_writer: Optional[EventWriter] = None
+_event_writer_lock = threading.Lock()
+
+
+def get_event_writer() -> EventWriter:
+    """실시간 이벤트 일괄 저장기 인스턴스를 반환합니다."""
+    global _event_writer
+    with _event_writer_lock:
+        if _event_writer is None:
+            _event_writer = EventWriter()
+        return _event_writer
@@ -5,7 +5,10 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional
 import asyncio
-from app.services.live_monitoring.video_queue import VideoQueue
+from app.services.live_monitoring.clip_cache import get_clip_cache
+from app.services.live_monitoring.frame_pool import FrameBufferPool
+from app.services.live_monitoring.video_queue import QueuedClip, VideoQueue
+from app.services.live_monitoring.segment_manifest import KIND_HOURLY, SegmentRecord, get_segment_manifest
 
 
 class FakeLiveStreamGenerator:
@@ -23,12 +26,19 @@ class FakeLiveStreamGenerator:
         self.current_writer: Optional[cv2.VideoWriter] = None
         self.current_hour_start: Optional[datetime] = None
         self.current_file_path: Optional[Path] = None
+        self.current_file_started_at: Optional[datetime] = None
+        self.current_frames_written = 0
         self.is_running = False
         
+        # 완료된 시간대 파일 매니페스트
+        self.manifest = get_segment_manifest(camera_id)
+        
         # 프레임 크기 (480p)
         self.target_width = 640
         self.target_height = 480
         self.target_fps = 1.0  # 분석용 1fps
+        # 프레임은 VideoWriter에만 쓰므로 출력 버퍼 1개를 계속 재사용
+        self.frame_pool = FrameBufferPool(self.target_width, self.target_height, size=1)
         
     async def start_streaming(self):
         """스트리밍 시작 (비동기)"""
@@ -39,6 +49,12 @@ class FakeLiveStreamGenerator:
             print(f"[스트림 생성기] 오류: 재생할 영상이 없습니다")
             return
         
+        # 큐에 있는 클립을 640x480 @ target_fps로 미리 변환 (백그라운드)
+        get_clip_cache().prefetch(
+            (clip.path for clip in self.video_queue.current_queue),
+            self.target_width, self.target_height, self.target_fps
+        )
+        
         self.is_running = True
         
         # 현재 시간 기준으로 첫 시간대 시작
@@ -50,12 +66,12 @@ class FakeLiveStreamGenerator:
         
         # 영상 재생 루프
         while self.is_running:
-            video_path = self.video_queue.get_next_video()
-            if not video_path:
+            clip = self.video_queue.get_next_clip()
+            if not clip:
                 print(f"[스트림 생성기] 경고: 다음 영상이 없습니다")
                 break
             
-            await self._play_video_async(video_path)
+            await self._play_video_async(clip)
             
             # 시간대가 바뀌었는지 확인
             now = datetime.now()
@@ -69,72 +85,71 @@ class FakeLiveStreamGenerator:
         self._finalize_current_hour()
         print(f"[스트림 생성기] 종료: {self.camera_id}")
     
-    async def _play_video_async(self, video_path: Path):
+    async def _play_video_async(self, clip: QueuedClip):
         """
         단일 영상을 비동기로 재생하여 버퍼에 추가
         """
         # CPU 블로킹 작업을 별도 스레드에서 실행
-        await asyncio.to_thread(self._play_video, video_path)
+        await asyncio.to_thread(self._play_video, clip)
     
-    def _play_video(self, video_path: Path):
+    def _play_video(self, clip: QueuedClip):
         """단일 영상을 재생하여 버퍼에 추가"""
-        cap = cv2.VideoCapture(str(video_path))
+        video_path = clip.path
+        clip_cache = get_clip_cache()
+        cached_path = clip_cache.get(video_path, self.target_width, self.target_height, self.target_fps)
+
+        if cached_path:
+            # 캐시된 클립은 이미 640x480 @ target_fps → 리사이즈/샘플링 불필요
+            cap = cv2.VideoCapture(str(cached_path))
+            fps = self.target_fps
+            max_frames = max(1, round(clip.play_seconds * self.target_fps))
+        else:
+            # 캐시가 준비될 때까지는 원본을 읽고, 변환은 백그라운드로 예약
+            clip_cache.request(video_path, self.target_width, self.target_height, self.target_fps)
+            cap = cv2.VideoCapture(str(video_path))
+            # FPS는 클립 인덱스 값 사용 (큐의 마지막 클립은 목표 시간에 맞춰 잘림)
+            fps = clip.metadata.fps
+            max_frames = clip.max_frames
         
         if not cap.isOpened():
             print(f"[스트림 생성기] 오류: 영상 열기 실패 - {video_path.name}")
             return
         
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        if fps <= 0:
-            fps = 30.0  # 기본값
-        
         # 프레임 샘플링 (1fps로 다운샘플링)
         frame_skip = int(fps / self.target_fps) if fps > self.target_fps else 1
         
         frame_count = 0
         frames_written = 0
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
+        decode_buffer = None  # cap.read가 재사용하는 디코딩 버퍼
+        
+        while cap.isOpened() and frame_count < max_frames:
+            # 버릴 프레임은 grab()만 해서 디코딩 비용 절약
+            if frame_count % frame_skip != 0:
+                if not cap.grab():
+                    break
+                frame_count += 1
+                continue
+
+            ret, decode_buffer = cap.read(decode_buffer)
             if not ret:
                 break
             
-            # 프레임 샘플링
-            if frame_count % frame_skip == 0:
-                # 시간대 확인 (1시간 지났는지)
-                now = datetime.now()
-                hour_start = now.replace(minute=0, second=0, microsecond=0)
-                if hour_start != self.current_hour_start:
-                    self._finalize_current_hour()
-                    self.current_hour_start = hour_start
-                    self._start_new_hour_file()
-                
-                # 프레임 크기 조정 (480p)
-                height, width = frame.shape[:2]
-                if height != self.target_height or width != self.target_width:
-                    # 비율 유지하면서 리사이즈
-                    scale = self.target_height / height
-                    new_width = int(width * scale)
-                    frame = cv2.resize(frame, (new_width, self.target_height))
-                    
-                    # 중앙 크롭 또는 패딩
-                    if new_width > self.target_width:
-                        # 크롭
-                        start_x = (new_width - self.target_width) // 2
-                        frame = frame[:, start_x:start_x + self.target_width]
-                    elif new_width < self.target_width:
-                        # 패딩
-                        pad_left = (self.target_width - new_width) // 2
-                        pad_right = self.target_width - new_width - pad_left
-                        frame = cv2.copyMakeBorder(
-                            frame, 0, 0, pad_left, pad_right,
-                            cv2.BORDER_CONSTANT, value=(0, 0, 0)
-                        )
-                
-                # 프레임을 현재 시간대 버퍼에 쓰기
-                if self.current_writer and self.is_running:
-                    self.current_writer.write(frame)
-                    frames_written += 1
+            # 시간대 확인 (1시간 지났는지)
+            now = datetime.now()
+            hour_start = now.replace(minute=0, second=0, microsecond=0)
+            if hour_start != self.current_hour_start:
+                self._finalize_current_hour()
+                self.current_hour_start = hour_start
+                self._start_new_hour_file()
+            
+            # 프레임 크기 조정 (480p, 비율 유지 + 중앙 크롭/패딩)
+            frame = self.frame_pool.fit_into(decode_buffer, self.frame_pool.acquire())
+            
+            # 프레임을 현재 시간대 버퍼에 쓰기
+            if self.current_writer and self.is_running:
+                self.current_writer.write(frame)
+                frames_written += 1
+                self.current_frames_written += 1
             
             frame_count += 1
         
@@ -148,6 +163,8 @@ class FakeLiveStreamGenerator:
         
         filename = f"hourly_{self.current_hour_start.strftime('%Y%m%d_%H%M%S')}.mp4"
         self.current_file_path = self.buffer_dir / filename
+        self.current_file_started_at = datetime.now()
+        self.current_frames_written = 0
         
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         self.current_writer = cv2.VideoWriter(
@@ -173,6 +190,17 @@ class FakeLiveStreamGenerator:
             if self.current_file_path and self.current_file_path.exists():
                 file_size = self.current_file_path.stat().st_size / (1024 * 1024)  # MB
                 print(f"[스트림 생성기] 시간대 파일 저장 완료: {self.current_file_path.name} ({file_size:.2f}MB)")
+                
+                if self.current_frames_written > 0:
+                    self.manifest.append(SegmentRecord(
+                        path=str(self.current_file_path),
+                        start_time=self.current_file_started_at,
+                        end_time=datetime.now(),
+                        frame_count=self.current_frames_written,
+                        fps=self.target_fps,
+                        byte_size=self.current_file_path.stat().st_size,
+                        kind=KIND_HOURLY,
+                    ))
             else:
                 print(f"[스트림 생성기] 경고: 파일이 생성되지 않았습니다")
     
@@ -0,0 +1,182 @@
+"""
+카메라별 프레임 버퍼 풀
+
+스트림 생성기가 프레임마다 새 배열을 만들지 않도록 640x480 BGR 버퍼를 미리 할당해 돌려 쓴다.
+- 디코딩(cap.read)/리사이즈(cv2.resize)는 풀 버퍼에 직접 씀
+- FFmpeg 파이프에는 memoryview로 전달 (tobytes() 복사 없음)
+- 탐지기/Gemini에는 복사본 대신 풀 프레임 참조를 넘기고, 그동안 hold()로 재사용을 막음
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameBufferPool:
+    """
+    고정 크기 프레임 버퍼 풀
+
+    - acquire(): hold되지 않은 버퍼를 순서대로 돌려줌 (모두 hold 중이면 버퍼 1개 추가 할당)
+    - hold()/release(): 워커 스레드 밖에서 프레임을 보관하는 동안 재사용 방지 (참조 카운트)
+    - fit_into(): 원본 프레임을 높이 기준 리사이즈 + 가운데 크롭/좌우 패딩으로 풀 버퍼에 씀
+    """
+
+    def __init__(self, width: int, height: int, size: int = 12):
+        self.width = width
+        self.height = height
+        self.shape = (height, width, 3)
+
+        self._lock = threading.Lock()
+        self._buffers: List[np.ndarray] = [np.zeros(self.shape, dtype=np.uint8) for _ in range(size)]
+        self._holds: List[int] = [0] * size
+        self._index_by_address: Dict[int, int] = {
+            buffer.ctypes.data: i for i, buffer in enumerate(self._buffers)
+        }
+        self._next = 0
+
+        # 원본 해상도별 리사이즈 중간 버퍼 (크롭이 필요한 경우에만 사용)
+        self._scratch: Dict[Tuple[int, int], np.ndarray] = {}
+
+        # 통계
+        self.acquired_count = 0
+        self.grown_count = 0
+
+    def acquire(self) -> np.ndarray:
+        """재사용 가능한 버퍼 1개 (내용은 이전 프레임일 수 있음)"""
+        with self._lock:
+            self.acquired_count += 1
+            size = len(self._buffers)
+            for offset in range(size):
+                index = (self._next + offset) % size
+                if self._holds[index] == 0:
+                    self._next = (index + 1) % size
+                    return self._buffers[index]
+
+            # 모든 버퍼가 hold 중 (소비자가 밀림) → 풀 확장
+            buffer = np.zeros(self.shape, dtype=np.uint8)
+            self._buffers.append(buffer)
+            self._holds.append(0)
+            self._index_by_address[buffer.ctypes.data] = size
+            self.grown_count += 1
+            return buffer
+
+    def hold(self, frame: np.ndarray):
+        """프레임 재사용 방지 (풀 버퍼가 아니면 무시)"""
+        with self._lock:
+            index = self._index_by_address.get(frame.ctypes.data)
+            if index is not None:
+                self._holds[index] += 1
+
+    def release(self, frame: Optional[np.ndarray]):
+        """hold 해제 (풀 버퍼가 아니거나 hold되지 않은 프레임이면 무시)"""
+        if frame is None:
+            return
+        with self._lock:
+            index = self._index_by_address.get(frame.ctypes.data)
+            if index is not None and self._holds[index] > 0:
+                self._holds[index] -= 1
+
+    def owns(self, frame: np.ndarray) -> bool:
+        """풀 버퍼인지 여부"""
+        with self._lock:
+            return frame.ctypes.data in self._index_by_address
+
+    def release_all(self):
+        """모든 hold 해제 (스트림 재시작 시)"""
+        with self._lock:
+            self._holds = [0] * len(self._buffers)
+
+    def fit_into(self, frame: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """
+        높이 기준 리사이즈 후 가운데 크롭 또는 좌우 패딩 결과를 dst에 씀 (새 배열 할당 없음)
+
+        규칙은 clip_cache.fit_frame과 동일
+        """
+        src_height, src_width = frame.shape[:2]
+        if src_height == self.height and src_width == self.width:
+            if frame.ctypes.data != dst.ctypes.data:
+                np.copyto(dst, frame)
+            return dst
+
+        new_width = int(src_width * (self.height / src_height))
+
+        if new_width > self.width:
+            # 크롭: 전체 폭으로 중간 버퍼에 리사이즈한 뒤 가운데만 복사
+            scratch = self._scratch.get((src_height, src_width))
+            if scratch is None or scratch.shape[1] != new_width:
+                scratch = np.empty((self.height, new_width, 3), dtype=np.uint8)
+                self._scratch[(src_height, src_width)] = scratch
+            cv2.resize(frame, (new_width, self.height), dst=scratch)
+            start_x = (new_width - self.width) // 2
+            np.copyto(dst, scratch[:, start_x:start_x + self.width])
+        elif new_width < self.width:
+            # 패딩: dst의 가운데 영역에 직접 리사이즈하고 좌우는 검은색
+            pad_left = (self.width - new_width) // 2
+            dst[:, :pad_left] = 0
+            dst[:, pad_left + new_width:] = 0
+            cv2.resize(frame, (new_width, self.height), dst=dst[:, pad_left:pad_left + new_width])
+        else:
+            cv2.resize(frame, (self.width, self.height), dst=dst)
+        return dst
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            held = sum(1 for count in self._holds if count > 0)
+            size = len(self._buffers)
+        return {
+            "size": size,
+            "held": held,
+            "acquired": self.acquired_count,
+            "grown": self.grown_count,
+        }
+
+
+def write_frame(stream, frame: np.ndarray):
+    """
+    프레임을 파이프에 memoryview로 기록 (tobytes() 복사 없음)
+
+    bufsize=0 파이프(FileIO)는 부분 쓰기를 할 수 있으므로 남은 바이트를 이어서 씀
+    """
+    view = memoryview(frame).cast('B')
+    written = 0
+    total = len(view)
+    while written < total:
+        count = stream.write(view[written:])
+        if count is None:
+            continue
+        written += count
+
+
+def read_frame_into(stream, frame: np.ndarray) -> bool:
+    """
+    파이프에서 프레임 1개 분량을 버퍼에 바로 읽음 (read()의 bytes 할당 없음)
+
+    Returns:
+        프레임을 끝까지 읽었는지 여부 (EOF면 False)
+    """
+    view = memoryview(frame).cast('B')
+    filled = 0
+    total = len(view)
+    while filled < total:
+        count = stream.readinto(view[filled:])
+        if not count:
+            return False
+        filled += count
+    return True
+
+
+# 전역 풀 관리 (카메라당 1개)
+_pools: Dict[str, FrameBufferPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_frame_pool(camera_id: str, width: int, height: int, size: int = 12) -> FrameBufferPool:
+    """카메라별 프레임 버퍼 풀 싱글톤 (해상도가 바뀌면 새로 만듦)"""
+    with _pools_lock:
+        pool = _pools.get(camera_id)
+        if pool is None or pool.width != width or pool.height != height:
+            pool = FrameBufferPool(width, height, size)
+            _pools[camera_id] = pool
+        return pool
@@ -0,0 +1,385 @@
+"""
+카메라별 인메모리 HLS 저장소
+
+HLS 생성기가 FFmpeg 출력(.m3u8 + 최신 .ts)을 발행하고, 라우터는 디스크 대신 여기서 응답한다.
+- 플레이리스트/세그먼트마다 ETag 계산 (If-None-Match → 304)
+- 새 플레이리스트 발행 시 대기 중인 요청을 깨움 (blocking playlist reload: _HLS_msn)
+- 저지연 모드(LL-HLS): FFmpeg가 만든 짧은 .ts를 partial segment로 받아
+  부모 세그먼트로 묶고 EXT-X-PART / EXT-X-PRELOAD-HINT 플레이리스트를 직접 생성
+"""
+
+import asyncio
+import hashlib
+import math
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.services.live_monitoring.async_notifier import AsyncNotifier
+
+
+PLAYLIST_MEDIA_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_MEDIA_TYPE = "video/mp2t"
+
+
+def parse_media_playlist(text: str) -> Tuple[int, List[str]]:
+    """미디어 플레이리스트에서 (EXT-X-MEDIA-SEQUENCE, 세그먼트 URI 목록) 추출"""
+    media_sequence = 0
+    segments = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            try:
+                media_sequence = int(line.split(':', 1)[1])
+            except ValueError:
+                pass
+        elif not line.startswith('#'):
+            segments.append(line)
+    return media_sequence, segments
+
+
+def parse_playlist_entries(text: str) -> Tuple[int, List[Tuple[str, float, Optional[str]]]]:
+    """미디어 플레이리스트에서 (EXT-X-MEDIA-SEQUENCE, [(URI, 길이, PROGRAM-DATE-TIME)]) 추출"""
+    media_sequence = 0
+    entries = []
+    duration = 0.0
+    program_time = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            try:
+                media_sequence = int(line.split(':', 1)[1])
+            except ValueError:
+                pass
+        elif line.startswith('#EXTINF:'):
+            try:
+                duration = float(line.split(':', 1)[1].split(',', 1)[0])
+            except ValueError:
+                duration = 0.0
+        elif line.startswith('#EXT-X-PROGRAM-DATE-TIME:'):
+            program_time = line.split(':', 1)[1]
+        elif not line.startswith('#'):
+            entries.append((line, duration, program_time))
+            duration = 0.0
+            program_time = None
+    return media_sequence, entries
+
+
+def _parse_program_time(value: Optional[str]) -> Optional[float]:
+    """PROGRAM-DATE-TIME 문자열 → epoch 초"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class HLSPart:
+    """LL-HLS partial segment 1개"""
+
+    def __init__(self, seq: int, name: str, duration: float, program_time: Optional[str]):
+        self.seq = seq
+        self.name = name
+        self.duration = duration
+        self.program_time = program_time
+        self.published_at = time.time()
+
+
+class HLSEntry:
+    """저장소에 보관된 파일 1개"""
+
+    def __init__(self, data: bytes, media_type: str):
+        self.data = data
+        self.media_type = media_type
+        self.etag = f'"{hashlib.md5(data).hexdigest()}"'
+        self.published_at = time.time()
+
+
+class HLSStore:
+    """
+    카메라 1대의 최신 HLS 플레이리스트 + 세그먼트
+
+    - publish_*(): 생성기 스레드에서 호출
+    - get()/wait_*(): 이벤트 루프에서 호출
+    """
+
+    def __init__(self, camera_id: str, max_segments: int = 16):
+        self.camera_id = camera_id
+        self.max_segments = max_segments
+        self.notifier = AsyncNotifier()
+
+        self._lock = threading.Lock()
+        self._playlists: Dict[str, HLSEntry] = {}
+        self._segments: "OrderedDict[str, HLSEntry]" = OrderedDict()
+
+        # 마지막으로 발행된 플레이리스트의 마지막 세그먼트 번호 (Media Sequence Number)
+        self.last_msn = -1
+        self.target_duration = 10
+
+        # 저지연 모드 (configure_low_latency로 활성화)
+        self.low_latency = False
+        self.part_target = 0.0
+        self.parts_per_segment = 1
+        self.latency_target = 0.0
+        self.window_segments = 4
+        self._playlist_name = ""
+        self._part_uri_template = ""
+        self._segment_uri_template = ""
+        self._parts: "OrderedDict[int, HLSPart]" = OrderedDict()
+        self.last_part: Tuple[int, int] = (-1, -1)  # 마지막 part의 (부모 MSN, part 번호)
+        self._publish_latencies: Deque[float] = deque(maxlen=100)
+
+    def publish_segment(self, name: str, data: bytes):
+        """완성된 세그먼트 추가 (오래된 세그먼트부터 제거)"""
+        entry = HLSEntry(data, SEGMENT_MEDIA_TYPE)
+        with self._lock:
+            self._segments[name] = entry
+            self._segments.move_to_end(name)
+            while len(self._segments) > self.max_segments:
+                self._segments.popitem(last=False)
+
+    def has_segment(self, name: str) -> bool:
+        with self._lock:
+            return name in self._segments
+
+    def publish_playlist(self, name: str, text: str, target_duration: Optional[int] = None):
+        """
+        플레이리스트 발행 (세그먼트를 먼저 발행한 뒤 호출)
+
+        blocking reload를 지원한다고 광고하도록 EXT-X-SERVER-CONTROL을 추가한다.
+        """
+        media_sequence, segments = parse_media_playlist(text)
+
+        if '#EXT-X-SERVER-CONTROL' not in text:
+            lines = text.splitlines()
+            for i, line in enumerate(lines):
+                if line.startswith('#EXT-X-TARGETDURATION'):
+                    lines.insert(i + 1, '#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES')
+                    break
+            text = "\n".join(lines) + "\n"
+
+        entry = HLSEntry(text.encode('utf-8'), PLAYLIST_MEDIA_TYPE)
+        with self._lock:
+            self._playlists[name] = entry
+            if segments:
+                self.last_msn = media_sequence + len(segments) - 1
+            if target_duration:
+                self.target_duration = target_duration
+
+        self.notifier.notify()
+
+    def configure_low_latency(
+        self,
+        playlist_name: str,
+        part_uri_template: str,
+        segment_uri_template: str,
+        part_target: float,
+        parts_per_segment: int,
+        latency_target: float,
+    ):
+        """
+        LL-HLS 모드 설정
+
+        Args:
+            playlist_name: 클라이언트가 요청하는 플레이리스트 이름
+            part_uri_template: part 파일명 형식 (예: "cam_part_%d.ts", %d = FFmpeg 세그먼트 번호)
+            segment_uri_template: 부모 세그먼트 파일명 형식 (예: "cam_seg_%d.ts", %d = MSN)
+            part_target: part 길이 (초)
+            parts_per_segment: 부모 세그먼트 1개를 이루는 part 수
+            latency_target: 목표 glass-to-glass 지연 (초)
+        """
+        with self._lock:
+            self.low_latency = True
+            self._playlist_name = playlist_name
+            self._part_uri_template = part_uri_template
+            self._segment_uri_template = segment_uri_template
+            self.part_target = part_target
+            self.parts_per_segment = max(1, parts_per_segment)
+            self.latency_target = latency_target
+            self.target_duration = max(1, math.ceil(part_target * self.parts_per_segment))
+            self.max_segments = max(
+                self.max_segments,
+                self.parts_per_segment * (self.window_segments + 2) + self.window_segments + 2
+            )
+
+    def _parent_name(self, msn: int) -> str:
+        return self._segment_uri_template % msn
+
+    def publish_part(self, seq: int, name: str, data: bytes, duration: float, program_time: Optional[str] = None):
+        """
+        [저지연 모드] FFmpeg가 완성한 part 추가
+
+        seq는 FFmpeg 세그먼트 번호 (부모 MSN = seq // parts_per_segment).
+        부모의 마지막 part가 들어오면 part들을 이어 붙여 부모 세그먼트도 발행한다 (TS는 이어 붙여도 유효).
+        """
+        part = HLSPart(seq, name, duration, program_time)
+        self.publish_segment(name, data)
+
+        capture_start = _parse_program_time(program_time)
+        if capture_start is not None:
+            # part 마지막 프레임 캡처 → 클라이언트가 받을 수 있게 된 시점까지
+            self._publish_latencies.append(part.published_at - (capture_start + duration))
+
+        msn, index = divmod(seq, self.parts_per_segment)
+        with self._lock:
+            self._parts[seq] = part
+            while len(self._parts) > self.parts_per_segment * (self.window_segments + 1):
+                self._parts.popitem(last=False)
+            self.last_part = (msn, index)
+
+            parent_parts = None
+            if index == self.parts_per_segment - 1:
+                parent_parts = [p for p in self._parts.values() if p.seq // self.parts_per_segment == msn]
+
+        if parent_parts:
+            parent_data = b"".join(
+                entry.data for entry in (self.get(p.name) for p in parent_parts) if entry
+            )
+            self.publish_segment(self._parent_name(msn), parent_data)
+            with self._lock:
+                self.last_msn = msn
+
+    def render_low_latency_playlist(self):
+        """[저지연 모드] 현재 part 목록으로 LL-HLS 플레이리스트 생성 후 발행"""
+        with self._lock:
+            parts = list(self._parts.values())
+            last_msn = self.last_msn
+            last_part = self.last_part
+        if not parts:
+            return
+
+        # 부모 세그먼트별로 part 묶기
+        groups: "OrderedDict[int, List[HLSPart]]" = OrderedDict()
+        for part in parts:
+            groups.setdefault(part.seq // self.parts_per_segment, []).append(part)
+
+        # 완료된 부모는 최근 window_segments개만 (part 목록이 잘린 가장 오래된 부모는 제외)
+        complete_msns = [msn for msn in groups if msn <= last_msn]
+        if len(complete_msns) > self.window_segments:
+            complete_msns = complete_msns[-self.window_segments:]
+        msns = complete_msns + [msn for msn in groups if msn > last_msn]
+        if not msns:
+            return
+
+        part_hold_back = self.part_target * 3
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:6',
+            f'#EXT-X-TARGETDURATION:{self.target_duration}',
+            f'#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,PART-HOLD-BACK={part_hold_back:.3f}',
+            f'#EXT-X-PART-INF:PART-TARGET={self.part_target:.3f}',
+            f'#EXT-X-MEDIA-SEQUENCE:{msns[0]}',
+        ]
+        for msn in msns:
+            group = groups[msn]
+            if group[0].program_time:
+                lines.append(f'#EXT-X-PROGRAM-DATE-TIME:{group[0].program_time}')
+            # part는 라이브 엣지 근처(최근 부모 3개)만 광고
+            if msn >= msns[-1] - 2:
+                for part in group:
+                    lines.append(f'#EXT-X-PART:DURATION={part.duration:.3f},URI="{part.name}",INDEPENDENT=YES')
+            if msn <= last_msn:
+                lines.append(f'#EXTINF:{sum(p.duration for p in group):.3f},')
+                lines.append(self._parent_name(msn))
+
+        next_seq = last_part[0] * self.parts_per_segment + last_part[1] + 1
+        lines.append(f'#EXT-X-PRELOAD-HINT:TYPE=PART,URI="{self._part_uri_template % next_seq}"')
+
+        entry = HLSEntry(("\n".join(lines) + "\n").encode('utf-8'), PLAYLIST_MEDIA_TYPE)
+        with self._lock:
+            self._playlists[self._playlist_name] = entry
+        self.notifier.notify()
+
+    def get_latency_stats(self) -> dict:
+        """[저지연 모드] part 발행 지연 + 예상 glass-to-glass 지연 (PART-HOLD-BACK 포함)"""
+        latencies = sorted(self._publish_latencies)
+        if not latencies:
+            return {"samples": 0, "latency_target": self.latency_target}
+
+        p50 = statistics.median(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        estimated = p95 + self.part_target * 3
+        return {
+            "samples": len(latencies),
+            "publish_latency_p50": round(p50, 3),
+            "publish_latency_p95": round(p95, 3),
+            "estimated_glass_to_glass": round(estimated, 3),
+            "latency_target": self.latency_target,
+            "within_target": estimated <= self.latency_target,
+        }
+
+    def get(self, name: str) -> Optional[HLSEntry]:
+        with self._lock:
+            return self._playlists.get(name) or self._segments.get(name)
+
+    async def wait_for_msn(self, msn: int, timeout: float) -> bool:
+        """플레이리스트에 msn번 세그먼트가 포함될 때까지 대기 (blocking playlist reload)"""
+        return await self._wait_until(lambda: self.last_msn >= msn, timeout)
+
+    async def wait_for_part(self, msn: int, part: int, timeout: float) -> bool:
+        """[저지연 모드] 플레이리스트에 msn번 부모의 part번 part가 포함될 때까지 대기"""
+        return await self._wait_until(lambda: self.last_part >= (msn, part), timeout)
+
+    async def wait_for_file(self, name: str, timeout: float) -> Optional[HLSEntry]:
+        """파일이 발행될 때까지 대기 (스트림 시작 직후 첫 플레이리스트 등)"""
+        await self._wait_until(lambda: self.get(name) is not None, timeout)
+        return self.get(name)
+
+    async def _wait_until(self, predicate, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            version = self.notifier.version
+            if predicate():
+                return True
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await self.notifier.wait(version, timeout=remaining)
+
+    def clear(self):
+        """스트림 재시작 시 이전 플레이리스트/세그먼트 제거"""
+        with self._lock:
+            self._playlists.clear()
+            self._segments.clear()
+            self._parts.clear()
+            self.last_msn = -1
+            self.last_part = (-1, -1)
+            self.low_latency = False
+            self._publish_latencies.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "playlists": list(self._playlists.keys()),
+                "segments_cached": len(self._segments),
+                "cached_bytes": sum(len(e.data) for e in self._segments.values()),
+                "last_msn": self.last_msn,
+                "low_latency": self.low_latency,
+                "last_part": list(self.last_part) if self.low_latency else None,
+            }
+
+
+# 전역 저장소 관리 (카메라당 1개)
+_stores: Dict[str, HLSStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_hls_store(camera_id: str) -> HLSStore:
+    """카메라별 HLS 저장소 싱글톤"""
+    with _stores_lock:
+        store = _stores.get(camera_id)
+        if store is None:
+            store = HLSStore(camera_id)
+            _stores[camera_id] = store
+        return store
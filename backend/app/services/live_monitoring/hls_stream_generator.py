@@ -4,7 +4,7 @@ import cv2
 import numpy as np
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 import asyncio
 import subprocess
 import shutil
@@ -12,6 +12,12 @@ import os
 import threading
 import time
 
+from app.services.live_monitoring.stream_worker import StreamWorker
+from app.services.live_monitoring.segment_manifest import SegmentRecord, get_segment_manifest
+from app.services.live_monitoring.hls_store import get_hls_store, parse_media_playlist, parse_playlist_entries
+from app.services.live_monitoring.clip_cache import get_clip_cache
+from app.services.live_monitoring.frame_pool import get_frame_pool, read_frame_into, write_frame
+
 class HLSStreamGenerator:
     """
     HLS 스트림 생성기
@@ -29,7 +35,11 @@ class HLSStreamGenerator:
         segment_duration: int = 10,  # HLS 세그먼트 길이 (초)
         enable_realtime_detection: bool = True,
         age_months: Optional[int] = None,
-        event_loop: Optional[asyncio.AbstractEventLoop] = None
+        event_loop: Optional[asyncio.AbstractEventLoop] = None,
+        single_encode: bool = True,  # FFmpeg 1회 인코딩으로 HLS + 10분 아카이브 동시 생성
+        low_latency: bool = False,  # LL-HLS (partial segment + blocking playlist)
+        part_target: float = 0.4,  # LL-HLS part 길이 (초)
+        latency_target: float = 3.0  # LL-HLS 목표 glass-to-glass 지연 (초)
     ):
         self.camera_id = camera_id
         self.video_source = video_source
@@ -59,29 +69,70 @@ class HLSStreamGenerator:
         self.target_width = 640
         self.target_height = 480
         
+        # single_encode=True: FFmpeg tee/segment muxer가 아카이브를 직접 생성 (OpenCV VideoWriter 미사용)
+        # single_encode=False: 기존 방식 (HLS는 FFmpeg, 아카이브는 OpenCV로 한 번 더 인코딩)
+        self.single_encode = single_encode
+        
+        # LL-HLS: part는 정수 개 프레임으로 구성 (모든 part가 키프레임으로 시작)
+        self.low_latency = low_latency
+        self.latency_target = latency_target
+        self.frames_per_part = max(1, int(round(self.target_fps * part_target)))
+        self.part_duration = self.frames_per_part / self.target_fps
+        self.parts_per_segment = max(1, int(round(self.segment_duration / self.part_duration)))
+        self._last_part_seq = -1
+        
         self.current_archive_writer = None
         self.current_archive_path = None
         self.current_archive_start = None
+        self.current_archive_started_at = None  # 실제 시작 시각 (매니페스트 기록용)
         self.current_archive_frame_count = 0
         
+        # 완료된 아카이브 매니페스트 (스트림 API/분석 스케줄러가 파일 대신 조회)
+        self.manifest = get_segment_manifest(camera_id)
+        # single_encode: FFmpeg segment muxer가 완료된 아카이브를 기록하는 목록 파일
+        self.archive_list_path = self.archive_dir / "archive_list.csv"
+        self._archive_list_size = 0
+        self.archive_list_sync_interval = 1.0  # 목록 파일 확인 간격 (초)
+        
+        # FFmpeg가 쓴 플레이리스트/세그먼트를 인메모리 저장소로 발행 (serve_hls_file이 디스크 대신 사용)
+        self.hls_store = get_hls_store(camera_id)
+        self.hls_publisher: Optional[StreamWorker] = None
+        self.hls_publish_interval = 0.02 if low_latency else 0.05  # 플레이리스트 변경 확인 간격 (초)
+        self._playlist_mtime = None
+        self._archive_lock = threading.Lock()  # 워커 스레드와 중지 요청 간 경합 방지
+        
+        # 캡처/인코딩 워커 (이벤트 루프와 분리)
+        self.worker: Optional[StreamWorker] = None
+        self.detector = None
+        self.frame_buffer_capacity = 8  # 워커 → 이벤트 루프 링 버퍼 크기
+        # 프레임 버퍼 풀: 링 버퍼 + 탐지기 보관 1 + Gemini 분석 1 + 워커 작업 중 프레임 여유분
+        self.frame_pool = get_frame_pool(
+            camera_id, self.target_width, self.target_height, size=self.frame_buffer_capacity + 4
+        )
+        self._detector_frame = None  # 탐지기가 보관 중인 풀 프레임 (hold 상태)
+        self.detection_frame_interval = 30  # 30프레임마다 탐지
+        self.frame_poll_interval = 0.1  # 링 버퍼 확인 간격 (초)
+        self.frame_tap_fps = 1.0  # 실제 홈캠: 탐지기용 raw 프레임 탭 FPS
+        self.clip_cache = get_clip_cache()  # 가짜 영상: 정규화된 클립 캐시
+        
     async def start_streaming(self):
         """HLS 스트리밍 시작"""
         self.is_running = True
+        self.frame_pool.release_all()  # 이전 실행에서 남은 hold 정리
+        self._start_hls_publisher()
         
-        if self.is_real_camera:
-            # 실제 홈캠: FFmpeg로 직접 HLS 생성
-            await self._start_real_camera_hls()
-        else:
-            # 가짜 영상: OpenCV로 처리 후 FFmpeg로 HLS 생성
-            await self._start_fake_stream_hls()
+        try:
+            if self.is_real_camera:
+                # 실제 홈캠: FFmpeg로 직접 HLS 생성
+                await self._start_real_camera_hls()
+            else:
+                # 가짜 영상: OpenCV로 처리 후 FFmpeg로 HLS 생성
+                await self._start_fake_stream_hls()
+        finally:
+            await asyncio.to_thread(self._stop_hls_publisher)
     
-    async def _start_fake_stream_hls(self):
-        """가짜 영상으로 HLS 스트림 생성"""
-        from app.services.live_monitoring.video_queue import VideoQueue
-        from app.services.live_monitoring.realtime_detector import RealtimeEventDetector
-        import shutil
-        
-        # FFmpeg 설치 확인 (여러 경로 시도)
+    def _find_ffmpeg_path(self) -> Optional[str]:
+        """FFmpeg 실행 파일 경로 탐색 (여러 경로 시도)"""
         ffmpeg_path = None
         
         # 0. 프로젝트 내부 bin 폴더 확인 (최우선)
@@ -129,6 +180,21 @@ class HLSStreamGenerator:
             print(f"[HLS 스트림]   2. 압축 해제 후 bin 폴더를 PATH에 추가")
             print(f"[HLS 스트림]   3. 또는 Chocolatey 사용: choco install ffmpeg")
             print(f"[HLS 스트림] 💡 팁: FFmpeg 설치 경로를 환경 변수 FFMPEG_PATH에 설정하면 자동으로 인식합니다")
+        
+        return ffmpeg_path
+    
+    async def _start_fake_stream_hls(self):
+        """
+        가짜 영상으로 HLS 스트림 생성
+        
+        캡처→리사이즈→FFmpeg 파이프→아카이브 루프는 StreamWorker 스레드에서 실행하고,
+        이벤트 루프에서는 링 버퍼로 넘어온 프레임으로 실시간 탐지만 수행한다.
+        """
+        from app.services.live_monitoring.video_queue import VideoQueue
+        from app.services.live_monitoring.realtime_detector import RealtimeEventDetector
+        
+        ffmpeg_path = self._find_ffmpeg_path()
+        if not ffmpeg_path:
             return
         
         print(f"[HLS 스트림] ✅ FFmpeg 경로: {ffmpeg_path}")
@@ -142,20 +208,21 @@ class HLSStreamGenerator:
             print(f"[HLS 스트림] 영상 경로: {self.video_source}")
             return
         
+        # 큐의 클립들을 출력 형식으로 미리 변환 (백그라운드)
+        self.clip_cache.prefetch(
+            (clip.path for clip in video_queue.current_queue),
+            self.target_width, self.target_height, self.target_fps
+        )
+        
         # 실시간 이벤트 탐지기
         detector = None
         if self.enable_realtime_detection:
             detector = RealtimeEventDetector(self.camera_id, age_months=self.age_months)
-        
-        # 10분 단위 아카이브 시작
-        self._start_new_archive()
+        self.detector = detector
         
         print(f"[HLS 스트림] 시작: {self.camera_id}")
         
         # FFmpeg 파이프 설정 (stdin으로 프레임 전송)
-        playlist_path = self.hls_dir / f"{self.camera_id}.m3u8"
-        segment_pattern = str(self.hls_dir / f"{self.camera_id}_%03d.ts")
-        
         ffmpeg_cmd = [
             ffmpeg_path,  # 전체 경로 사용
             '-f', 'rawvideo',
@@ -163,16 +230,7 @@ class HLSStreamGenerator:
             '-s', f'{self.target_width}x{self.target_height}',
             '-r', str(self.target_fps),
             '-i', 'pipe:',  # Windows 호환성
-            '-c:v', 'libx264',
-            '-preset', 'ultrafast',
-            '-tune', 'zerolatency',
-            '-f', 'hls',
-            '-hls_time', str(self.segment_duration),
-            '-hls_list_size', '10',
-            '-hls_flags', 'delete_segments',
-            '-hls_segment_filename', segment_pattern,
-            str(playlist_path)
-        ]
+        ] + self._build_output_args()
         
         print(f"[HLS 스트림] FFmpeg 명령: {' '.join(ffmpeg_cmd[:5])}...")
         
@@ -180,260 +238,626 @@ class HLSStreamGenerator:
             self.ffmpeg_process = subprocess.Popen(
                 ffmpeg_cmd,
                 stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
                 stderr=subprocess.PIPE,
                 bufsize=0,  # 버퍼링 비활성화
                 creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
             )
             print(f"[HLS 스트림] ✅ FFmpeg 프로세스 시작 성공 (PID: {self.ffmpeg_process.pid})")
             
-            # FFmpeg stderr를 별도 스레드에서 읽어서 로그 출력
-            def read_stderr():
-                try:
-                    while self.is_running and self.ffmpeg_process:
-                        line = self.ffmpeg_process.stderr.readline()
-                        if line:
-                            decoded = line.decode('utf-8', errors='ignore').strip()
-                            if decoded and not decoded.startswith('frame='):  # 일반적인 프레임 정보는 제외
-                                print(f"[FFmpeg] {decoded}")
-                except Exception as e:
-                    print(f"[FFmpeg stderr 읽기 오류] {e}")
+            self._start_stderr_reader(self.ffmpeg_process)
             
-            stderr_thread = threading.Thread(target=read_stderr, daemon=True)
-            stderr_thread.start()
+            # 캡처/인코딩 워커 시작 (이벤트 루프와 분리된 전용 스레드)
+            self.worker = StreamWorker(
+                self.camera_id,
+                lambda worker: self._fake_capture_loop(worker, video_queue),
+                buffer_capacity=self.frame_buffer_capacity,
+                on_frame_drop=self.frame_pool.release,
+            )
+            self.worker.start()
             
-            # HLS 플레이리스트 파일이 생성될 때까지 대기 (최대 5초)
-            print(f"[HLS 스트림] HLS 플레이리스트 생성 대기 중...")
-            playlist_created = False
-            for _ in range(50):  # 0.1초씩 50번 = 5초
-                if playlist_path.exists():
-                    playlist_created = True
-                    print(f"[HLS 스트림] ✅ HLS 플레이리스트 생성 완료: {playlist_path}")
-                    break
-                await asyncio.sleep(0.1)
+            # 이벤트 루프: 링 버퍼의 프레임으로 실시간 탐지만 수행
+            await self._consume_worker_frames(detector)
+        
+        except FileNotFoundError as e:
+            print(f"[HLS 스트림] ❌ FFmpeg 실행 실패: {e}")
+            print(f"[HLS 스트림] FFmpeg가 설치되지 않았거나 PATH에 없습니다")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[HLS 스트림] ❌ 예상치 못한 오류: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            # 워커/FFmpeg 종료 및 아카이브 완료 (블로킹 작업이므로 스레드에서 실행)
+            await asyncio.to_thread(self._shutdown_pipeline)
+            print(f"[HLS 스트림] 종료: {self.camera_id}")
+    
+    def _build_output_args(self, video_map: str = '0:v', force_tee: bool = False) -> List[str]:
+        """
+        인코딩 + 출력 FFmpeg 인자 생성
+        
+        - single_encode=False: HLS만 출력 (아카이브는 OpenCV가 별도 인코딩)
+        - single_encode=True: libx264 1회 인코딩 결과를 tee muxer로 분기
+            1) hls muxer → 10초 .ts 세그먼트 + .m3u8
+            2) segment muxer → 벽시계 10분 경계에 맞춘 archive_YYYYmmdd_HHMMSS.mp4
+               (완료된 파일은 archive_list.csv에 기록 → _sync_archive_list가 매니페스트로 옮김)
+        - low_latency=True: hls muxer가 part 길이의 짧은 .ts를 내보냄
+            → HLSStore가 부모 세그먼트로 묶고 LL-HLS 플레이리스트를 생성
+        
+        Args:
+            video_map: 인코딩할 비디오 스트림 (-map 값, filter_complex 출력 라벨 가능)
+            force_tee: single_encode 설정과 무관하게 tee 출력 사용 (실제 홈캠은 OpenCV 아카이브 경로가 없음)
+        """
+        # 세그먼트 번호를 epoch 기준으로 시작 → 재시작해도 파일명이 겹치지 않음 (세그먼트 캐시 가능)
+        if self.low_latency:
+            playlist_path = self.hls_dir / f"{self.camera_id}_parts.m3u8"
+            segment_pattern = self.hls_dir / f"{self.camera_id}_part_%d.ts"
+            hls_time = f"{self.part_duration:.3f}"
+            # 발행 스레드가 놓치지 않도록 부모 세그먼트 2개 분량 이상 유지
+            hls_list_size = self.parts_per_segment * 2 + 10
+            hls_flags = 'delete_segments+program_date_time'
+            # 모든 part가 키프레임으로 시작해야 INDEPENDENT=YES
+            gop = self.frames_per_part
+        else:
+            playlist_path = self.hls_dir / f"{self.camera_id}.m3u8"
+            segment_pattern = self.hls_dir / f"{self.camera_id}_%d.ts"
+            hls_time = str(self.segment_duration)
+            hls_list_size = 10
+            hls_flags = 'delete_segments'
+            # HLS 세그먼트/아카이브 경계가 정확히 잘리도록 키프레임 간격을 HLS 세그먼트 길이에 고정
+            gop = max(1, int(round(self.target_fps * self.segment_duration)))
+        
+        encode_args = [
+            '-c:v', 'libx264',
+            '-preset', 'ultrafast',
+            '-tune', 'zerolatency',
+        ]
+        if self.low_latency or self.single_encode or force_tee:
+            encode_args += [
+                '-pix_fmt', 'yuv420p',
+                '-g', str(gop),
+                '-keyint_min', str(gop),
+                '-sc_threshold', '0',
+            ]
+        
+        if not (self.single_encode or force_tee):
+            return ['-map', video_map] + encode_args + [
+                '-f', 'hls',
+                '-hls_time', hls_time,
+                '-hls_list_size', str(hls_list_size),
+                '-hls_flags', hls_flags,
+                '-hls_start_number_source', 'epoch',
+                '-hls_segment_filename', str(segment_pattern),
+                str(playlist_path)
+            ]
+        
+        archive_seconds = int(self.archive_duration_minutes * 60)
+        archive_pattern = self.archive_dir / "archive_%Y%m%d_%H%M%S.mp4"
+        
+        hls_output = (
+            f"[f=hls"
+            f":hls_time={hls_time}"
+            f":hls_list_size={hls_list_size}"
+            f":hls_flags={hls_flags}"
+            f":hls_start_number_source=epoch"
+            f":hls_segment_filename={self._escape_tee_path(segment_pattern)}]"
+            f"{self._escape_tee_path(playlist_path)}"
+        )
+        archive_output = (
+            f"[f=segment"
+            f":segment_time={archive_seconds}"
+            f":segment_atclocktime=1"
+            f":strftime=1"
+            f":reset_timestamps=1"
+            f":segment_format=mp4"
+            f":segment_list={self._escape_tee_path(self.archive_list_path)}"
+            f":segment_list_type=csv]"
+            f"{self._escape_tee_path(archive_pattern)}"
+        )
+        
+        return ['-map', video_map] + encode_args + [
+            '-f', 'tee',
+            f"{hls_output}|{archive_output}"
+        ]
+    
+    @staticmethod
+    def _escape_tee_path(path: Path) -> str:
+        """tee muxer 출력 경로 이스케이프 (Windows 경로도 '/' 구분자로 통일)"""
+        escaped = path.as_posix()
+        for ch in ('\\', ':', '|', '[', ']'):
+            escaped = escaped.replace(ch, '\\' + ch)
+        return escaped
+    
+    def _start_stderr_reader(self, process: subprocess.Popen):
+        """FFmpeg stderr를 별도 스레드에서 읽어서 로그 출력"""
+        def read_stderr():
+            try:
+                while self.is_running and process.poll() is None:
+                    line = process.stderr.readline()
+                    if not line:
+                        break
+                    decoded = line.decode('utf-8', errors='ignore').strip()
+                    if decoded and not decoded.startswith('frame='):  # 일반적인 프레임 정보는 제외
+                        print(f"[FFmpeg] {decoded}")
+            except Exception as e:
+                print(f"[FFmpeg stderr 읽기 오류] {e}")
+        
+        stderr_thread = threading.Thread(target=read_stderr, daemon=True)
+        stderr_thread.start()
+    
+    def _fake_capture_loop(self, worker: StreamWorker, video_queue):
+        """
+        [워커 스레드] 영상 읽기 → 리사이즈 → FFmpeg 파이프 → 아카이브 저장
+        
+        아카이브 VideoWriter는 워커 스레드가 직접 열고 닫는다.
+        탐지용 프레임은 detection_frame_interval 프레임마다 링 버퍼로 넘긴다.
+        """
+        # 10분 단위 아카이브 시작 (single_encode 모드에서는 FFmpeg가 직접 생성)
+        if not self.single_encode:
+            self._start_new_archive()
+        try:
+            self._run_fake_capture(worker, video_queue)
+        finally:
+            self._finalize_current_archive()
+    
+    def _run_fake_capture(self, worker: StreamWorker, video_queue):
+        frame_count = 0
+        frame_interval = 1.0 / self.target_fps  # 프레임 간격 (초)
+        last_frame_time = time.time()
+        frames_sent = 0
+        frames_per_archive = int(self.target_fps * 60 * self.archive_duration_minutes)
+        
+        print(f"[HLS 스트림] 프레임 전송 시작 (target_fps: {self.target_fps}, 간격: {frame_interval:.3f}초)")
+        
+        while self.is_running and not worker.should_stop():
+            clip = video_queue.get_next_clip()
+            if not clip:
+                print(f"[HLS 스트림] 경고: 다음 영상이 없습니다")
+                break
+            video_path = clip.path
             
-            if not playlist_created:
-                print(f"[HLS 스트림] ⚠️ 경고: HLS 플레이리스트가 생성되지 않았습니다. 계속 진행합니다...")
+            # 정규화된 캐시 클립(640x480 @ target_fps)이 있으면 그대로 사용, 없으면 변환 예약 후 원본 사용
+            cached_path = self.clip_cache.get(video_path, self.target_width, self.target_height, self.target_fps)
+            if cached_path:
+                source_path = cached_path
+                fps = self.target_fps
+                total_frames = int(round(clip.play_seconds * self.target_fps))
+            else:
+                self.clip_cache.request(video_path, self.target_width, self.target_height, self.target_fps)
+                source_path = video_path
+                # FPS/프레임 수는 클립 인덱스 값 사용 (큐의 마지막 클립은 목표 시간에 맞춰 잘림)
+                fps = clip.metadata.fps
+                total_frames = clip.max_frames
             
-            frame_count = 0
-            detection_frame_interval = 30  # 30프레임마다 탐지
-            frame_interval = 1.0 / self.target_fps  # 프레임 간격 (초)
-            last_frame_time = time.time()
-            frames_sent = 0
+            print(f"[HLS 스트림] 영상 재생 시작: {video_path.name}{' (캐시)' if cached_path else ''}")
+            cap = cv2.VideoCapture(str(source_path))
+            if not cap.isOpened():
+                print(f"[HLS 스트림] 오류: 영상 열기 실패 - {source_path.name}")
+                continue
             
-            print(f"[HLS 스트림] 프레임 전송 시작 (target_fps: {self.target_fps}, 간격: {frame_interval:.3f}초)")
+            print(f"[HLS 스트림] 영상 정보: FPS={fps:.2f}, 재생 프레임={total_frames}")
             
-            while self.is_running:
-                video_path = video_queue.get_next_video()
-                if not video_path:
-                    print(f"[HLS 스트림] 경고: 다음 영상이 없습니다")
-                    break
-                
-                print(f"[HLS 스트림] 영상 재생 시작: {video_path.name}")
-                cap = cv2.VideoCapture(str(video_path))
-                if not cap.isOpened():
-                    print(f"[HLS 스트림] 오류: 영상 열기 실패 - {video_path.name}")
-                    continue
-                
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                if fps <= 0:
-                    fps = 30.0
-                
-                print(f"[HLS 스트림] 영상 정보: FPS={fps:.2f}, 총 프레임={total_frames}")
-                
-                # 프레임 샘플링
-                frame_skip = int(fps / self.target_fps) if fps > self.target_fps else 1
-                video_frame_count = 0
-                
-                while cap.isOpened() and self.is_running:
-                    ret, frame = cap.read()
+            # 프레임 샘플링
+            frame_skip = int(fps / self.target_fps) if fps > self.target_fps else 1
+            video_frame_count = 0
+            pipeline_broken = False
+            decode_buffer = None  # 원본 해상도 디코딩 버퍼 (cap.read가 재사용)
+            
+            try:
+                while cap.isOpened() and self.is_running and not worker.should_stop():
+                    if video_frame_count >= total_frames:
+                        break
+                    # 프레임 샘플링: 버릴 프레임은 디코딩하지 않고 건너뜀
+                    if video_frame_count % frame_skip != 0:
+                        if not cap.grab():
+                            break
+                        video_frame_count += 1
+                        continue
+                    
+                    # 캐시 클립(목표 해상도)은 풀 버퍼에 바로 디코딩, 원본은 재사용 버퍼에 디코딩
+                    ret, decoded = cap.read(self.frame_pool.acquire() if cached_path else decode_buffer)
                     if not ret:
                         break
+                    if not cached_path:
+                        decode_buffer = decoded
                     
-                    # 프레임 샘플링
-                    if video_frame_count % frame_skip == 0:
-                        # FFmpeg 프로세스 상태 확인
-                        if self.ffmpeg_process.poll() is not None:
-                            print(f"[HLS 스트림] ❌ FFmpeg 프로세스가 종료되었습니다 (exit code: {self.ffmpeg_process.returncode})")
-                            # stderr에서 마지막 오류 메시지 읽기
-                            try:
-                                stderr_lines = self.ffmpeg_process.stderr.readlines()
-                                for line in stderr_lines[-10:]:  # 마지막 10줄
-                                    decoded = line.decode('utf-8', errors='ignore').strip()
-                                    if decoded:
-                                        print(f"[FFmpeg 오류] {decoded}")
-                            except:
-                                pass
-                            break
-                        
-                        # 프레임 간격 조절 (target_fps 유지) - 비동기 sleep 사용
-                        current_time = time.time()
-                        elapsed = current_time - last_frame_time
-                        if elapsed < frame_interval:
-                            await asyncio.sleep(frame_interval - elapsed)
-                        last_frame_time = time.time()
-                        
-                        # 프레임 크기 조정
-                        frame = self._resize_frame(frame)
-                        
-                        # FFmpeg로 프레임 전송 (HLS 생성)
-                        try:
-                            frame_bytes = frame.tobytes()
-                            self.ffmpeg_process.stdin.write(frame_bytes)
-                            self.ffmpeg_process.stdin.flush()  # 버퍼 즉시 전송
-                            frames_sent += 1
-                            
-                            # 첫 10프레임과 그 이후 100프레임마다 로그
-                            if frames_sent <= 10 or frames_sent % 100 == 0:
-                                print(f"[HLS 스트림] 프레임 전송: {frames_sent}개 (영상 프레임: {video_frame_count})")
-                        except BrokenPipeError:
-                            print("[HLS 스트림] FFmpeg 파이프 끊김 - 프로세스가 종료되었을 수 있습니다")
-                            break
-                        except Exception as e:
-                            print(f"[HLS 스트림] 프레임 전송 오류: {e}")
-                            import traceback
-                            traceback.print_exc()
-                            break
-                        
-                        # 10분 단위 아카이브에 저장
-                        if self.current_archive_writer:
-                            self.current_archive_writer.write(frame)
-                            self.current_archive_frame_count += 1
-                        
-                        # 실시간 이벤트 탐지
-                        if detector and frame_count % detection_frame_interval == 0:
-                            try:
-                                events = detector.process_frame(frame)
-                                if events:
-                                    detector.save_events(events)
-                                
-                                if detector.should_run_gemini_analysis() and self.event_loop:
-                                    asyncio.run_coroutine_threadsafe(
-                                        self._run_gemini_analysis(detector, frame.copy()),
-                                        self.event_loop
-                                    )
-                            except Exception as e:
-                                print(f"[실시간 탐지] 오류: {e}")
-                        
-                        frame_count += 1
+                    # FFmpeg 프로세스 상태 확인
+                    if self.ffmpeg_process.poll() is not None:
+                        print(f"[HLS 스트림] ❌ FFmpeg 프로세스가 종료되었습니다 (exit code: {self.ffmpeg_process.returncode})")
+                        pipeline_broken = True
+                        break
+                    
+                    # 프레임 간격 조절 (target_fps 유지) - 중지 요청 시 즉시 깨어나는 대기
+                    elapsed = time.time() - last_frame_time
+                    if elapsed < frame_interval and worker.wait(frame_interval - elapsed):
+                        break
+                    last_frame_time = time.time()
+                    
+                    # 프레임 크기 조정 (풀 버퍼에 직접 씀)
+                    frame = self._resize_frame(decoded)
+                    
+                    # FFmpeg로 프레임 전송 (HLS 생성, memoryview로 복사 없이)
+                    try:
+                        write_frame(self.ffmpeg_process.stdin, frame)
+                        self.ffmpeg_process.stdin.flush()  # 버퍼 즉시 전송
+                        frames_sent += 1
                         
-                        # 10분 단위 아카이브 교체
-                        frames_per_archive = int(self.target_fps * 60 * self.archive_duration_minutes)
-                        if self.current_archive_frame_count >= frames_per_archive:
-                            self._finalize_current_archive()
-                            self._start_new_archive()
+                        # 첫 10프레임과 그 이후 100프레임마다 로그
+                        if frames_sent <= 10 or frames_sent % 100 == 0:
+                            print(f"[HLS 스트림] 프레임 전송: {frames_sent}개 (영상 프레임: {video_frame_count})")
+                    except (BrokenPipeError, OSError, ValueError):
+                        print("[HLS 스트림] FFmpeg 파이프 끊김 - 프로세스가 종료되었을 수 있습니다")
+                        pipeline_broken = True
+                        break
                     
-                    video_frame_count += 1
+                    # 10분 단위 아카이브에 저장
+                    if self.current_archive_writer:
+                        self.current_archive_writer.write(frame)
+                        self.current_archive_frame_count += 1
+                    
+                    # 실시간 탐지용 프레임은 링 버퍼로 이벤트 루프에 전달
+                    # (복사하지 않고 풀 프레임을 hold → 소비자가 release)
+                    if self.detector and frame_count % self.detection_frame_interval == 0:
+                        self.frame_pool.hold(frame)
+                        worker.frames.put(frame)
+                    
+                    frame_count += 1
+                    worker.mark_frame()
+                    
+                    # 10분 단위 아카이브 교체
+                    if self.current_archive_frame_count >= frames_per_archive:
+                        self._finalize_current_archive()
+                        self._start_new_archive()
                 
+                    video_frame_count += 1
+            finally:
                 cap.release()
-                print(f"[HLS 스트림] 영상 재생 완료: {video_path.name}")
+            
+            if pipeline_broken:
+                break
+            
+            print(f"[HLS 스트림] 영상 재생 완료: {video_path.name}")
+    
+    async def _consume_worker_frames(self, detector):
+        """[이벤트 루프] 워커가 넘긴 프레임으로 실시간 이벤트 탐지 + 완료된 아카이브 매니페스트 반영"""
+        next_list_sync = 0.0
+        while self.is_running and self.worker and self.worker.is_alive():
+            if time.monotonic() >= next_list_sync:
+                self._sync_archive_list()
+                next_list_sync = time.monotonic() + self.archive_list_sync_interval
+            
+            item = self.worker.frames.get_nowait()
+            if item is None:
+                await asyncio.sleep(self.frame_poll_interval)
+                continue
+            
+            _, frame = item
+            if not detector:
+                self.frame_pool.release(frame)
+                continue
+            
+            # 탐지기는 마지막 프레임의 참조만 보관 → 이전 프레임 hold 해제, 현재 프레임 hold 유지
+            self.frame_pool.release(self._detector_frame)
+            self._detector_frame = frame
+            try:
+                events = detector.process_frame(frame)
+                if events:
+                    detector.save_events(events)  # 일괄 저장기 대기열에 넣고 바로 반환
+                
+                if detector.should_run_gemini_analysis():
+                    self.frame_pool.hold(frame)  # Gemini 분석이 끝날 때까지 재사용 방지
+                    asyncio.create_task(self._run_gemini_analysis(detector, frame))
+            except Exception as e:
+                print(f"[실시간 탐지] 오류: {e}")
+    
+    def _shutdown_pipeline(self):
+        """워커 중지 → FFmpeg 종료 → 아카이브 완료 (블로킹)"""
+        if self.worker:
+            if not self.worker.stop(timeout=10.0):
+                print(f"[HLS 스트림] ⚠️ 워커가 제한 시간 안에 종료되지 않았습니다: {self.camera_id}")
+        
+        process = self.ffmpeg_process
+        if process:
+            try:
+                if process.stdin:
+                    process.stdin.close()
+            except Exception:
+                pass
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
         
-        except FileNotFoundError as e:
-            print(f"[HLS 스트림] ❌ FFmpeg 실행 실패: {e}")
-            print(f"[HLS 스트림] FFmpeg가 설치되지 않았거나 PATH에 없습니다")
-        except Exception as e:
-            print(f"[HLS 스트림] ❌ 예상치 못한 오류: {e}")
-            import traceback
-            traceback.print_exc()
-        finally:
-            # FFmpeg 종료
-            if self.ffmpeg_process:
-                self.ffmpeg_process.stdin.close()
-                self.ffmpeg_process.wait()
+        self._finalize_current_archive()
+        self._sync_archive_list()  # FFmpeg 종료 시 닫힌 마지막 아카이브
+        self._stop_hls_publisher()
+        
+        self.frame_pool.release(self._detector_frame)
+        self._detector_frame = None
+    
+    def _start_hls_publisher(self):
+        """플레이리스트 발행 스레드 시작 (이전 실행의 플레이리스트는 무시)"""
+        self.hls_store.clear()
+        self._last_part_seq = -1
+        if self.low_latency:
+            self.hls_store.configure_low_latency(
+                playlist_name=f"{self.camera_id}.m3u8",
+                part_uri_template=f"{self.camera_id}_part_%d.ts",
+                segment_uri_template=f"{self.camera_id}_seg_%d.ts",
+                part_target=self.part_duration,
+                parts_per_segment=self.parts_per_segment,
+                latency_target=self.latency_target,
+            )
+        
+        playlist_path = self._ffmpeg_playlist_path()
+        try:
+            self._playlist_mtime = playlist_path.stat().st_mtime_ns
+        except OSError:
+            self._playlist_mtime = None
+        
+        self.hls_publisher = StreamWorker(f"{self.camera_id}-hls-publish", self._hls_publish_loop)
+        self.hls_publisher.start()
+    
+    def _stop_hls_publisher(self):
+        if self.hls_publisher:
+            self.hls_publisher.stop(timeout=2.0)
+            self.hls_publisher = None
+    
+    def _hls_publish_loop(self, worker: StreamWorker):
+        """[발행 스레드] 플레이리스트가 바뀌면 새 세그먼트 → 플레이리스트 순으로 저장소에 발행"""
+        while not worker.should_stop():
+            self._publish_hls_files()
+            worker.wait(self.hls_publish_interval)
+        self._publish_hls_files()  # 종료 직전 마지막 플레이리스트
+    
+    def _ffmpeg_playlist_path(self) -> Path:
+        """FFmpeg가 쓰는 플레이리스트 (저지연 모드는 part 목록용 내부 플레이리스트)"""
+        if self.low_latency:
+            return self.hls_dir / f"{self.camera_id}_parts.m3u8"
+        return self.hls_dir / f"{self.camera_id}.m3u8"
+    
+    def _publish_hls_files(self):
+        playlist_path = self._ffmpeg_playlist_path()
+        try:
+            mtime = playlist_path.stat().st_mtime_ns
+            if mtime == self._playlist_mtime:
+                return
+            text = playlist_path.read_text(encoding='utf-8')
+        except OSError:
+            return
+        
+        if self.low_latency:
+            self._publish_hls_parts(text)
+            self._playlist_mtime = mtime
+            return
+        
+        # 플레이리스트에 올라온 세그먼트는 FFmpeg가 이미 다 쓴 파일
+        _, segment_names = parse_media_playlist(text)
+        for name in segment_names:
+            if self.hls_store.has_segment(name):
+                continue
+            try:
+                data = (self.hls_dir / name).read_bytes()
+            except OSError:
+                continue
+            self.hls_store.publish_segment(name, data)
+        
+        self.hls_store.publish_playlist(playlist_path.name, text, target_duration=self.segment_duration)
+        self._playlist_mtime = mtime
+    
+    def _publish_hls_parts(self, text: str):
+        """[저지연 모드] FFmpeg part 플레이리스트의 새 part를 발행 후 LL-HLS 플레이리스트 갱신"""
+        media_sequence, entries = parse_playlist_entries(text)
+        published = False
+        for i, (name, duration, program_time) in enumerate(entries):
+            seq = media_sequence + i
+            if seq <= self._last_part_seq:
+                continue
+            try:
+                data = (self.hls_dir / name).read_bytes()
+            except OSError:
+                continue
+            self.hls_store.publish_part(seq, name, data, duration, program_time)
+            self._last_part_seq = seq
+            published = True
+        
+        if published:
+            self.hls_store.render_low_latency_playlist()
+    
+    def _sync_archive_list(self):
+        """FFmpeg segment muxer의 완료 목록(csv)에서 새 아카이브를 매니페스트에 기록"""
+        try:
+            size = self.archive_list_path.stat().st_size
+        except OSError:
+            return
+        if size == self._archive_list_size:
+            return
+        self._archive_list_size = size
+        
+        try:
+            with open(self.archive_list_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            print(f"[HLS 아카이브] 목록 파일 읽기 실패: {e}")
+            return
+        
+        for line in lines:
+            # 형식: 파일명,시작(초),종료(초)
+            try:
+                name, start_pts, end_pts = line.strip().rsplit(',', 2)
+                archive_path = self.archive_dir / name.strip('"')
+                duration = float(end_pts) - float(start_pts)
+                start_time = datetime.strptime(archive_path.stem.replace('archive_', ''), '%Y%m%d_%H%M%S')
+            except ValueError:
+                continue
             
-            # 아카이브 완료
-            self._finalize_current_archive()
-            print(f"[HLS 스트림] 종료: {self.camera_id}")
+            if self.manifest.has_path(archive_path):
+                continue
+            
+            byte_size = archive_path.stat().st_size if archive_path.exists() else 0
+            self.manifest.append(SegmentRecord(
+                path=str(archive_path),
+                start_time=start_time,
+                end_time=start_time + timedelta(seconds=duration),
+                frame_count=int(round(duration * self.target_fps)),
+                fps=self.target_fps,
+                byte_size=byte_size,
+            ))
     
     async def _start_real_camera_hls(self):
-        """실제 홈캠으로 HLS 스트림 생성"""
-        playlist_path = self.hls_dir / f"{self.camera_id}.m3u8"
-        segment_pattern = str(self.hls_dir / f"{self.camera_id}_%03d.ts")
+        """
+        실제 홈캠으로 HLS 스트림 생성
+        
+        FFmpeg 1개가 카메라 입력을 한 번만 디코딩해서 세 곳으로 분기한다.
+          1) HLS 출력 (10초 .ts + .m3u8)
+          2) 10분 경계에 맞춘 아카이브 (SegmentAnalysisScheduler 분석용)
+          3) 저속 raw 프레임 탭 (bgr24, stdout 파이프) → RealtimeEventDetector
+        """
+        from app.services.live_monitoring.realtime_detector import RealtimeEventDetector
         
-        # FFmpeg로 홈캠 스트림을 직접 HLS로 변환
-        ffmpeg_cmd = [
-            'ffmpeg',
-            '-i', str(self.video_source),  # 홈캠 RTSP/HTTP URL
-            '-c:v', 'libx264',
-            '-preset', 'ultrafast',
-            '-tune', 'zerolatency',
-            '-s', f'{self.target_width}x{self.target_height}',
-            '-r', str(self.target_fps),
-            '-f', 'hls',
-            '-hls_time', str(self.segment_duration),
-            '-hls_list_size', '10',
-            '-hls_flags', 'delete_segments',
-            '-hls_segment_filename', segment_pattern,
-            str(playlist_path)
-        ]
+        ffmpeg_path = self._find_ffmpeg_path() or 'ffmpeg'
+        
+        detector = None
+        if self.enable_realtime_detection:
+            detector = RealtimeEventDetector(self.camera_id, age_months=self.age_months)
+        self.detector = detector
+        
+        ffmpeg_cmd = self._build_real_camera_cmd(ffmpeg_path)
+        print(f"[HLS 스트림] 실제 홈캠 시작: {self.camera_id} (프레임 탭: {self.frame_tap_fps}fps)")
         
         try:
-            self.ffmpeg_process = subprocess.Popen(
-                ffmpeg_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
+            # FFmpeg 실행/재시작과 프레임 탭 읽기는 워커 스레드에서 처리
+            self.worker = StreamWorker(
+                self.camera_id,
+                lambda worker: self._real_camera_loop(worker, ffmpeg_cmd),
+                buffer_capacity=self.frame_buffer_capacity,
+                on_stop=self._terminate_ffmpeg,  # 블로킹된 파이프 read를 깨움
+                on_frame_drop=self.frame_pool.release,
             )
+            self.worker.start()
             
-            # FFmpeg 프로세스가 종료될 때까지 대기
-            while self.is_running:
-                if self.ffmpeg_process.poll() is not None:
-                    print("[HLS 스트림] FFmpeg 프로세스 종료, 재시작 시도...")
-                    await asyncio.sleep(5)
-                    # 재시작
-                    self.ffmpeg_process = subprocess.Popen(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                await asyncio.sleep(1)
+            await self._consume_worker_frames(detector)
         
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"[HLS 스트림] 오류: {e}")
         finally:
-            if self.ffmpeg_process:
-                self.ffmpeg_process.terminate()
-                self.ffmpeg_process.wait()
+            await asyncio.to_thread(self._shutdown_pipeline)
             print(f"[HLS 스트림] 종료: {self.camera_id}")
     
-    def _resize_frame(self, frame):
-        """프레임 크기 조정"""
-        height, width = frame.shape[:2]
-        if height != self.target_height or width != self.target_width:
-            scale = self.target_height / height
-            new_width = int(width * scale)
-            frame = cv2.resize(frame, (new_width, self.target_height))
-            
-            if new_width > self.target_width:
-                start_x = (new_width - self.target_width) // 2
-                frame = frame[:, start_x:start_x + self.target_width]
-            elif new_width < self.target_width:
-                pad_left = (self.target_width - new_width) // 2
-                pad_right = self.target_width - new_width - pad_left
-                frame = cv2.copyMakeBorder(
-                    frame, 0, 0, pad_left, pad_right,
-                    cv2.BORDER_CONSTANT, value=(0, 0, 0)
+    def _build_real_camera_cmd(self, ffmpeg_path: str) -> List[str]:
+        """실제 홈캠용 FFmpeg 명령 (1회 디코딩 → HLS + 아카이브 + 프레임 탭)"""
+        source = str(self.video_source)
+        
+        input_args = [ffmpeg_path]
+        if source.startswith('rtsp://'):
+            input_args += ['-rtsp_transport', 'tcp']
+        input_args += ['-i', source]  # 홈캠 RTSP/HTTP URL
+        
+        # 가짜 영상 경로의 _resize_frame과 동일한 규칙: 높이 기준 스케일 → 가운데 크롭 또는 좌우 패딩
+        w, h = self.target_width, self.target_height
+        filter_graph = (
+            f"[0:v]fps={self.target_fps},"
+            f"scale=-2:{h},"
+            f"crop=w=min(iw\\,{w}):h={h},"
+            f"pad={w}:{h}:(ow-iw)/2:0,"
+            f"split=2[enc][tap_src];"
+            f"[tap_src]fps={self.frame_tap_fps}[tap]"
+        )
+        
+        return input_args + [
+            '-filter_complex', filter_graph,
+        ] + self._build_output_args(video_map='[enc]', force_tee=True) + [
+            # 프레임 탭: 탐지기용 raw 프레임을 stdout으로 출력
+            '-map', '[tap]',
+            '-f', 'rawvideo',
+            '-pix_fmt', 'bgr24',
+            'pipe:1',
+        ]
+    
+    def _real_camera_loop(self, worker: StreamWorker, ffmpeg_cmd: List[str]):
+        """[워커 스레드] FFmpeg 실행 → 프레임 탭 읽기, 종료 시 5초 후 재시작"""
+        while self.is_running and not worker.should_stop():
+            try:
+                self.ffmpeg_process = subprocess.Popen(
+                    ffmpeg_cmd,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
                 )
-        return frame
+            except FileNotFoundError as e:
+                print(f"[HLS 스트림] ❌ FFmpeg 실행 실패: {e}")
+                return
+            
+            print(f"[HLS 스트림] ✅ FFmpeg 프로세스 시작 성공 (PID: {self.ffmpeg_process.pid})")
+            self._start_stderr_reader(self.ffmpeg_process)
+            
+            self._read_frame_tap(worker, self.ffmpeg_process)
+            
+            if not self.is_running or worker.should_stop():
+                break
+            
+            print("[HLS 스트림] FFmpeg 프로세스 종료, 재시작 시도...")
+            if worker.wait(5):
+                break
+    
+    def _read_frame_tap(self, worker: StreamWorker, process: subprocess.Popen):
+        """[워커 스레드] stdout 파이프에서 bgr24 프레임을 읽어 링 버퍼로 전달"""
+        while not worker.should_stop():
+            # 풀 버퍼에 바로 읽음 (프레임마다 bytes/배열 할당 없음)
+            frame = self.frame_pool.acquire()
+            if not read_frame_into(process.stdout, frame):
+                # EOF: FFmpeg 종료 (카메라 연결 끊김 또는 중지 요청)
+                break
+            
+            if self.detector:
+                self.frame_pool.hold(frame)
+                worker.frames.put(frame)
+            worker.mark_frame()
+    
+    def _terminate_ffmpeg(self):
+        """실행 중인 FFmpeg 프로세스 종료 요청"""
+        process = self.ffmpeg_process
+        if process and process.poll() is None:
+            process.terminate()
+    
+    def _resize_frame(self, frame):
+        """프레임 크기 조정 (결과는 항상 풀 버퍼, 이미 목표 해상도의 풀 버퍼면 그대로)"""
+        if self.frame_pool.owns(frame):
+            return frame
+        return self.frame_pool.fit_into(frame, self.frame_pool.acquire())
     
     def _start_new_archive(self):
         """새 10분 단위 아카이브 시작"""
-        now = datetime.now()
-        self.current_archive_start = self._get_segment_start_time(now)
-        filename = f"archive_{self.current_archive_start.strftime('%Y%m%d_%H%M%S')}.mp4"
-        self.current_archive_path = self.archive_dir / filename
-        self.current_archive_frame_count = 0
-        
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        self.current_archive_writer = cv2.VideoWriter(
-            str(self.current_archive_path),
-            fourcc,
-            self.target_fps,
-            (self.target_width, self.target_height)
-        )
-        
-        if self.current_archive_writer.isOpened():
-            print(f"[HLS 아카이브] 새 10분 구간 시작: {filename}")
+        with self._archive_lock:
+            now = datetime.now()
+            self.current_archive_start = self._get_segment_start_time(now)
+            filename = f"archive_{self.current_archive_start.strftime('%Y%m%d_%H%M%S')}.mp4"
+            self.current_archive_path = self.archive_dir / filename
+            self.current_archive_started_at = now
+            self.current_archive_frame_count = 0
+            
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            self.current_archive_writer = cv2.VideoWriter(
+                str(self.current_archive_path),
+                fourcc,
+                self.target_fps,
+                (self.target_width, self.target_height)
+            )
+            
+            if self.current_archive_writer.isOpened():
+                print(f"[HLS 아카이브] 새 10분 구간 시작: {filename}")
     
     def _finalize_current_archive(self):
         """현재 10분 단위 아카이브 완료"""
-        if self.current_archive_writer:
+        with self._archive_lock:
+            if not self.current_archive_writer:
+                return
+            
             self.current_archive_writer.release()
             self.current_archive_writer = None
             
@@ -442,6 +866,16 @@ class HLSStreamGenerator:
                 duration_minutes = self.current_archive_frame_count / (self.target_fps * 60)
                 print(f"[HLS 아카이브] 10분 구간 저장 완료: {self.current_archive_path.name}")
                 print(f"  크기: {file_size:.2f}MB, 프레임 수: {self.current_archive_frame_count}, 실제 길이: {duration_minutes:.1f}분")
+                
+                if self.current_archive_frame_count > 0:
+                    self.manifest.append(SegmentRecord(
+                        path=str(self.current_archive_path),
+                        start_time=self.current_archive_started_at,
+                        end_time=datetime.now(),
+                        frame_count=self.current_archive_frame_count,
+                        fps=self.target_fps,
+                        byte_size=self.current_archive_path.stat().st_size,
+                    ))
     
     def _get_segment_start_time(self, now: datetime) -> datetime:
         """현재 시간을 10분 단위로 내림"""
@@ -451,21 +885,54 @@ class HLSStreamGenerator:
     async def _run_gemini_analysis(self, detector, frame):
         """Gemini 분석 실행"""
         try:
-            events = await detector.analyze_with_gemini(frame)
-            if events:
-                detector.save_events(events)
+            event = await detector.analyze_with_gemini(frame)
+            if event:
+                detector.save_events([event])
         except Exception as e:
             print(f"[Gemini 분석] 오류: {e}")
+        finally:
+            self.frame_pool.release(frame)
     
     def stop_streaming(self):
-        """스트리밍 중지"""
+        """
+        스트리밍 중지 (워커 스레드 종료까지 블로킹)
+        
+        이벤트 루프에서는 asyncio.to_thread(generator.stop_streaming)로 호출한다.
+        """
         print(f"[HLS 스트림] 중지 요청: {self.camera_id}")
         self.is_running = False
         
-        if self.ffmpeg_process:
+        if self.worker:
+            self.worker.stop(timeout=10.0)
+        
+        if self.ffmpeg_process and self.ffmpeg_process.poll() is None:
             self.ffmpeg_process.terminate()
         
         self._finalize_current_archive()
+        self._stop_hls_publisher()
+    
+    def get_health(self) -> dict:
+        """스트림 상태 (워커/FFmpeg/아카이브) 요약"""
+        ffmpeg_running = (
+            self.ffmpeg_process is not None and self.ffmpeg_process.poll() is None
+        )
+        return {
+            "camera_id": self.camera_id,
+            "is_running": self.is_running,
+            "is_real_camera": self.is_real_camera,
+            "ffmpeg_running": ffmpeg_running,
+            "ffmpeg_exit_code": self.ffmpeg_process.returncode if self.ffmpeg_process else None,
+            "worker": self.worker.get_health() if self.worker else None,
+            "archive_mode": "ffmpeg_segment" if (self.single_encode or self.is_real_camera) else "opencv_writer",
+            "current_archive": self.current_archive_path.name if self.current_archive_path else None,
+            "current_archive_frames": self.current_archive_frame_count,
+            "hls_store": self.hls_store.get_stats(),
+            "frame_pool": self.frame_pool.get_stats(),
+            "low_latency": self.hls_store.get_latency_stats() if self.low_latency else None,
+            "motion_gate": self.detector.get_gate_stats() if self.detector else None,
+            "snapshot_dedup": self.detector.get_dedup_stats() if self.detector else None,
+            "roi_crop": self.detector.get_roi_stats() if self.detector else None,
+        }
     
     def get_playlist_url(self) -> str:
         """HLS 플레이리스트 URL 반환"""
@@ -1,14 +1,17 @@
 """1시간 단위 분석 스케줄러"""
 
 import asyncio
+import os
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 from sqlalchemy.orm import Session
 
-from app.services.gemini_service import GeminiService
+from app.services.gemini_client import PRIORITY_SEGMENT
+from app.services.gemini_service import get_gemini_service
 from app.models.live_monitoring.models import HourlyAnalysis
 from app.database.session import get_db
+from app.services.live_monitoring.segment_manifest import KIND_HOURLY, get_segment_manifest
 
 
 class HourlyAnalysisScheduler:
@@ -18,8 +21,14 @@ class HourlyAnalysisScheduler:
     
     def __init__(self, camera_id: str):
         self.camera_id = camera_id
-        self.gemini_service = GeminiService()
+        self.gemini_service = get_gemini_service()
         self.buffer_dir = Path(f"temp_videos/hourly_buffer/{camera_id}")
+        self.manifest = get_segment_manifest(camera_id)
+        self.manifest_wait_seconds = 30  # 마지막 파일이 매니페스트에 기록될 때까지 최대 대기
+        # 1시간 영상을 이 길이의 청크로 나눠 1단계 메타데이터를 동시에 추출 (0이면 한 번에 분석)
+        self.chunk_seconds = float(os.getenv("HOURLY_ANALYSIS_CHUNK_SECONDS", "600"))
+        # 아카이브 영상을 움직임 영역(아이 주변)으로 크롭해서 분석 (옵트인)
+        self.roi_crop = os.getenv("SEGMENT_ROI_CROP", "0") == "1"
         self.is_running = False
         
     async def start_scheduler(self):
@@ -68,7 +77,8 @@ class HourlyAnalysisScheduler:
             print(f"[분석 스케줄러] 분석 시작: {hour_start} ~ {hour_end}")
             
             # 2. 해당 시간대의 비디오 파일 찾기
-            video_path = self._get_hourly_video(hour_start)
+            await self.manifest.wait_for_segment_end(hour_end, KIND_HOURLY, timeout=self.manifest_wait_seconds)
+            video_path = self._get_hourly_video(hour_start, hour_end)
             if not video_path or not video_path.exists():
                 print(f"[분석 스케줄러] 비디오 파일 없음: {hour_start}")
                 return
@@ -98,15 +108,16 @@ class HourlyAnalysisScheduler:
             
             print(f"[분석 스케줄러] 분석 중: {video_path.name}")
             
-            # 5. Gemini로 상세 분석
-            with open(video_path, 'rb') as f:
-                video_bytes = f.read()
-            
+            # 5. Gemini로 상세 분석 (전처리 프로세스 풀이 경로에서 직접 읽음, 청크 단위 map-reduce)
             analysis_result = await self.gemini_service.analyze_video_vlm(
-                video_bytes=video_bytes,
+                video_path=str(video_path),
                 content_type="video/mp4",
-                stage=None,  # 자동 판단
-                age_months=None  # 설정에서 가져오기 (추후 구현)
+                stage=None,  # 자동 판단 (단계 캐시 우선)
+                age_months=None,  # 설정에서 가져오기 (추후 구현)
+                priority=PRIORITY_SEGMENT,
+                stage_cache_key=f"camera:{self.camera_id}",
+                chunk_seconds=self.chunk_seconds or None,
+                roi_crop=self.roi_crop,
             )
             
             # 6. 결과 저장
@@ -117,7 +128,12 @@ class HourlyAnalysisScheduler:
             hourly_analysis.completed_at = datetime.now()
             hourly_analysis.safety_score = safety_analysis.get('safety_score', 100)
             hourly_analysis.incident_count = len(safety_analysis.get('incident_events', []))
-            
+            if analysis_result.get('partial'):
+                # 일부 청크 전처리 실패: 결과는 저장하되 빠진 구간을 남김
+                missing = ', '.join(f"{start:.0f}~{end:.0f}초" for start, end in analysis_result.get('missing_ranges', []))
+                hourly_analysis.error_message = f"부분 분석 (누락 구간: {missing})"
+                print(f"[분석 스케줄러] ⚠️ 부분 분석: 누락 구간 {missing}")
+
             db.commit()
             
             print(f"[분석 스케줄러] 분석 완료: {hour_start} ~ {hour_end}")
@@ -142,8 +158,14 @@ class HourlyAnalysisScheduler:
         finally:
             db.close()
     
-    def _get_hourly_video(self, hour_start: datetime) -> Optional[Path]:
+    def _get_hourly_video(self, hour_start: datetime, hour_end: datetime) -> Optional[Path]:
         """해당 시간대의 비디오 파일 경로 반환"""
+        # 매니페스트에서 시간대와 가장 많이 겹치는 파일 (비디오 파일 접근 없음)
+        record = self.manifest.find_best_segment(hour_start, hour_end, KIND_HOURLY)
+        if record:
+            return Path(record.path)
+        
+        # 매니페스트 도입 이전 파일
         filename = f"hourly_{hour_start.strftime('%Y%m%d_%H%M%S')}.mp4"
         video_path = self.buffer_dir / filename
         
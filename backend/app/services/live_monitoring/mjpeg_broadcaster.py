@@ -0,0 +1,154 @@
+"""카메라별 공유 MJPEG 브로드캐스터 - 디코딩/JPEG 인코딩은 1번, 시청자는 최신 프레임만 읽음"""
+
+import asyncio
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.live_monitoring.async_notifier import AsyncNotifier
+from app.services.live_monitoring.stream_worker import StreamWorker
+
+
+# (BGR 프레임, 원본 fps)를 순서대로 내보내는 동기 제너레이터 팩토리
+FrameSourceFactory = Callable[[], Iterable[Tuple[np.ndarray, float]]]
+
+
+class MJPEGBroadcaster:
+    """
+    스트림 1개를 여러 시청자에게 공유
+
+    - 워커 스레드가 프레임을 디코딩 → JPEG 인코딩 후 최신 프레임 1장만 보관
+    - 시청자는 새 프레임 알림을 받을 때마다 최신 프레임만 전송
+      → 느린 클라이언트는 중간 프레임을 건너뜀 (백로그가 쌓이지 않음)
+    - 첫 시청자가 붙을 때 시작, 마지막 시청자가 나가면 중지
+    """
+
+    def __init__(
+        self,
+        key: str,
+        source_factory: FrameSourceFactory,
+        speed: float = 1.0,
+        jpeg_quality: int = 85,
+    ):
+        self.key = key
+        self.source_factory = source_factory
+        self.speed = speed
+        self.jpeg_quality = jpeg_quality
+
+        self.worker: Optional[StreamWorker] = None
+        self.notifier = AsyncNotifier()
+        self.viewer_count = 0
+        self.finished = False  # 소스가 끝남 (loop=False)
+
+        # 최신 프레임 (시퀀스 번호, MJPEG 파트 바이트)
+        self._latest: Optional[Tuple[int, bytes]] = None
+        self._seq = 0
+
+    def _start(self):
+        self.finished = False
+        self._latest = None
+        self.worker = StreamWorker(f"mjpeg-{self.key}", self._broadcast_loop, buffer_capacity=1)
+        self.worker.start()
+
+    def _stop(self):
+        if self.worker:
+            # 디코딩 스레드는 다음 프레임에서 스스로 종료 (이벤트 루프는 기다리지 않음)
+            self.worker.stop(timeout=0)
+            self.worker = None
+
+    def _broadcast_loop(self, worker: StreamWorker):
+        """[워커 스레드] 디코딩 → JPEG 인코딩 → 최신 프레임 교체 → 시청자 알림"""
+        encode_params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        next_frame_time = time.monotonic()
+
+        try:
+            for frame, fps in self.source_factory():
+                if worker.should_stop():
+                    break
+
+                ret, buffer = cv2.imencode('.jpg', frame, encode_params)
+                if not ret:
+                    continue
+
+                self._seq += 1
+                self._latest = (
+                    self._seq,
+                    b'--frame\r\n'
+                    b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n'
+                )
+                worker.mark_frame()
+                self.notifier.notify()
+
+                # 속도 조절 (원본 fps 기준, 누적 오차 없이)
+                if self.speed > 0:
+                    next_frame_time += 1.0 / (fps * self.speed)
+                    delay = next_frame_time - time.monotonic()
+                    if delay > 0:
+                        if worker.wait(delay):
+                            break
+                    else:
+                        next_frame_time = time.monotonic()
+        finally:
+            self.finished = True
+            self.notifier.notify()
+
+    async def stream(self):
+        """시청자 1명용 MJPEG 제너레이터 (StreamingResponse에 그대로 전달)"""
+        self.viewer_count += 1
+        if self.worker is None or not self.worker.is_alive():
+            self._start()
+        print(f"[MJPEG] 시청자 연결: {self.key} (시청자 {self.viewer_count}명)")
+
+        last_seq = 0
+        try:
+            while True:
+                version = self.notifier.version
+                latest = self._latest
+                if latest and latest[0] != last_seq:
+                    last_seq = latest[0]
+                    yield latest[1]
+                    continue
+
+                if self.finished:
+                    break
+
+                await self.notifier.wait(version, timeout=1.0)
+        except asyncio.CancelledError:
+            print(f"[MJPEG] 클라이언트 연결 끊김: {self.key}")
+            raise
+        finally:
+            self.viewer_count -= 1
+            print(f"[MJPEG] 시청자 종료: {self.key} (남은 시청자 {self.viewer_count}명)")
+            if self.viewer_count <= 0:
+                self._stop()
+                if _broadcasters.get(self.key) is self:
+                    del _broadcasters[self.key]
+
+    def get_stats(self) -> dict:
+        worker_health = self.worker.get_health() if self.worker else None
+        return {
+            "key": self.key,
+            "viewer_count": self.viewer_count,
+            "finished": self.finished,
+            "frames_encoded": self._seq,
+            "worker": worker_health,
+        }
+
+
+# 전역 브로드캐스터 관리 (이벤트 루프에서만 접근)
+_broadcasters: Dict[str, MJPEGBroadcaster] = {}
+
+
+def get_broadcaster(key: str, source_factory: FrameSourceFactory, speed: float = 1.0) -> MJPEGBroadcaster:
+    """같은 key의 브로드캐스터가 있으면 공유, 없으면 생성"""
+    broadcaster = _broadcasters.get(key)
+    if broadcaster is None:
+        broadcaster = MJPEGBroadcaster(key, source_factory, speed=speed)
+        _broadcasters[key] = broadcaster
+    return broadcaster
+
+
+def get_broadcaster_stats() -> list:
+    return [b.get_stats() for b in _broadcasters.values()]
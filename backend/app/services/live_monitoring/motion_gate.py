@@ -0,0 +1,205 @@
+"""
+움직임 게이트 (실시간 Gemini 스냅샷 호출 여부 결정)
+
+RealtimeEventDetector는 방이 비었거나 아이가 자는 동안에도 45초마다 Gemini 스냅샷을 보냈다.
+게이트는 이벤트를 만들지 않고 "이번 프레임을 보낼 가치가 있는지"만 판단한다.
+- 축소(기본 폭 160px) 그레이스케일 프레임에 배경 차분 (cv2.accumulateWeighted 누적 평균 배경, 전부 벡터 연산)
+- 카메라별 적응 임계값: 정지 프레임의 평균 차이(노이즈)와 움직임 비율 분포를 EMA로 학습
+- 결정: 정지 장면은 건너뜀, 움직임 급증(burst)은 즉시 전송, 움직임이 이어지면 active_interval마다,
+  아무 변화가 없어도 heartbeat_interval마다 1회 전송
+"""
+
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# 전송 사유
+REASON_INITIAL = "initial"
+REASON_BURST = "burst"
+REASON_ACTIVITY = "activity"
+REASON_HEARTBEAT = "heartbeat"
+
+
+class MotionSample:
+    """프레임 1장의 움직임 측정 결과"""
+
+    __slots__ = ("ratio", "moving", "burst", "bbox")
+
+    def __init__(
+        self,
+        ratio: float,
+        moving: bool,
+        burst: bool,
+        bbox: Optional[Tuple[int, int, int, int]] = None,
+    ):
+        self.ratio = ratio      # 배경과 다른 픽셀 비율 (0.0 ~ 1.0)
+        self.moving = moving
+        self.burst = burst
+        self.bbox = bbox        # 움직임 영역 (원본 프레임 좌표 x, y, w, h)
+
+    @property
+    def intensity(self) -> float:
+        """기존 detect_motion과 같은 척도 (면적 비율 x 10, 최대 1.0)"""
+        return min(self.ratio * 10, 1.0)
+
+
+class MotionGate:
+    """
+    카메라 1대의 움직임 게이트
+
+    - update(frame): 배경 차분 → MotionSample (프레임마다 호출, 1fps 탭 기준 1ms 미만)
+    - decide(): (전송 여부, 사유) — True를 반환하면 전송한 것으로 기록
+    """
+
+    def __init__(
+        self,
+        analysis_width: int = 160,
+        min_interval: Optional[float] = None,
+        active_interval: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+    ):
+        self.analysis_width = analysis_width
+        self.min_interval = min_interval or float(os.getenv("REALTIME_GATE_MIN_INTERVAL", "10"))
+        self.active_interval = active_interval or float(os.getenv("REALTIME_GATE_ACTIVE_INTERVAL", "45"))
+        self.heartbeat_interval = heartbeat_interval or float(os.getenv("REALTIME_GATE_HEARTBEAT_INTERVAL", "300"))
+
+        self.background_rate = 0.05       # 정지 픽셀 배경 학습률
+        self.foreground_rate = 0.005      # 움직인 픽셀도 천천히 흡수 (옮겨진 가구 등)
+        self.stats_rate = 0.05            # 노이즈/움직임 비율 EMA 학습률
+        self.min_pixel_threshold = 12.0   # 픽셀 차이 최소 임계값 (0~255)
+        self.noise_multiplier = 3.0
+        self.min_motion_ratio = 0.003     # 움직임으로 볼 최소 픽셀 비율
+        self.ratio_sigma = 4.0            # 정지 상태 움직임 비율 평균 + 4σ
+        self.burst_ratio = 0.02           # 급증으로 볼 최소 픽셀 비율
+        self.burst_multiplier = 3.0       # 움직임 임계값의 3배 이상이면 급증
+
+        self._background: Optional[np.ndarray] = None
+        self._noise = 0.0
+        self._ratio_mean = 0.0
+        self._ratio_var = 0.0
+        self._scale = 1.0
+
+        self._last_send: Optional[float] = None
+        self._motion_since_send = False
+        self._burst_pending = False
+        self._started = time.monotonic()
+        self.last_sample: Optional[MotionSample] = None
+
+        # 통계
+        self.frame_count = 0
+        self.moving_frames = 0
+        self.burst_frames = 0
+        self.sends: Dict[str, int] = {}
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        self._scale = width / float(self.analysis_width)
+        small = cv2.resize(
+            frame, (self.analysis_width, max(1, int(height / self._scale))), interpolation=cv2.INTER_AREA
+        )
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def update(self, frame: np.ndarray) -> MotionSample:
+        gray = self._prepare(frame)
+        self.frame_count += 1
+
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self.last_sample = MotionSample(0.0, False, False)
+            return self.last_sample
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        pixel_threshold = max(self.min_pixel_threshold, self.noise_multiplier * self._noise)
+        mask = diff > pixel_threshold
+        ratio = float(np.count_nonzero(mask)) / mask.size
+
+        motion_threshold = max(self.min_motion_ratio, self._ratio_mean + self.ratio_sigma * self._ratio_var ** 0.5)
+        moving = ratio >= motion_threshold
+        burst = moving and ratio >= max(self.burst_ratio, motion_threshold * self.burst_multiplier)
+
+        # 배경 갱신: 정지 픽셀은 빠르게, 움직인 픽셀은 천천히
+        foreground = mask.astype(np.uint8)
+        cv2.accumulateWeighted(gray, self._background, self.background_rate, mask=1 - foreground)
+        cv2.accumulateWeighted(gray, self._background, self.foreground_rate, mask=foreground)
+
+        # 적응 임계값은 정지 프레임으로만 학습 (활동이 길어져도 기준이 올라가지 않도록)
+        if not moving:
+            rate = self.stats_rate
+            self._noise += rate * (float(diff.mean()) - self._noise)
+            delta = ratio - self._ratio_mean
+            self._ratio_mean += rate * delta
+            self._ratio_var = (1 - rate) * (self._ratio_var + rate * delta * delta)
+
+        bbox = self._bounding_box(foreground) if moving else None
+        if moving:
+            self.moving_frames += 1
+            self._motion_since_send = True
+        if burst:
+            self.burst_frames += 1
+            self._burst_pending = True
+
+        self.last_sample = MotionSample(ratio, moving, burst, bbox)
+        return self.last_sample
+
+    def _bounding_box(self, foreground: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """움직인 픽셀 영역 전체를 감싸는 박스 (원본 프레임 좌표)"""
+        points = cv2.findNonZero(cv2.dilate(foreground, None, iterations=1))
+        if points is None:
+            return None
+        x, y, w, h = cv2.boundingRect(points)
+        s = self._scale
+        return int(x * s), int(y * s), int(w * s), int(h * s)
+
+    def decide(self) -> Tuple[bool, str]:
+        """
+        지금 스냅샷을 보낼지 결정
+
+        Returns:
+            (전송 여부, 사유) — 전송: initial/burst/activity/heartbeat, 생략: cooldown/static/waiting
+        """
+        now = time.monotonic()
+        if self._last_send is None:
+            return self._send(now, REASON_INITIAL)
+
+        elapsed = now - self._last_send
+        if elapsed < self.min_interval:
+            return False, "cooldown"
+        if self._burst_pending:
+            return self._send(now, REASON_BURST)
+        if self._motion_since_send and elapsed >= self.active_interval:
+            return self._send(now, REASON_ACTIVITY)
+        if elapsed >= self.heartbeat_interval:
+            return self._send(now, REASON_HEARTBEAT)
+        return False, "waiting" if self._motion_since_send else "static"
+
+    def _send(self, now: float, reason: str) -> Tuple[bool, str]:
+        self._last_send = now
+        self._motion_since_send = False
+        self._burst_pending = False
+        self.sends[reason] = self.sends.get(reason, 0) + 1
+        return True, reason
+
+    def get_stats(self) -> dict:
+        elapsed = time.monotonic() - self._started
+        sent = sum(self.sends.values())
+        # 게이트 없이 active_interval마다 보냈을 때의 호출 수
+        baseline = int(elapsed // self.active_interval) + 1
+        return {
+            "frames": self.frame_count,
+            "moving_frames": self.moving_frames,
+            "burst_frames": self.burst_frames,
+            "sends": dict(self.sends),
+            "sent": sent,
+            "baseline_sends": baseline,
+            "reduction": round(1 - sent / baseline, 3) if baseline else 0.0,
+            "noise": round(self._noise, 2),
+            "motion_threshold": round(
+                max(self.min_motion_ratio, self._ratio_mean + self.ratio_sigma * self._ratio_var ** 0.5), 4
+            ),
+            "last_ratio": round(self.last_sample.ratio, 4) if self.last_sample else None,
+        }
@@ -2,34 +2,35 @@
 
 import cv2
 import numpy as np
+import os
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Tuple
 from pathlib import Path
 import asyncio
 
 from app.models.live_monitoring.models import RealtimeEvent
-from app.database.session import get_db
-from app.services.gemini_service import GeminiService
+from app.services.live_monitoring.event_writer import get_event_writer
+from app.services.gemini_service import get_gemini_service
+from app.services.live_monitoring.motion_gate import REASON_BURST, MotionGate
+from app.services.live_monitoring.snapshot_batcher import get_snapshot_batcher
+from app.services.live_monitoring.snapshot_dedup import SnapshotDedup, phash
+from app.services.roi_crop import RoiTracker, snapshot_images
 
 
 class RealtimeEventDetector:
     """
     실시간 이벤트 탐지 (하이브리드)
     - 경량 탐지: 움직임 감지, 위험 구역 진입 (즉시)
-    - Gemini 분석: 30초~1분마다 상세 분석 (높은 정확도)
+    - Gemini 분석: 움직임 게이트가 보낼 가치가 있다고 판단한 프레임만 상세 분석 (높은 정확도)
     """
     
     def __init__(self, camera_id: str, age_months: Optional[int] = None):
         self.camera_id = camera_id
         self.age_months = age_months
-        self.prev_frame = None
-        # OpenCV 경량 탐지 비활성화 (Gemini만 사용)
+        # OpenCV 경량 탐지(위험 구역 이벤트) 비활성화 (Gemini만 사용)
         # 이유: 하드코딩된 위험 구역이 부정확하고, Gemini가 더 정확함
         self.enable_opencv_detection = False
         
-        self.motion_threshold = 30  # 움직임 감지 임계값 (사용 안 함)
-        self.min_contour_area = 500  # 최소 윤곽 면적 (사용 안 함)
-        
         # 위험 구역 정의 - 비활성화됨
         self.danger_zones = []
         
@@ -38,54 +39,37 @@ class RealtimeEventDetector:
         self.event_cooldown = 10  # 초
         
         # Gemini 분석 관련
-        self.gemini_service = GeminiService()
+        self.gemini_service = get_gemini_service()
         self.last_gemini_analysis: Optional[datetime] = None
-        self.gemini_analysis_interval = 45  # 45초마다 Gemini 분석 (1분 내외)
+        self.gemini_analysis_interval = 45  # 움직임이 이어질 때 Gemini 분석 간격 (게이트 비활성화 시 고정 간격)
         self.gemini_analysis_running = False
         self.last_analyzed_frame: Optional[np.ndarray] = None
         
+        # 움직임 게이트: 정지 장면은 건너뛰고, 급증 시 즉시, 변화가 없어도 heartbeat 간격마다 1회
+        self.motion_gate_enabled = os.getenv("REALTIME_MOTION_GATE", "1") == "1"
+        self.motion_gate = MotionGate(active_interval=self.gemini_analysis_interval)
+        self.last_gate_reason: Optional[str] = None
+        
+        # 스냅샷 중복 제거: 최근 스냅샷과 거의 같은 프레임이면 이전 Gemini 결과 재사용
+        self.dedup_enabled = os.getenv("REALTIME_SNAPSHOT_DEDUP", "1") == "1"
+        self.snapshot_dedup = SnapshotDedup()
+        
+        # 배치 분석: 여러 카메라의 스냅샷을 짧은 창 동안 모아 요청 1번으로 분석 (실패 시 단일 요청)
+        self.batch_enabled = os.getenv("REALTIME_SNAPSHOT_BATCH", "1") == "1"
+        
+        # ROI 크롭 (옵트인): 움직임 박스로 아이 주변을 추적해 확대 이미지 + 전체 장면 썸네일로 전송
+        self.roi_enabled = os.getenv("REALTIME_ROI_CROP", "0") == "1"
+        self.roi_tracker = RoiTracker()
+        
     def detect_motion(self, frame: np.ndarray) -> Tuple[bool, float, Optional[Tuple[int, int, int, int]]]:
         """
-        움직임 감지
+        움직임 감지 (움직임 게이트의 배경 차분 결과)
         
         Returns:
             (움직임 감지 여부, 움직임 강도, 바운딩 박스)
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
-        
-        if self.prev_frame is None:
-            self.prev_frame = gray
-            return False, 0.0, None
-        
-        # 프레임 차이 계산
-        frame_diff = cv2.absdiff(self.prev_frame, gray)
-        thresh = cv2.threshold(frame_diff, self.motion_threshold, 255, cv2.THRESH_BINARY)[1]
-        thresh = cv2.dilate(thresh, None, iterations=2)
-        
-        # 윤곽 찾기
-        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        self.prev_frame = gray
-        
-        if not contours:
-            return False, 0.0, None
-        
-        # 가장 큰 윤곽 찾기
-        largest_contour = max(contours, key=cv2.contourArea)
-        area = cv2.contourArea(largest_contour)
-        
-        if area < self.min_contour_area:
-            return False, 0.0, None
-        
-        # 바운딩 박스
-        x, y, w, h = cv2.boundingRect(largest_contour)
-        
-        # 움직임 강도 (0.0 ~ 1.0)
-        frame_area = frame.shape[0] * frame.shape[1]
-        motion_intensity = min(area / frame_area * 10, 1.0)
-        
-        return True, motion_intensity, (x, y, w, h)
+        sample = self.motion_gate.update(frame)
+        return sample.moving, sample.intensity, sample.bbox
     
     def check_danger_zone(self, bbox: Tuple[int, int, int, int], frame_shape: Tuple[int, int]) -> Optional[Dict]:
         """
@@ -137,10 +121,21 @@ class RealtimeEventDetector:
         return elapsed > self.event_cooldown
     
     def should_run_gemini_analysis(self) -> bool:
-        """Gemini 분석을 실행해야 하는지 확인"""
+        """
+        Gemini 분석을 실행해야 하는지 확인
+        
+        게이트가 켜져 있으면 게이트 결정을 따르고 (True면 전송한 것으로 기록), 꺼져 있으면 고정 간격
+        """
         if self.gemini_analysis_running:
             return False
         
+        if self.motion_gate_enabled:
+            send, reason = self.motion_gate.decide()
+            if send:
+                self.last_gate_reason = reason
+                print(f"[움직임 게이트] {self.camera_id}: 스냅샷 전송 ({reason})")
+            return send
+        
         if self.last_gemini_analysis is None:
             return True
         
@@ -158,60 +153,59 @@ class RealtimeEventDetector:
             self.gemini_analysis_running = True
             self.last_gemini_analysis = datetime.now()
             
-            # 프레임을 JPEG로 인코딩
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not ret:
-                print("[Gemini 분석] 프레임 인코딩 실패")
-                return None
+            # 지각 해시로 최근 스냅샷과 비교 (움직임 급증 프레임은 항상 새로 분석)
+            frame_hash = None
+            if self.dedup_enabled and not (self.motion_gate_enabled and self.last_gate_reason == REASON_BURST):
+                frame_hash = phash(frame)
+                reused = self.snapshot_dedup.lookup(frame_hash)
+                if reused is not None:
+                    result, distance, age = reused
+                    print(
+                        f"[스냅샷 중복] {self.camera_id}: 해밍 거리 {distance}, "
+                        f"{age:.0f}초 전 결과 재사용 → Gemini 호출 생략"
+                    )
+                    return self._event_from_result(result, {
+                        'deduplicated': True,
+                        'hash_distance': distance,
+                        'reused_result_age_seconds': round(age, 1),
+                    })
             
-            frame_bytes = buffer.tobytes()
+            # 프레임을 JPEG로 인코딩 (ROI가 있으면 아이 주변 크롭 + 전체 장면 썸네일)
+            context_bytes = None
+            roi_images = None
+            region = self.roi_tracker.region() if self.roi_enabled else None
+            if region is not None:
+                roi_images = snapshot_images(frame, region)
+            if roi_images is not None:
+                frame_bytes, context_bytes = roi_images
+            else:
+                region = None
+                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                if not ret:
+                    print("[Gemini 분석] 프레임 인코딩 실패")
+                    return None
+                frame_bytes = buffer.tobytes()
+            if self.roi_enabled:
+                self.roi_tracker.record(region)
             
             # Gemini 분석 호출
             print(f"[Gemini 분석] 시작...")
-            result = await self.gemini_service.analyze_realtime_snapshot(
-                frame_or_video=frame_bytes,
-                content_type="image/jpeg",
-                age_months=self.age_months
-            )
+            if self.batch_enabled:
+                result = await get_snapshot_batcher().analyze(
+                    self.camera_id, frame_bytes, "image/jpeg", self.age_months, context_bytes
+                )
+            else:
+                result = await self.gemini_service.analyze_realtime_snapshot(
+                    frame_or_video=frame_bytes,
+                    content_type="image/jpeg",
+                    age_months=self.age_months,
+                    context_image=context_bytes,
+                )
+            if frame_hash is not None:
+                self.snapshot_dedup.store(frame_hash, result)
             
-            # 결과를 RealtimeEvent로 변환
-            event_summary = result.get('event_summary', {})
-            safety_status = result.get('safety_status', {})
-            current_activity = result.get('current_activity', {})
-            dev_obs = result.get('developmental_observation', {})
-            
-            # severity 매핑
-            severity_map = {
-                'danger': 'danger',
-                'warning': 'warning',
-                'safe': 'safe',
-                'info': 'info'
-            }
-            severity = severity_map.get(event_summary.get('severity', 'info'), 'info')
-            
-            # event_type 결정
-            event_type = 'safety' if severity in ['danger', 'warning'] else 'development'
-            if dev_obs.get('notable'):
-                event_type = 'development'
-            
-            event = RealtimeEvent(
-                camera_id=self.camera_id,
-                timestamp=datetime.now(),
-                event_type=event_type,
-                severity=severity,
-                title=event_summary.get('title', '활동 감지'),
-                description=event_summary.get('description', ''),
-                location=current_activity.get('location', '알 수 없음'),
-                event_metadata={
-                    'gemini_analysis': True,
-                    'current_activity': current_activity,
-                    'safety_status': safety_status,
-                    'developmental_observation': dev_obs,
-                    'action_needed': event_summary.get('action_needed')
-                }
-            )
-            
-            print(f"[Gemini 분석] 완료: {event.title} (severity: {severity})")
+            event = self._event_from_result(result, {'roi': list(region)} if region else None)
+            print(f"[Gemini 분석] 완료: {event.title} (severity: {event.severity})")
             return event
             
         except Exception as e:
@@ -220,28 +214,73 @@ class RealtimeEventDetector:
         finally:
             self.gemini_analysis_running = False
     
+    def _event_from_result(self, result: dict, extra_metadata: Optional[Dict] = None) -> RealtimeEvent:
+        """Gemini 스냅샷 결과 → RealtimeEvent"""
+        event_summary = result.get('event_summary', {})
+        safety_status = result.get('safety_status', {})
+        current_activity = result.get('current_activity', {})
+        dev_obs = result.get('developmental_observation', {})
+        
+        # severity 매핑
+        severity_map = {
+            'danger': 'danger',
+            'warning': 'warning',
+            'safe': 'safe',
+            'info': 'info'
+        }
+        severity = severity_map.get(event_summary.get('severity', 'info'), 'info')
+        
+        # event_type 결정
+        event_type = 'safety' if severity in ['danger', 'warning'] else 'development'
+        if dev_obs.get('notable'):
+            event_type = 'development'
+        
+        event = RealtimeEvent(
+            camera_id=self.camera_id,
+            timestamp=datetime.now(),
+            event_type=event_type,
+            severity=severity,
+            title=event_summary.get('title', '활동 감지'),
+            description=event_summary.get('description', ''),
+            location=current_activity.get('location', '알 수 없음'),
+            event_metadata={
+                'gemini_analysis': True,
+                'current_activity': current_activity,
+                'safety_status': safety_status,
+                'developmental_observation': dev_obs,
+                'action_needed': event_summary.get('action_needed'),
+                'trigger': self.last_gate_reason if self.motion_gate_enabled else 'interval',
+                **(extra_metadata or {})
+            }
+        )
+        return event
+    
     def process_frame(self, frame: np.ndarray) -> List[RealtimeEvent]:
         """
         프레임 처리 및 이벤트 생성 (동기 버전)
         
-        OpenCV 경량 탐지는 비활성화됨 - Gemini만 사용
+        움직임 게이트는 항상 갱신하고, 위험 구역 이벤트(OpenCV 경량 탐지)는 비활성화됨 - Gemini만 사용
         
         Returns:
-            생성된 이벤트 리스트 (항상 빈 리스트)
+            생성된 이벤트 리스트 (enable_opencv_detection = False면 항상 빈 리스트)
         """
         events = []
         
-        # 프레임 저장 (Gemini 분석용)
-        self.last_analyzed_frame = frame.copy()
+        # 프레임 참조 저장 (Gemini 분석용, 복사 없음 - 생성기가 풀 버퍼를 hold해 둠)
+        self.last_analyzed_frame = frame
         
-        # OpenCV 경량 탐지 비활성화
-        # 이유: 하드코딩된 위험 구역이 부정확하고, Gemini가 더 정확함
-        if not self.enable_opencv_detection:
+        if not (self.motion_gate_enabled or self.roi_enabled) and not self.enable_opencv_detection:
             return events
         
-        # 아래 코드는 실행되지 않음 (enable_opencv_detection = False)
-        # 1. 움직임 감지 (경량, 즉시)
+        # 1. 움직임 감지 (축소 프레임 배경 차분, 게이트 상태 갱신) + ROI 추적
         motion_detected, motion_intensity, bbox = self.detect_motion(frame)
+        if self.roi_enabled:
+            self.roi_tracker.update(bbox, frame.shape)
+        
+        # OpenCV 경량 탐지 비활성화 (게이트만 갱신, 이벤트는 만들지 않음)
+        # 이유: 하드코딩된 위험 구역이 부정확하고, Gemini가 더 정확함
+        if not self.enable_opencv_detection:
+            return events
         
         if not motion_detected:
             return events
@@ -288,7 +327,7 @@ class RealtimeEventDetector:
         lightweight_events = self.process_frame(frame)
         events.extend(lightweight_events)
         
-        # 2. Gemini 분석 (45초마다)
+        # 2. Gemini 분석 (움직임 게이트 결정)
         if self.should_run_gemini_analysis():
             gemini_event = await self.analyze_with_gemini(frame)
             if gemini_event:
@@ -296,22 +335,30 @@ class RealtimeEventDetector:
         
         return events
     
+    def get_gate_stats(self) -> dict:
+        """움직임 게이트 통계 (전송 사유별 횟수, 고정 간격 대비 감소율, 적응 임계값)"""
+        stats = self.motion_gate.get_stats()
+        stats["enabled"] = self.motion_gate_enabled
+        return stats
+    
+    def get_dedup_stats(self) -> dict:
+        """스냅샷 중복 제거 통계 (재사용 비율, 미스 사유별 횟수)"""
+        stats = self.snapshot_dedup.get_stats()
+        stats["enabled"] = self.dedup_enabled
+        return stats
+    
+    def get_roi_stats(self) -> dict:
+        """ROI 크롭 통계 (현재 영역, 크롭 비율, 추정 절감 토큰)"""
+        stats = self.roi_tracker.get_stats()
+        stats["enabled"] = self.roi_enabled
+        return stats
+    
     def save_events(self, events: List[RealtimeEvent]):
         """
-        이벤트를 데이터베이스에 저장
+        이벤트를 데이터베이스에 저장 (프로세스 전역 일괄 저장기 대기열에 넣고 바로 반환)
         """
         if not events:
             return
         
-        db = next(get_db())
-        try:
-            for event in events:
-                db.add(event)
-            db.commit()
-            print(f"[실시간 탐지] {len(events)}개 이벤트 저장됨")
-        except Exception as e:
-            print(f"[실시간 탐지] 이벤트 저장 실패: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        get_event_writer().submit(events)
 
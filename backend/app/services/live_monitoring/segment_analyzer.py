@@ -1,14 +1,19 @@
 """5분 단위 분석 스케줄러"""
 
 import asyncio
+import os
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 from sqlalchemy.orm import Session
 
-from app.services.gemini_service import GeminiService
+from app.services.gemini_client import PRIORITY_SEGMENT
+from app.services.gemini_service import get_gemini_service
+from app.services.stage_cache import age_months_from_birthdate, get_stage_cache
 from app.models.live_monitoring.models import SegmentAnalysis
+from app.models.user import User
 from app.database.session import get_db
+from app.services.live_monitoring.segment_manifest import KIND_SEGMENT, get_segment_manifest
 
 
 class SegmentAnalysisScheduler:
@@ -16,10 +21,18 @@ class SegmentAnalysisScheduler:
     5분 단위로 비디오를 분석하는 스케줄러
     """
     
-    def __init__(self, camera_id: str):
+    def __init__(self, camera_id: str, user_id: Optional[int] = None, age_months: Optional[int] = None):
         self.camera_id = camera_id
-        self.gemini_service = GeminiService()
+        self.user_id = user_id
+        self.age_months = age_months
+        # 발달 단계 캐시 키 (사용자를 알면 사용자 단위, 아니면 카메라 단위)
+        self.stage_cache_key = f"user:{user_id}" if user_id is not None else f"camera:{camera_id}"
+        self.gemini_service = get_gemini_service()
         self.buffer_dir = Path(f"temp_videos/hourly_buffer/{camera_id}")
+        self.manifest = get_segment_manifest(camera_id)
+        self.manifest_wait_seconds = 30  # 마지막 파일이 매니페스트에 기록될 때까지 최대 대기
+        # 아카이브 영상을 움직임 영역(아이 주변)으로 크롭해서 분석 (옵트인)
+        self.roi_crop = os.getenv("SEGMENT_ROI_CROP", "0") == "1"
         self.is_running = False
         self.segment_duration_minutes = 10
         
@@ -76,8 +89,9 @@ class SegmentAnalysisScheduler:
             
             print(f"[10분 분석 스케줄러] 분석 시작: {segment_start.strftime('%H:%M:%S')} ~ {segment_end.strftime('%H:%M:%S')}")
             
-            # 2. 해당 구간의 비디오 파일 찾기
-            video_path = self._get_segment_video(segment_start)
+            # 2. 해당 구간의 비디오 파일 찾기 (생산자가 구간 끝까지 기록할 때까지 잠시 대기)
+            await self.manifest.wait_for_segment_end(segment_end, KIND_SEGMENT, timeout=self.manifest_wait_seconds)
+            video_path = self._get_segment_video(segment_start, segment_end)
             if not video_path or not video_path.exists():
                 print(f"[10분 분석 스케줄러] 비디오 파일 없음: {segment_start.strftime('%H:%M:%S')}")
                 return
@@ -107,15 +121,17 @@ class SegmentAnalysisScheduler:
             
             print(f"[10분 분석 스케줄러] 분석 중: {video_path.name}")
             
-            # 5. Gemini로 상세 분석
-            with open(video_path, 'rb') as f:
-                video_bytes = f.read()
-            
+            # 5. Gemini로 상세 분석 (전처리 프로세스 풀이 경로에서 직접 읽음)
+            #    발달 단계는 단계 캐시가 유효하면 재사용 (2단계 LLM 생략)
+            age_months = self._resolve_age_months(db)
             analysis_result = await self.gemini_service.analyze_video_vlm(
-                video_bytes=video_bytes,
+                video_path=str(video_path),
                 content_type="video/mp4",
-                stage=None,  # 자동 판단
-                age_months=None  # 설정에서 가져오기 (추후 구현)
+                stage=None,  # 자동 판단 (단계 캐시 우선)
+                age_months=age_months,
+                priority=PRIORITY_SEGMENT,
+                stage_cache_key=self.stage_cache_key,
+                roi_crop=self.roi_crop,
             )
             
             # 6. 결과 저장
@@ -151,8 +167,30 @@ class SegmentAnalysisScheduler:
         finally:
             db.close()
     
-    def _get_segment_video(self, segment_start: datetime) -> Optional[Path]:
+    def _resolve_age_months(self, db: Session) -> Optional[int]:
+        """아이 개월 수 (User.child_birthdate 우선) + 단계 캐시 시드"""
+        age_months = self.age_months
+        if self.user_id is not None:
+            user = db.query(User).filter(User.id == self.user_id).first()
+            if user and user.child_birthdate:
+                age_months = age_months_from_birthdate(user.child_birthdate)
+        
+        if age_months is not None:
+            get_stage_cache().seed(
+                self.stage_cache_key,
+                self.gemini_service._determine_stage_from_age_months(age_months),
+                age_months,
+            )
+        return age_months
+    
+    def _get_segment_video(self, segment_start: datetime, segment_end: datetime) -> Optional[Path]:
         """해당 구간의 비디오 파일 경로 반환"""
+        # 매니페스트에서 구간과 가장 많이 겹치는 세그먼트 (비디오 파일 접근 없음)
+        record = self.manifest.find_best_segment(segment_start, segment_end, KIND_SEGMENT)
+        if record:
+            return Path(record.path)
+        
+        # 매니페스트 도입 이전 파일
         filename = f"segment_{segment_start.strftime('%Y%m%d_%H%M%S')}.mp4"
         video_path = self.buffer_dir / filename
         
@@ -178,13 +216,17 @@ class SegmentAnalysisScheduler:
 active_segment_schedulers = {}
 
 
-async def start_segment_analysis_for_camera(camera_id: str):
+async def start_segment_analysis_for_camera(
+    camera_id: str,
+    user_id: Optional[int] = None,
+    age_months: Optional[int] = None,
+):
     """특정 카메라의 10분 분석 스케줄러 시작"""
     if camera_id in active_segment_schedulers:
         print(f"[10분 분석 스케줄러] 이미 실행 중: {camera_id}")
         return
     
-    scheduler = SegmentAnalysisScheduler(camera_id)
+    scheduler = SegmentAnalysisScheduler(camera_id, user_id=user_id, age_months=age_months)
     active_segment_schedulers[camera_id] = scheduler
     
     # 백그라운드 태스크로 실행
@@ -0,0 +1,311 @@
+"""
+세그먼트 매니페스트 - 스트림 생성기가 완료된 세그먼트 파일을 기록하는 append-only 인덱스
+
+생산자(스트림 생성기)가 파일을 닫는 순간 기록하므로, 소비자(스트림 API, 분석 스케줄러)는
+비디오 파일을 열거나 stat하지 않고 시간으로 세그먼트를 찾을 수 있다.
+
+저장 위치: temp_videos/segment_manifest/{camera_id}.jsonl (한 줄에 세그먼트 1개)
+매니페스트 파일이 없으면(도입 이전/삭제됨) 처음 로드할 때 기존 아카이브 폴더를 한 번 훑어 등록하고,
+로드 시 파일이 사라진 항목/중복 항목은 버리고 파일을 다시 써서 크기를 유지한다.
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.services.live_monitoring.async_notifier import AsyncNotifier
+
+
+MANIFEST_DIR = Path("temp_videos/segment_manifest")
+
+# 세그먼트 종류
+KIND_SEGMENT = "segment"  # 10분 단위 아카이브 (SegmentAnalysisScheduler)
+KIND_HOURLY = "hourly"    # 1시간 단위 버퍼 (레거시, HourlyAnalysisScheduler)
+
+# 매니페스트 파일이 없을 때 등록할 기존 파일: (폴더, 파일명 접두사, 종류, 길이(초), fps)
+LEGACY_SOURCES = (
+    ("temp_videos/hls_buffer/{camera_id}/archive", "archive_", KIND_SEGMENT, 600, 5.0),
+    ("temp_videos/hourly_buffer/{camera_id}", "segment_", KIND_SEGMENT, 600, 1.0),
+    ("temp_videos/hourly_buffer/{camera_id}", "hourly_", KIND_HOURLY, 3600, 1.0),
+)
+MIN_LEGACY_BYTES = 1000  # 이보다 작은 파일은 쓰다 만 것으로 보고 건너뜀
+
+
+class SegmentRecord:
+    """완료된 세그먼트 1개"""
+
+    def __init__(
+        self,
+        path: str,
+        start_time: datetime,
+        end_time: datetime,
+        frame_count: int,
+        fps: float,
+        byte_size: int,
+        kind: str = KIND_SEGMENT,
+    ):
+        self.path = str(path)
+        self.start_time = start_time
+        self.end_time = end_time
+        self.frame_count = frame_count
+        self.fps = fps
+        self.byte_size = byte_size
+        self.kind = kind
+
+    @property
+    def filename(self) -> str:
+        return Path(self.path).name
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.end_time - self.start_time).total_seconds()
+
+    def overlap_seconds(self, start: datetime, end: datetime) -> float:
+        """[start, end) 구간과 겹치는 시간 (초)"""
+        overlap = min(self.end_time, end) - max(self.start_time, start)
+        return max(0.0, overlap.total_seconds())
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat(),
+            "frame_count": self.frame_count,
+            "fps": self.fps,
+            "byte_size": self.byte_size,
+            "kind": self.kind,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SegmentRecord":
+        return cls(
+            path=data["path"],
+            start_time=datetime.fromisoformat(data["start_time"]),
+            end_time=datetime.fromisoformat(data["end_time"]),
+            frame_count=int(data.get("frame_count", 0)),
+            fps=float(data.get("fps", 0.0)),
+            byte_size=int(data.get("byte_size", 0)),
+            kind=data.get("kind", KIND_SEGMENT),
+        )
+
+
+class SegmentManifest:
+    """
+    카메라 1대의 세그먼트 매니페스트
+
+    - append(): 생산자 스레드에서 호출 (파일에 한 줄 추가 + 메모리 인덱스 갱신 + 알림)
+    - list_segments()/find_*(): 메모리 인덱스만 조회 (비디오 파일 접근 없음)
+    - notifier/wait_for_segment_end(): 새 세그먼트 알림 대기
+    """
+
+    def __init__(self, camera_id: str, manifest_path: Optional[Path] = None, legacy_sources=LEGACY_SOURCES):
+        self.camera_id = camera_id
+        self.manifest_path = manifest_path or (MANIFEST_DIR / f"{camera_id}.jsonl")
+        self.legacy_sources = legacy_sources
+        self.notifier = AsyncNotifier()
+
+        self._lock = threading.Lock()
+        # kind → start_time 순으로 정렬된 레코드 (+ 같은 순서의 start_time 목록, bisect용)
+        self._records: Dict[str, List[SegmentRecord]] = {}
+        self._starts: Dict[str, List[datetime]] = {}
+        self._paths = set()
+
+        self._load()
+
+    def _load(self):
+        """기존 매니페스트 파일을 메모리 인덱스로 로드 (없으면 기존 아카이브 파일로 새로 만듦)"""
+        if not self.manifest_path.exists():
+            backfilled = self._backfill()
+            if backfilled:
+                self._rewrite()
+                print(f"[세그먼트 매니페스트] 기존 파일 등록: {self.camera_id} ({backfilled}개)")
+            return
+
+        lines = 0
+        pruned = 0
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                lines += 1
+                try:
+                    record = SegmentRecord.from_dict(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    print(f"[세그먼트 매니페스트] 잘못된 항목 무시 ({self.camera_id}): {e}")
+                    continue
+                if not os.path.exists(record.path):
+                    pruned += 1
+                    continue
+                self._insert(record)
+
+        loaded = len(self._paths)
+        if loaded != lines:
+            # 삭제된 파일/중복/잘못된 줄 정리 (append-only 파일이 계속 커지지 않도록)
+            self._rewrite()
+        print(f"[세그먼트 매니페스트] 로드: {self.camera_id} ({loaded}개"
+              + (f", 삭제된 파일 {pruned}개 정리" if pruned else "") + ")")
+
+    def _backfill(self) -> int:
+        """LEGACY_SOURCES 폴더의 기존 파일을 파일명 시각으로 등록 (매니페스트 파일이 없을 때 1회)"""
+        added = 0
+        for directory, prefix, kind, duration, fps in self.legacy_sources:
+            folder = Path(directory.format(camera_id=self.camera_id))
+            if not folder.is_dir():
+                continue
+            for path in sorted(folder.glob(f"{prefix}*.mp4")):
+                try:
+                    start_time = datetime.strptime(path.stem[len(prefix):], '%Y%m%d_%H%M%S')
+                    stat = path.stat()
+                except (ValueError, OSError):
+                    continue
+                if stat.st_size < MIN_LEGACY_BYTES:
+                    continue
+                # 끝 시각: 마지막 수정 시각 (파일명 시각 + 기본 길이를 넘지 않음)
+                end_time = start_time + timedelta(seconds=duration)
+                modified = datetime.fromtimestamp(stat.st_mtime)
+                if start_time < modified < end_time:
+                    end_time = modified
+                record = SegmentRecord(
+                    path=str(path),
+                    start_time=start_time,
+                    end_time=end_time,
+                    frame_count=int(round((end_time - start_time).total_seconds() * fps)),
+                    fps=fps,
+                    byte_size=stat.st_size,
+                    kind=kind,
+                )
+                if self._insert(record):
+                    added += 1
+        return added
+
+    def _rewrite(self):
+        """메모리 인덱스 전체로 매니페스트 파일을 다시 씀 (임시 파일 → 교체)"""
+        records = sorted(
+            (record for records in self._records.values() for record in records),
+            key=lambda r: r.start_time,
+        )
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.jsonl.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.manifest_path)
+
+    def _insert(self, record: SegmentRecord) -> bool:
+        if record.path in self._paths:
+            return False
+        records = self._records.setdefault(record.kind, [])
+        starts = self._starts.setdefault(record.kind, [])
+        if not starts or record.start_time >= starts[-1]:
+            # 생산자는 시간 순으로 기록하므로 대부분 끝에 추가
+            records.append(record)
+            starts.append(record.start_time)
+        else:
+            index = bisect.bisect_right(starts, record.start_time)
+            records.insert(index, record)
+            starts.insert(index, record.start_time)
+        self._paths.add(record.path)
+        return True
+
+    def append(self, record: SegmentRecord) -> bool:
+        """
+        완료된 세그먼트 기록 (이미 기록된 경로면 무시)
+
+        Returns:
+            새로 추가되었는지 여부
+        """
+        with self._lock:
+            if not self._insert(record):
+                return False
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+
+        print(f"[세그먼트 매니페스트] 추가: {self.camera_id} {record.filename} "
+              f"({record.start_time.strftime('%H:%M:%S')} ~ {record.end_time.strftime('%H:%M:%S')}, "
+              f"{record.frame_count}프레임)")
+        self.notifier.notify()
+        return True
+
+    def has_path(self, path) -> bool:
+        with self._lock:
+            return str(path) in self._paths
+
+    def list_segments(
+        self,
+        kind: str = KIND_SEGMENT,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[SegmentRecord]:
+        """start_time 순 세그먼트 목록 ([start, end) 구간과 겹치는 것만)"""
+        with self._lock:
+            records = list(self._records.get(kind, []))
+
+        if start is not None:
+            records = [r for r in records if r.end_time > start]
+        if end is not None:
+            records = [r for r in records if r.start_time < end]
+        return records
+
+    def latest(self, kind: str = KIND_SEGMENT) -> Optional[SegmentRecord]:
+        with self._lock:
+            records = self._records.get(kind)
+            return records[-1] if records else None
+
+    def find_segment_at(self, at: datetime, kind: str = KIND_SEGMENT) -> Optional[SegmentRecord]:
+        """at 시각을 포함하는 세그먼트"""
+        with self._lock:
+            records = self._records.get(kind, [])
+            index = bisect.bisect_right(self._starts.get(kind, []), at) - 1
+            if index >= 0 and records[index].end_time > at:
+                return records[index]
+        return None
+
+    def find_best_segment(self, start: datetime, end: datetime, kind: str = KIND_SEGMENT) -> Optional[SegmentRecord]:
+        """[start, end) 구간과 가장 많이 겹치는 세그먼트"""
+        candidates = self.list_segments(kind, start, end)
+        if not candidates:
+            return None
+        return max(candidates, key=lambda r: r.overlap_seconds(start, end))
+
+    async def wait_for_segment_end(self, end_time: datetime, kind: str = KIND_SEGMENT, timeout: float = 60.0) -> bool:
+        """
+        end_time까지 기록된 세그먼트가 생길 때까지 대기
+
+        Returns:
+            제한 시간 안에 해당 세그먼트가 기록되었는지 여부
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            version = self.notifier.version
+            latest = self.latest(kind)
+            if latest and latest.end_time >= end_time:
+                return True
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await self.notifier.wait(version, timeout=remaining)
+
+
+# 전역 매니페스트 관리 (카메라당 1개)
+_manifests: Dict[str, SegmentManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_segment_manifest(camera_id: str) -> SegmentManifest:
+    """카메라별 매니페스트 싱글톤"""
+    with _manifests_lock:
+        manifest = _manifests.get(camera_id)
+        if manifest is None:
+            manifest = SegmentManifest(camera_id)
+            _manifests[camera_id] = manifest
+        return manifest
@@ -0,0 +1,245 @@
+"""
+여러 카메라의 실시간 스냅샷 배치 분석
+
+카메라마다 RealtimeEventDetector가 이미지 1장짜리 analyze_realtime_snapshot 요청을 따로 보내면
+카메라 수가 많을 때 요청당 오버헤드(프롬프트 재전송, 속도 제한 토큰, 대기열 슬롯)가 대부분을 차지한다.
+- 모든 탐지기의 스냅샷을 짧은 창(window_ms) 동안 모아 최대 max_images장씩 요청 1번으로 분석
+- 이미지마다 id를 붙여 보내고, 응답의 image_id로 카메라별 결과를 나눠 돌려줌
+- 배치 요청이 실패하거나 응답에서 빠진 이미지는 기존 단일 요청으로 다시 분석
+- 모든 탐지기가 같은 이벤트 루프에서 돌기 때문에 asyncio만으로 모음 (스레드 없음)
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.services.gemini_service import GeminiService, get_gemini_service
+
+
+class _PendingSnapshot:
+    __slots__ = (
+        "image_id", "camera_id", "image_bytes", "content_type", "age_months", "context_image", "future", "queued_at"
+    )
+
+    def __init__(
+        self,
+        image_id: str,
+        camera_id: str,
+        image_bytes: bytes,
+        content_type: str,
+        age_months: Optional[int],
+        context_image: Optional[bytes],
+        future: asyncio.Future,
+    ):
+        self.image_id = image_id
+        self.camera_id = camera_id
+        self.image_bytes = image_bytes
+        self.content_type = content_type
+        self.age_months = age_months
+        self.context_image = context_image
+        self.future = future
+        self.queued_at = time.monotonic()
+
+    def resolve(self, result: Optional[dict] = None, error: Optional[BaseException] = None):
+        # 호출 측이 취소했으면 결과를 버림
+        if self.future.done():
+            return
+        if error is not None:
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(result)
+
+
+class SnapshotBatcher:
+    """
+    스냅샷 배치 수집기
+
+    - analyze(): 스냅샷을 대기열에 넣고 자기 결과만 기다림 (analyze_realtime_snapshot과 같은 dict)
+    - 첫 스냅샷이 들어오면 window_ms 뒤에 전송, 그 전에 max_images장이 차면 즉시 전송
+    - 1장뿐인 배치는 기존 단일 요청으로 보냄
+    """
+
+    def __init__(
+        self,
+        gemini_service: Optional[GeminiService] = None,
+        max_images: Optional[int] = None,
+        window_ms: Optional[float] = None,
+    ):
+        self._gemini_service = gemini_service
+        self.max_images = max_images or int(os.getenv("REALTIME_BATCH_MAX_IMAGES", "8"))
+        self.window_seconds = (window_ms or float(os.getenv("REALTIME_BATCH_WINDOW_MS", "300"))) / 1000.0
+
+        self._pending: List[_PendingSnapshot] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks = set()
+        self._ids = itertools.count(1)
+
+        # 통계
+        self.submitted = 0
+        self.batch_requests = 0
+        self.batched_images = 0
+        self.single_requests = 0
+        self.fallbacks: Dict[str, int] = {}
+        self.failed = 0
+        self.total_wait_seconds = 0.0
+        self.max_batch_size = 0
+
+    @property
+    def gemini_service(self) -> GeminiService:
+        if self._gemini_service is None:
+            self._gemini_service = get_gemini_service()
+        return self._gemini_service
+
+    async def analyze(
+        self,
+        camera_id: str,
+        image_bytes: bytes,
+        content_type: str = "image/jpeg",
+        age_months: Optional[int] = None,
+        context_image: Optional[bytes] = None,
+    ) -> dict:
+        """
+        스냅샷 1장을 배치에 넣고 결과를 기다림 (context_image: ROI 크롭일 때 전체 장면 썸네일)
+
+        Raises:
+            배치/단일 요청 모두 실패하면 단일 요청의 예외
+        """
+        self.submitted += 1
+        loop = asyncio.get_running_loop()
+        if self._loop is None or self._loop.is_closed():
+            self._loop = loop
+        elif self._loop is not loop:
+            # 다른 이벤트 루프(테스트 스크립트 등)에서 호출되면 배치 없이 바로 요청
+            return await self._analyze_single_direct(image_bytes, content_type, age_months, context_image)
+
+        item = _PendingSnapshot(
+            f"img{next(self._ids)}", camera_id, image_bytes, content_type, age_months, context_image,
+            loop.create_future(),
+        )
+        self._pending.append(item)
+
+        if len(self._pending) >= self.max_images:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+
+        return await item.future
+
+    def _flush(self):
+        """대기 중인 스냅샷을 배치 1개로 떼어 전송 작업 시작"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        now = time.monotonic()
+        self.total_wait_seconds += sum(now - item.queued_at for item in batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+
+        task = self._loop.create_task(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[_PendingSnapshot]):
+        if len(batch) == 1:
+            await self._analyze_single(batch[0])
+            return
+
+        self.batch_requests += 1
+        self.batched_images += len(batch)
+        try:
+            results = await self.gemini_service.analyze_realtime_snapshot_batch([
+                (item.image_id, item.image_bytes, item.content_type, item.age_months, item.context_image)
+                for item in batch
+            ])
+        except Exception as e:
+            print(f"[스냅샷 배치] {len(batch)}장 배치 실패 → 단일 요청으로 재시도: {e}")
+            self._record_fallback("batch_failed", len(batch))
+            await asyncio.gather(*(self._analyze_single(item) for item in batch))
+            return
+
+        missing = []
+        for item in batch:
+            result = results.get(item.image_id)
+            if result is None:
+                missing.append(item)
+            else:
+                item.resolve(result)
+
+        print(
+            f"[스냅샷 배치] {len(batch)}장 요청 1번으로 분석 "
+            f"(카메라: {', '.join(item.camera_id for item in batch)})"
+            + (f", 응답 누락 {len(missing)}장 단일 재요청" if missing else "")
+        )
+        if missing:
+            self._record_fallback("missing_image", len(missing))
+            await asyncio.gather(*(self._analyze_single(item) for item in missing))
+
+    async def _analyze_single(self, item: _PendingSnapshot):
+        try:
+            result = await self._analyze_single_direct(
+                item.image_bytes, item.content_type, item.age_months, item.context_image
+            )
+        except Exception as e:
+            self.failed += 1
+            item.resolve(error=e)
+            return
+        item.resolve(result)
+
+    async def _analyze_single_direct(
+        self,
+        image_bytes: bytes,
+        content_type: str,
+        age_months: Optional[int],
+        context_image: Optional[bytes] = None,
+    ) -> dict:
+        self.single_requests += 1
+        return await self.gemini_service.analyze_realtime_snapshot(
+            frame_or_video=image_bytes,
+            content_type=content_type,
+            age_months=age_months,
+            context_image=context_image,
+        )
+
+    def _record_fallback(self, reason: str, count: int):
+        self.fallbacks[reason] = self.fallbacks.get(reason, 0) + count
+
+    def get_stats(self) -> dict:
+        requests = self.batch_requests + self.single_requests
+        queued = self.submitted
+        return {
+            "max_images": self.max_images,
+            "window_ms": round(self.window_seconds * 1000),
+            "submitted": queued,
+            "pending": len(self._pending),
+            "batch_requests": self.batch_requests,
+            "batched_images": self.batched_images,
+            "avg_batch_size": round(self.batched_images / self.batch_requests, 2) if self.batch_requests else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "single_requests": self.single_requests,
+            "fallbacks": dict(self.fallbacks),
+            "failed": self.failed,
+            # 스냅샷마다 요청 1번씩 보냈을 때보다 줄어든 요청 수
+            "requests_saved": max(0, queued - requests),
+            "avg_wait_ms": round(self.total_wait_seconds / queued * 1000, 1) if queued else 0.0,
+        }
+
+
+# 싱글톤 인스턴스
+_snapshot_batcher: Optional[SnapshotBatcher] = None
+_snapshot_batcher_lock = threading.Lock()
+
+
+def get_snapshot_batcher() -> SnapshotBatcher:
+    """실시간 스냅샷 배치 수집기 인스턴스를 반환합니다."""
+    global _snapshot_batcher
+    with _snapshot_batcher_lock:
+        if _snapshot_batcher is None:
+            _snapshot_batcher = SnapshotBatcher()
+        return _snapshot_batcher
@@ -0,0 +1,120 @@
+"""
+실시간 스냅샷 중복 제거 (지각 해시)
+
+움직임이 있어도 같은 자리에서 노는 장면처럼 연속 스냅샷이 거의 같으면 Gemini를 다시 부를 필요가 없다.
+- pHash: 32x32 그레이스케일 DCT의 저주파 8x8 계수를 중앙값과 비교 → 64비트
+  (dHash는 평평한 벽/바닥에서 인접 픽셀 비교가 센서 노이즈로 뒤집혀 같은 장면도 거리가 10 이상 나옴)
+- 카메라별 LRU: 최근 스냅샷 해시 → Gemini 결과
+- 새 프레임이 최근 해시와 해밍 거리 threshold 이하이고 결과가 max_age 이내면 그 결과를 재사용
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def phash(frame: np.ndarray, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """perceptual hash (DC 성분 제외 hash_size x hash_size - 1 비트)"""
+    size = hash_size * highfreq_factor
+    small = cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    coefficients = cv2.dct(small.astype(np.float32))[:hash_size, :hash_size].flatten()[1:]
+    bits = coefficients > np.median(coefficients)
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class _Entry:
+    __slots__ = ("result", "created_at", "reuse_count")
+
+    def __init__(self, result: dict, created_at: float):
+        self.result = result
+        self.created_at = created_at
+        self.reuse_count = 0
+
+
+class SnapshotDedup:
+    """
+    카메라 1대의 최근 스냅샷 해시 → Gemini 결과 LRU
+
+    - lookup(hash): 재사용할 결과와 해밍 거리 (없으면 None)
+    - store(hash, result): 새 Gemini 결과 기록
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        threshold: Optional[int] = None,
+        max_age_seconds: Optional[float] = None,
+    ):
+        self.capacity = capacity or int(os.getenv("REALTIME_DEDUP_LRU_SIZE", "8"))
+        self.threshold = threshold if threshold is not None else int(os.getenv("REALTIME_DEDUP_HAMMING", "8"))
+        # 같은 장면이어도 이 시간이 지나면 다시 분석 (잠든 아이 상태 변화 등)
+        self.max_age_seconds = max_age_seconds or float(os.getenv("REALTIME_DEDUP_MAX_AGE", "600"))
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+
+        # 통계
+        self.lookups = 0
+        self.hits = 0
+        self.misses: Dict[str, int] = {}
+
+    def lookup(self, frame_hash: int) -> Optional[Tuple[dict, int, float]]:
+        """
+        Returns:
+            (재사용할 Gemini 결과, 해밍 거리, 결과 나이(초)) 또는 None
+        """
+        self.lookups += 1
+        now = time.monotonic()
+
+        best_hash, best_distance = None, None
+        for stored_hash in self._entries:
+            distance = hamming_distance(frame_hash, stored_hash)
+            if best_distance is None or distance < best_distance:
+                best_hash, best_distance = stored_hash, distance
+
+        if best_hash is None:
+            return self._miss("empty")
+        if best_distance > self.threshold:
+            return self._miss("distance")
+
+        entry = self._entries[best_hash]
+        age = now - entry.created_at
+        if age > self.max_age_seconds:
+            del self._entries[best_hash]
+            return self._miss("expired")
+
+        self._entries.move_to_end(best_hash)
+        entry.reuse_count += 1
+        self.hits += 1
+        return entry.result, best_distance, age
+
+    def _miss(self, reason: str) -> None:
+        self.misses[reason] = self.misses.get(reason, 0) + 1
+        return None
+
+    def store(self, frame_hash: int, result: dict):
+        self._entries[frame_hash] = _Entry(result, time.monotonic())
+        self._entries.move_to_end(frame_hash)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": dict(self.misses),
+            "skip_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "hamming_threshold": self.threshold,
+            "max_age_seconds": self.max_age_seconds,
+        }
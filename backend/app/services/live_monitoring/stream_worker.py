@@ -0,0 +1,191 @@
+"""스트림 캡처/인코딩 워커 - 프레임 루프를 이벤트 루프 밖(전용 스레드)에서 실행"""
+
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Optional, Tuple
+
+
+class FrameRingBuffer:
+    """
+    고정 크기 링 버퍼
+    - 워커 스레드가 프레임을 넣고, 이벤트 루프가 꺼내감
+    - 가득 차면 가장 오래된 프레임을 버림 (생산자는 절대 블로킹되지 않음)
+    - on_drop: 버려진 프레임 콜백 (예: 프레임 풀 hold 해제)
+    """
+
+    def __init__(self, capacity: int = 8, on_drop: Optional[Callable[[Any], None]] = None):
+        self.capacity = capacity
+        self._on_drop = on_drop
+        self._frames: Deque[Tuple[int, Any]] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.dropped_count = 0
+
+    def put(self, frame) -> int:
+        """프레임 추가 (가득 차면 가장 오래된 프레임 폐기), 시퀀스 번호 반환"""
+        dropped = None
+        with self._lock:
+            if len(self._frames) == self.capacity:
+                self.dropped_count += 1
+                dropped = self._frames[0][1]
+            self._seq += 1
+            self._frames.append((self._seq, frame))
+            seq = self._seq
+        if dropped is not None and self._on_drop:
+            self._on_drop(dropped)
+        return seq
+
+    def get_nowait(self) -> Optional[Tuple[int, Any]]:
+        """가장 오래된 프레임을 꺼냄 (없으면 None)"""
+        with self._lock:
+            if not self._frames:
+                return None
+            return self._frames.popleft()
+
+    def get_latest(self) -> Optional[Tuple[int, Any]]:
+        """가장 최근 프레임을 꺼내지 않고 조회"""
+        with self._lock:
+            if not self._frames:
+                return None
+            return self._frames[-1]
+
+    def clear(self):
+        with self._lock:
+            dropped = [frame for _, frame in self._frames]
+            self._frames.clear()
+        if self._on_drop:
+            for frame in dropped:
+                self._on_drop(frame)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._frames)
+
+
+class StreamWorker:
+    """
+    카메라 1대의 캡처→리사이즈→파이프→아카이브 루프를 전용 스레드에서 실행
+
+    - target(worker) 함수는 worker.should_stop()을 주기적으로 확인해야 함
+    - 대기는 time.sleep 대신 worker.wait()를 사용 (중지 요청 시 즉시 깨어남)
+    - 이벤트 루프 쪽으로 넘길 프레임은 worker.frames(링 버퍼)에 넣음
+    """
+
+    def __init__(
+        self,
+        name: str,
+        target: Callable[["StreamWorker"], None],
+        buffer_capacity: int = 8,
+        on_stop: Optional[Callable[[], None]] = None,
+        on_frame_drop: Optional[Callable[[Any], None]] = None,
+    ):
+        self.name = name
+        self._target = target
+        # 블로킹 I/O(파이프 read 등)에 걸린 target을 깨우기 위한 콜백 (예: FFmpeg 종료)
+        self._on_stop = on_stop
+        self.frames = FrameRingBuffer(buffer_capacity, on_drop=on_frame_drop)
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 헬스 정보
+        self.started_at: Optional[datetime] = None
+        self.stopped_at: Optional[datetime] = None
+        self.frames_processed = 0
+        self.last_frame_time: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._frame_times: Deque[float] = deque(maxlen=50)
+
+    def start(self):
+        """워커 스레드 시작"""
+        if self.is_alive():
+            return
+
+        self._stop_event.clear()
+        self.started_at = datetime.now()
+        self.stopped_at = None
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"stream-worker-{self.name}",
+            daemon=True,
+        )
+        self._thread.start()
+        print(f"[스트림 워커] 시작: {self.name}")
+
+    def _run(self):
+        try:
+            self._target(self)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"[스트림 워커] 오류 ({self.name}): {e}")
+            traceback.print_exc()
+        finally:
+            self.stopped_at = datetime.now()
+            print(f"[스트림 워커] 종료: {self.name}")
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        """
+        워커 중지 요청 후 종료까지 대기
+
+        Returns:
+            제한 시간 안에 종료되었는지 여부
+        """
+        self._stop_event.set()
+        if self._on_stop:
+            try:
+                self._on_stop()
+            except Exception as e:
+                print(f"[스트림 워커] 중지 콜백 오류 ({self.name}): {e}")
+
+        thread = self._thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+        return not self.is_alive()
+
+    def should_stop(self) -> bool:
+        return self._stop_event.is_set()
+
+    def wait(self, seconds: float) -> bool:
+        """중지 요청이 오면 즉시 깨어나는 sleep (중지 요청 시 True)"""
+        if seconds <= 0:
+            return self._stop_event.is_set()
+        return self._stop_event.wait(seconds)
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def mark_frame(self):
+        """프레임 1개 처리 완료 기록 (FPS 측정용)"""
+        now = time.time()
+        self.frames_processed += 1
+        self.last_frame_time = now
+        self._frame_times.append(now)
+
+    def get_measured_fps(self) -> float:
+        if len(self._frame_times) < 2:
+            return 0.0
+        elapsed = self._frame_times[-1] - self._frame_times[0]
+        if elapsed <= 0:
+            return 0.0
+        return (len(self._frame_times) - 1) / elapsed
+
+    def get_health(self) -> dict:
+        """워커 상태 요약"""
+        last_frame_age = None
+        if self.last_frame_time is not None:
+            last_frame_age = round(time.time() - self.last_frame_time, 2)
+
+        return {
+            "alive": self.is_alive(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "stopped_at": self.stopped_at.isoformat() if self.stopped_at else None,
+            "frames_processed": self.frames_processed,
+            "measured_fps": round(self.get_measured_fps(), 2),
+            "last_frame_age_seconds": last_frame_age,
+            "buffered_frames": len(self.frames),
+            "dropped_frames": self.frames.dropped_count,
+            "last_error": self.last_error,
+        }
@@ -4,6 +4,22 @@ from pathlib import Path
 from typing import List, Optional
 import random
 
+from app.services.live_monitoring.clip_index import ClipMetadata, get_clip_index
+
+
+class QueuedClip:
+    """큐에 들어간 클립 1개 (재생할 길이 포함)"""
+    
+    def __init__(self, path: Path, metadata: ClipMetadata, play_seconds: float):
+        self.path = path
+        self.metadata = metadata
+        self.play_seconds = play_seconds
+    
+    @property
+    def max_frames(self) -> int:
+        """재생할 원본 프레임 수 (마지막 클립은 목표 시간에 맞춰 잘림)"""
+        return int(round(self.play_seconds * self.metadata.fps))
+
 
 class VideoQueue:
     """
@@ -16,69 +32,100 @@ class VideoQueue:
         self.short_clips_dir = video_dir / "short"
         self.medium_clips_dir = video_dir / "medium"
         
-        self.current_queue: List[Path] = []
+        # 클립 길이/fps는 인덱스에서 조회 (바뀐 클립만 probe)
+        self.clip_index = get_clip_index(video_dir)
+        
+        self.current_queue: List[QueuedClip] = []
         self.current_index = 0
+        self.total_duration_seconds = 0.0
         
     def load_videos(self, shuffle: bool = True, target_duration_minutes: int = 60):
         """
         영상 파일들을 로드하여 큐에 추가
         
+        짧은 영상 10개 + 중간 영상 1개 패턴을 실제 길이 기준으로 반복하고,
+        마지막 클립은 잘라서 큐 전체 길이를 목표 시간에 정확히 맞춘다.
+        필요한 클립만 인덱스에서 조회하므로 클립이 수천 개여도 바로 시작한다.
+        
         Args:
             shuffle: 영상 순서를 섞을지 여부
             target_duration_minutes: 목표 재생 시간 (분)
         """
         # 짧은 영상들 (10-15초)
-        short_clips = list(self.short_clips_dir.glob("*.mp4"))
+        short_clips = sorted(self.short_clips_dir.glob("*.mp4"))
         
         # 중간 영상들 (5분)
-        medium_clips = list(self.medium_clips_dir.glob("*.mp4"))
+        medium_clips = sorted(self.medium_clips_dir.glob("*.mp4"))
         
         if not short_clips and not medium_clips:
             print(f"[영상 큐] 경고: {self.video_dir}에 영상 파일이 없습니다")
             return
         
-        # 큐 구성 전략
-        # 짧은 영상 10개 = 약 2분 (12초 * 10)
-        # 중간 영상 1개 = 5분
-        # 총 7분 패턴을 반복
+        if shuffle:
+            random.shuffle(short_clips)
+            random.shuffle(medium_clips)
         
         self.current_queue = []
+        self.current_index = 0
+        
+        target_seconds = target_duration_minutes * 60
+        total_seconds = 0.0
+        short_pos = 0
+        medium_pos = 0
+        shorts_in_pattern = 0
+        failures = 0
+        total_clips = len(short_clips) + len(medium_clips)
         
-        # 목표 시간까지 영상 추가
-        pattern_duration = 7  # 분
-        num_patterns = (target_duration_minutes // pattern_duration) + 1
-        
-        for _ in range(num_patterns):
-            # 짧은 영상 10개 추가
-            if short_clips:
-                if shuffle:
-                    selected_shorts = random.sample(
-                        short_clips, 
-                        min(10, len(short_clips))
-                    )
-                else:
-                    selected_shorts = short_clips[:10]
-                self.current_queue.extend(selected_shorts)
+        while total_seconds < target_seconds and failures < total_clips:
+            # 패턴: 짧은 영상 10개 → 중간 영상 1개
+            if medium_clips and (shorts_in_pattern >= 10 or not short_clips):
+                video_path = medium_clips[medium_pos % len(medium_clips)]
+                medium_pos += 1
+                shorts_in_pattern = 0
+            else:
+                video_path = short_clips[short_pos % len(short_clips)]
+                short_pos += 1
+                shorts_in_pattern += 1
             
-            # 중간 영상 1개 추가
-            if medium_clips:
-                self.current_queue.append(random.choice(medium_clips))
+            metadata = self.clip_index.get(video_path)
+            if metadata is None or metadata.duration <= 0:
+                failures += 1
+                continue
+            failures = 0
+            
+            play_seconds = min(metadata.duration, target_seconds - total_seconds)
+            self.current_queue.append(QueuedClip(video_path, metadata, play_seconds))
+            total_seconds += play_seconds
+        
+        self.clip_index.save()
+        self.total_duration_seconds = total_seconds
         
-        print(f"[영상 큐] 총 {len(self.current_queue)}개 영상 로드 (목표: {target_duration_minutes}분)")
+        print(f"[영상 큐] 총 {len(self.current_queue)}개 영상 로드 "
+              f"({total_seconds / 60:.1f}분 / 목표: {target_duration_minutes}분, 새로 분석한 클립: {self.clip_index.probe_count}개)")
     
-    def get_next_video(self) -> Optional[Path]:
+    def get_next_clip(self) -> Optional[QueuedClip]:
         """
-        다음 영상 반환 (순환)
+        다음 클립 반환 (순환, 메타데이터 포함)
         
         Returns:
-            다음 영상 파일 경로 (큐가 비어있으면 None)
+            다음 클립 (큐가 비어있으면 None)
         """
         if not self.current_queue:
             return None
         
-        video = self.current_queue[self.current_index]
+        clip = self.current_queue[self.current_index]
         self.current_index = (self.current_index + 1) % len(self.current_queue)
-        return video
+        return clip
+    
+    def get_next_video(self) -> Optional[Path]:
+        """
+        다음 영상 반환 (순환)
+        
+        Returns:
+            다음 영상 파일 경로 (큐가 비어있으면 None)
+        """
+        clip = self.get_next_clip()
+        return clip.path if clip else None
     
     def reset(self):
         """큐 인덱스 초기화"""
@@ -0,0 +1,459 @@
+"""
+VLM 메타데이터 압축 (2/3단계 LLM 입력용)
+
+앞에서부터 N개를 자르면 긴 영상의 뒷부분 관찰이 통째로 빠진다. 대신 영상 전체 분포를 유지하며 줄인다.
+- 연속된 같은 행동은 하나의 구간(run)으로 병합 (run_count, end_timestamp, 합산 duration_seconds)
+- 시간 구간(bucket)마다 고르게 할당하고, 구간 안에서는 importance가 높은 관찰을 우선
+- '권장'보다 심각한 안전 관찰(주의/위험/사고발생)은 개수 상한과 무관하게 모두 보존
+- 전송 전에 토큰 수를 추정해 예산을 넘으면 detail 축약 → 타임라인/권장 안전 관찰을 같은 비율로 축소
+
+청크 모드(1시간 분석)에서는 청크별 1단계 메타데이터를 merge_chunk_metadata()로 합친 뒤 압축한다.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 압축 규칙 버전 (분석 결과 캐시 키에 포함)
+COMPACTION_VERSION = "1"
+
+SEVERITY_ORDER = {"권장": 0, "주의": 1, "위험": 2, "사고발생": 3}
+KEEP_ALL_ABOVE = SEVERITY_ORDER["권장"]
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("METADATA_TOKEN_BUDGET", "24000"))
+DEFAULT_BUCKET_SECONDS = 60.0
+RUN_MAX_GAP_SECONDS = 60.0   # 이 간격보다 멀리 떨어진 같은 행동은 별도 구간
+DETAIL_MAX_CHARS = 120       # 토큰 예산 초과 시 detail/description 축약 길이
+MIN_TIMELINE_OBS = 20        # 프롬프트 요구 최소 관찰 수
+
+TIMELINE_RUN_KEYS = ("category", "action", "skill_level", "success")
+SAFETY_RUN_KEYS = ("risk_type", "severity", "trigger_behavior")
+TEXT_FIELDS = ("detail", "description", "comment")
+
+COMPACTION_NOTE = (
+    "timeline_observations는 연속된 같은 행동을 하나로 묶고(run_count회, timestamp~end_timestamp) "
+    "영상 전체 시간대에서 고르게 추린 것입니다. 행동 빈도는 behavior_summary를 기준으로 하세요."
+)
+
+_TIMESTAMP_RE = re.compile(r"(\d+):(\d{1,2})(?::(\d{1,2}))?")
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """"HH:MM:SS" / "MM:SS" / "HH:MM:SS-HH:MM:SS"(시작 시각) → 초"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _TIMESTAMP_RE.search(value)
+    if not match:
+        return None
+    first, second, third = match.groups()
+    if third is None:
+        return int(first) * 60 + int(second)
+    return int(first) * 3600 + int(second) * 60 + int(third)
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+
+def estimate_tokens(value: Any) -> int:
+    """
+    토큰 수 추정 (API 호출 없이)
+
+    compact JSON 기준, ASCII는 4자당 1토큰, 한글 등 비ASCII는 1.5자당 1토큰으로 근사
+    """
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_count = len(text) - non_ascii
+    return int(math.ceil(ascii_count / 4 + non_ascii / 1.5))
+
+
+def severity_level(observation: dict) -> int:
+    return SEVERITY_ORDER.get(observation.get("severity"), 0)
+
+
+def _time_key(observation: dict) -> float:
+    ts = parse_timestamp(observation.get("timestamp"))
+    return ts if ts is not None else math.inf
+
+
+def merge_runs(observations: Sequence[dict], keys: Sequence[str], max_gap: float = RUN_MAX_GAP_SECONDS) -> List[dict]:
+    """
+    시간순으로 정렬한 뒤 연속된 같은 관찰(keys 값이 모두 같음)을 하나의 구간으로 병합
+
+    병합된 항목: 첫 관찰 기준 + end_timestamp, run_count, duration_seconds 합계,
+    importance 최댓값, detail은 가장 중요한 관찰의 것
+    """
+    runs: List[dict] = []
+    current: List[dict] = []
+
+    def flush():
+        if not current:
+            return
+        if len(current) == 1:
+            runs.append(dict(current[0]))
+            return
+        best = max(current, key=lambda obs: obs.get("importance") or 0)
+        merged = dict(current[0])
+        for field in TEXT_FIELDS:
+            if field in best:
+                merged[field] = best[field]
+        merged["end_timestamp"] = current[-1].get("timestamp")
+        merged["run_count"] = sum(obs.get("run_count", 1) for obs in current)
+        durations = [obs.get("duration_seconds") for obs in current]
+        if any(isinstance(d, (int, float)) for d in durations):
+            merged["duration_seconds"] = sum(d for d in durations if isinstance(d, (int, float)))
+        importances = [obs.get("importance") for obs in current if isinstance(obs.get("importance"), (int, float))]
+        if importances:
+            merged["importance"] = max(importances)
+        runs.append(merged)
+
+    previous_ts = None
+    for obs in sorted(observations, key=_time_key):
+        if not isinstance(obs, dict):
+            continue
+        ts = parse_timestamp(obs.get("timestamp"))
+        same = (
+            current
+            and ts is not None
+            and previous_ts is not None
+            and ts - previous_ts <= max_gap
+            and all(obs.get(key) == current[-1].get(key) for key in keys)
+        )
+        if not same:
+            flush()
+            current = []
+        current.append(obs)
+        previous_ts = parse_timestamp(obs.get("end_timestamp")) or ts
+
+    flush()
+    return runs
+
+
+def _bucket_index(observation: dict, bucket_seconds: float) -> int:
+    ts = parse_timestamp(observation.get("timestamp"))
+    return int(ts // bucket_seconds) if ts is not None else -1
+
+
+def sample_by_bucket(
+    items: Sequence[dict],
+    limit: int,
+    bucket_seconds: float,
+    score: Callable[[dict], float],
+) -> List[dict]:
+    """
+    시간 구간별로 고르게 limit개 선택 (구간 안에서는 score가 높은 순), 결과는 시간순
+    """
+    if len(items) <= limit:
+        return sorted(items, key=_time_key)
+    if limit <= 0:
+        return []
+
+    buckets: Dict[int, List[dict]] = {}
+    for item in items:
+        buckets.setdefault(_bucket_index(item, bucket_seconds), []).append(item)
+    if len(buckets) > limit:
+        # 구간 수가 선택 개수보다 많으면 구간을 넓혀 구간당 1개 이상 (시간대가 한쪽으로 몰리지 않도록)
+        bucket_seconds *= math.ceil(len(buckets) / limit)
+        buckets = {}
+        for item in items:
+            buckets.setdefault(_bucket_index(item, bucket_seconds), []).append(item)
+    for bucket in buckets.values():
+        bucket.sort(key=score, reverse=True)
+
+    taken = {index: 0 for index in buckets}
+    remaining = limit
+    while remaining > 0:
+        active = [index for index, bucket in buckets.items() if taken[index] < len(bucket)]
+        if not active:
+            break
+        if remaining < len(active):
+            # 남은 몫이 구간 수보다 적으면 다음 후보 점수가 높은 구간부터
+            active.sort(key=lambda index: score(buckets[index][taken[index]]), reverse=True)
+            for index in active[:remaining]:
+                taken[index] += 1
+            break
+        share = remaining // len(active)
+        for index in active:
+            count = min(share, len(buckets[index]) - taken[index])
+            taken[index] += count
+            remaining -= count
+
+    selected = [item for index, bucket in buckets.items() for item in bucket[: taken[index]]]
+    return sorted(selected, key=_time_key)
+
+
+def _importance(observation: dict) -> float:
+    value = observation.get("importance")
+    base = float(value) if isinstance(value, (int, float)) else 0.0
+    return base + 0.01 * min(observation.get("run_count", 1), 50)
+
+
+def _shorten(observations: List[dict], max_chars: int) -> List[dict]:
+    shortened = []
+    for obs in observations:
+        obs = dict(obs)
+        for field in TEXT_FIELDS:
+            text = obs.get(field)
+            if isinstance(text, str) and len(text) > max_chars:
+                obs[field] = text[: max_chars - 1] + "…"
+        shortened.append(obs)
+    return shortened
+
+
+def bucket_coverage(original: Sequence[dict], kept: Sequence[dict], bucket_seconds: float) -> float:
+    """원본에 관찰이 있던 시간 구간 중 압축 후에도 관찰이 남아 있는 비율"""
+    original_buckets = {_bucket_index(obs, bucket_seconds) for obs in original if isinstance(obs, dict)}
+    original_buckets.discard(-1)
+    if not original_buckets:
+        return 1.0
+    kept_buckets = set()
+    for obs in kept:
+        start = parse_timestamp(obs.get("timestamp"))
+        end = parse_timestamp(obs.get("end_timestamp")) or start
+        if start is None:
+            continue
+        kept_buckets.update(range(int(start // bucket_seconds), int(end // bucket_seconds) + 1))
+    return len(original_buckets & kept_buckets) / len(original_buckets)
+
+
+def compact_metadata(
+    metadata: dict,
+    duration_seconds: Optional[float] = None,
+    max_timeline: int = 400,
+    max_safety: int = 150,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    bucket_seconds: float = DEFAULT_BUCKET_SECONDS,
+) -> Tuple[dict, dict]:
+    """
+    메타데이터 압축
+
+    Returns:
+        (압축된 메타데이터 사본, 압축 보고서)
+    """
+    timeline = metadata.get("timeline_observations")
+    timeline = [obs for obs in timeline if isinstance(obs, dict)] if isinstance(timeline, list) else []
+    safety = metadata.get("safety_observations")
+    safety = [obs for obs in safety if isinstance(obs, dict)] if isinstance(safety, list) else []
+
+    # 관찰 수가 상한보다 훨씬 많으면 구간을 넓혀 구간당 최소 1개 이상 배정되도록
+    if duration_seconds and max_timeline > 0:
+        bucket_seconds = max(bucket_seconds, duration_seconds / max_timeline)
+
+    runs = merge_runs(timeline, TIMELINE_RUN_KEYS)
+    critical = sorted((obs for obs in safety if severity_level(obs) > KEEP_ALL_ABOVE), key=_time_key)
+    advisory = merge_runs([obs for obs in safety if severity_level(obs) <= KEEP_ALL_ABOVE], SAFETY_RUN_KEYS)
+
+    tokens_before = estimate_tokens(metadata)
+    timeline_limit = max_timeline
+    advisory_limit = max(0, max_safety - len(critical))
+    shortened = False
+
+    compacted = dict(metadata)
+    while True:
+        compacted["timeline_observations"] = sample_by_bucket(runs, timeline_limit, bucket_seconds, _importance)
+        compacted["safety_observations"] = sorted(
+            critical + sample_by_bucket(advisory, advisory_limit, bucket_seconds, _importance),
+            key=_time_key,
+        )
+        tokens_after = estimate_tokens(compacted)
+        if tokens_after <= token_budget:
+            break
+
+        # 예산 초과: detail 축약 → 타임라인/권장 안전 관찰을 같은 비율로 축소 (주의 이상 안전 관찰은 유지)
+        if not shortened:
+            runs = _shorten(runs, DETAIL_MAX_CHARS)
+            advisory = _shorten(advisory, DETAIL_MAX_CHARS)
+            shortened = True
+        elif timeline_limit > MIN_TIMELINE_OBS or advisory_limit > 0:
+            ratio = token_budget / tokens_after * 0.95
+            timeline_limit = min(len(runs), timeline_limit)
+            timeline_limit = max(MIN_TIMELINE_OBS, min(timeline_limit - 1, int(timeline_limit * ratio)))
+            advisory_limit = min(len(advisory), advisory_limit)
+            advisory_limit = int(advisory_limit * ratio)
+        else:
+            break
+
+    if len(compacted["timeline_observations"]) < len(timeline):
+        compacted["compaction_note"] = COMPACTION_NOTE
+
+    report = {
+        "version": COMPACTION_VERSION,
+        "timeline": {
+            "original": len(timeline),
+            "runs": len(runs),
+            "kept": len(compacted["timeline_observations"]),
+        },
+        "safety": {
+            "original": len(safety),
+            "kept_critical": len(critical),
+            "kept": len(compacted["safety_observations"]),
+        },
+        "bucket_seconds": round(bucket_seconds, 1),
+        "coverage": round(bucket_coverage(timeline, compacted["timeline_observations"], bucket_seconds), 3),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "token_budget": token_budget,
+        "over_budget": tokens_after > token_budget,
+    }
+    return compacted, report
+
+
+# ----------------------------------------------------------------------
+# 청크 메타데이터 병합 (map-reduce)
+# ----------------------------------------------------------------------
+SKILL_ORDER = {"없음": 0, "초기": 1, "중간": 2, "숙련": 3}
+SUMMARY_SUM_KEYS = ("count", "total_duration_seconds", "success_count", "fail_count")
+ENVIRONMENT_LIST_KEYS = ("furniture_present", "toys_and_objects", "safety_devices")
+TIMESTAMP_KEYS = ("timestamp", "end_timestamp")
+
+
+def _shift(observations: Any, offset_seconds: float) -> List[dict]:
+    """청크 기준 timestamp를 원본 영상 기준으로 보정한 사본"""
+    if not isinstance(observations, list):
+        return []
+    shifted = []
+    for obs in observations:
+        if not isinstance(obs, dict):
+            continue
+        obs = dict(obs)
+        for key in TIMESTAMP_KEYS:
+            seconds = parse_timestamp(obs.get(key))
+            if seconds is not None:
+                obs[key] = format_timestamp(seconds + offset_seconds)
+        shifted.append(obs)
+    return shifted
+
+
+def _most_common(values: List[Any]) -> Any:
+    """가장 많이 나온 값 (dict/list도 허용, 동률이면 먼저 나온 값 → 프로세스마다 같은 결과)"""
+    counts: Counter = Counter()
+    first: Dict[str, Any] = {}
+    for value in values:
+        if not value:
+            continue
+        key = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+        counts[key] += 1
+        first.setdefault(key, value)
+    if not counts:
+        return None
+    # Counter.most_common은 동률을 처음 센 순서대로 반환
+    return first[counts.most_common(1)[0][0]]
+
+
+def _merge_behavior_summary(summaries: List[Any]) -> dict:
+    """카테고리 → 행동명 → 횟수/시간은 합산, skill_level은 가장 높은 값"""
+    merged: Dict[str, Dict[str, dict]] = {}
+    for summary in summaries:
+        if not isinstance(summary, dict):
+            continue
+        for category, actions in summary.items():
+            if not isinstance(actions, dict):
+                continue
+            target = merged.setdefault(category, {})
+            for action, stats in actions.items():
+                if not isinstance(stats, dict):
+                    continue
+                current = target.setdefault(action, {})
+                for key, value in stats.items():
+                    if key in SUMMARY_SUM_KEYS and isinstance(value, (int, float)):
+                        current[key] = current.get(key, 0) + value
+                    elif key == "skill_level":
+                        if SKILL_ORDER.get(value, -1) > SKILL_ORDER.get(current.get(key), -1):
+                            current[key] = value
+                    else:
+                        current.setdefault(key, value)
+    return merged
+
+
+def _merge_environment(environments: List[Any]) -> dict:
+    merged: Dict[str, Any] = {}
+    seen_hazards = set()
+    for environment in environments:
+        if not isinstance(environment, dict):
+            continue
+        for key, value in environment.items():
+            if key in ENVIRONMENT_LIST_KEYS and isinstance(value, list):
+                items = merged.setdefault(key, [])
+                items.extend(item for item in value if item not in items)
+            elif key == "hazards_identified" and isinstance(value, list):
+                hazards = merged.setdefault(key, [])
+                for hazard in value:
+                    if not isinstance(hazard, dict):
+                        continue
+                    identity = (hazard.get("type"), hazard.get("location"), hazard.get("description"))
+                    if identity not in seen_hazards:
+                        seen_hazards.add(identity)
+                        hazards.append(hazard)
+            elif value and not merged.get(key):
+                merged[key] = value
+    return merged
+
+
+def _interactions(metadata: dict) -> Any:
+    presence = metadata.get("adult_presence")
+    return presence.get("interactions") if isinstance(presence, dict) else None
+
+
+def merge_chunk_metadata(chunks: Sequence[Tuple[float, dict]]) -> dict:
+    """
+    청크별 1단계 메타데이터를 하나로 병합 (2/3단계는 병합 결과로 한 번만 실행)
+
+    - timeline/safety/advanced_behaviors/interactions: timestamp에 청크 시작 오프셋을 더해 이어 붙임
+    - behavior_summary: 행동별 횟수/시간 합산, 숙련도는 최고값
+    - environment: 목록은 합집합, 위험 요소는 (type, location, description) 기준 중복 제거
+    - video_metadata/adult_presence 요약 값: 청크들의 최빈값
+
+    Args:
+        chunks: (원본 기준 시작 초, 청크 메타데이터) 목록
+    """
+    chunks = sorted(chunks, key=lambda item: item[0])
+    metadatas = [metadata for _, metadata in chunks]
+
+    merged: Dict[str, Any] = {}
+    for offset, metadata in chunks:
+        for key, value in metadata.items():
+            if key not in merged and key not in ("video_metadata", "adult_presence"):
+                merged[key] = value  # 알 수 없는 필드는 첫 청크 값 유지
+
+    for key in ("timeline_observations", "safety_observations", "advanced_behaviors"):
+        merged[key] = sorted(
+            (obs for offset, metadata in chunks for obs in _shift(metadata.get(key), offset)),
+            key=_time_key,
+        )
+
+    merged["behavior_summary"] = _merge_behavior_summary([m.get("behavior_summary") for m in metadatas])
+    merged["environment"] = _merge_environment([m.get("environment") for m in metadatas])
+
+    video_metadatas = [m.get("video_metadata") for m in metadatas if isinstance(m.get("video_metadata"), dict)]
+    video_metadata: Dict[str, Any] = {}
+    for item in video_metadatas:
+        for key in item:
+            if key == "total_duration_seconds":
+                continue
+            video_metadata[key] = _most_common([vm.get(key) for vm in video_metadatas])
+    durations = [vm.get("total_duration_seconds") for vm in video_metadatas]
+    if durations and all(isinstance(d, (int, float)) for d in durations):
+        video_metadata["total_duration_seconds"] = sum(durations)
+    video_metadata["chunk_count"] = len(chunks)
+    merged["video_metadata"] = video_metadata
+
+    presences = [m.get("adult_presence") for m in metadatas if isinstance(m.get("adult_presence"), dict)]
+    merged["adult_presence"] = {
+        "overall_presence": _most_common([p.get("overall_presence") for p in presences]),
+        "interaction_quality": _most_common([p.get("interaction_quality") for p in presences]),
+        "interactions": sorted(
+            (
+                obs
+                for offset, metadata in chunks
+                for obs in _shift(_interactions(metadata), offset)
+            ),
+            key=_time_key,
+        ),
+    }
+    return merged
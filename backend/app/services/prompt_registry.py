@@ -0,0 +1,270 @@
+"""
+프롬프트 번들 레지스트리 (모듈 전역)
+
+baby_dev_safety의 11개 발달 단계 번들(단계 파일 + common 4개 + config.yaml)을 시작 시 한 번 읽고 검증한다.
+- 단계별 고정 부분(prefix)을 미리 조합 → 호출마다 메타데이터 섹션만 이어 붙임
+- 번들/파일마다 내용 해시 버전 제공 (분석 캐시 키에 사용)
+- 파일 mtime/크기가 바뀌면 해당 항목만 다시 읽음 (check_interval 초마다 확인)
+"""
+
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+BUNDLE_DIR = PROMPTS_DIR / "baby_dev_safety"
+CONFIG_PATH = BUNDLE_DIR / "config.yaml"
+
+# 단계 번들의 공통 파일 (조합 순서대로)
+COMMON_FILES = [
+    "input_premise.ko.txt",
+    "analysis_steps_template.ko.txt",
+    "field_definitions.ko.txt",
+    "safety_rules.ko.txt",
+]
+
+# 2단계(발달 단계 판단) 프롬프트 - 번들 버전에 포함
+HEADER_FILE = "header.ko.txt"
+
+# _load_prompt 파일 이름 검색 순서
+SEARCH_DIRS = [
+    PROMPTS_DIR,
+    BUNDLE_DIR / "common",
+    BUNDLE_DIR / "stages",
+    BUNDLE_DIR / "extraction",
+]
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _CachedFile:
+    """파일 내용 + 읽을 당시의 (mtime, 크기) + 내용 해시"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.signature = _signature(path)
+        with open(path, "r", encoding="utf-8") as f:
+            self.content = f.read()
+        self.version = hashlib.sha256(self.content.encode("utf-8")).hexdigest()[:16]
+
+
+class StageBundle:
+    """발달 단계 1개의 프롬프트 번들 (메타데이터 섹션을 제외한 고정 부분)"""
+
+    def __init__(self, stage: str, prompt_file: str, files: List[_CachedFile]):
+        self.stage = stage
+        self.prompt_file = prompt_file
+        self.paths = [cached.path for cached in files]
+
+        stage_prompt, input_premise, analysis_steps, field_definitions, safety_rules = (
+            cached.content for cached in files
+        )
+        self.prefix = f"""{stage_prompt}
+
+{input_premise}
+
+{analysis_steps}
+
+{field_definitions}
+
+{safety_rules}"""
+        self.version = hashlib.sha256(
+            "|".join(cached.version for cached in files).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def render(self, metadata_section: str = "") -> str:
+        """고정 부분 + 호출별 메타데이터 섹션"""
+        return self.prefix + metadata_section
+
+
+class PromptRegistry:
+    """
+    프롬프트 파일/단계 번들 캐시
+
+    - load_all(): 전체 번들 로드 + 검증 (앱 시작 시)
+    - get_bundle()/get_prompt(): 캐시 반환, 파일이 바뀌었으면 다시 읽음
+    - bundle_version()/file_version(): 캐시 키용 내용 해시
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._files: Dict[Path, _CachedFile] = {}
+        self._config: Optional[_CachedFile] = None
+        self._stages: Dict[str, dict] = {}
+        self._bundles: Dict[str, StageBundle] = {}
+        self._last_checked: Dict[str, float] = {}
+        self._resolved: Dict[str, Path] = {}
+        self.reload_count = 0
+
+    # ------------------------------------------------------------------
+    # 파일 캐시
+    # ------------------------------------------------------------------
+    def _read(self, path: Path) -> _CachedFile:
+        """[lock 보유] 캐시된 파일 (mtime/크기가 바뀌었으면 다시 읽음)"""
+        cached = self._files.get(path)
+        if cached is not None and cached.signature == _signature(path):
+            return cached
+        if not path.exists():
+            raise FileNotFoundError(f"프롬프트 파일을 찾을 수 없습니다: {path}")
+        if cached is not None:
+            self.reload_count += 1
+            print(f"[프롬프트 레지스트리] 변경 감지 → 다시 로드: {path.name}")
+        cached = _CachedFile(path)
+        self._files[path] = cached
+        return cached
+
+    def _due(self, key: str) -> bool:
+        """[lock 보유] key의 파일 변경 확인 시점인지"""
+        now = time.monotonic()
+        if now - self._last_checked.get(key, 0.0) < self.check_interval:
+            return False
+        self._last_checked[key] = now
+        return True
+
+    def _load_config(self) -> Dict[str, dict]:
+        """[lock 보유] config.yaml (바뀌었으면 다시 파싱, 번들 전체 무효화)"""
+        if not CONFIG_PATH.exists():
+            raise FileNotFoundError(f"설정 파일을 찾을 수 없습니다: {CONFIG_PATH}")
+        cached = self._read(CONFIG_PATH)
+        if cached is not self._config:
+            config = yaml.safe_load(cached.content) or {}
+            self._stages = {str(stage): value for stage, value in (config.get("stages") or {}).items()}
+            self._config = cached
+            self._bundles.clear()
+        return self._stages
+
+    # ------------------------------------------------------------------
+    # 단계 번들
+    # ------------------------------------------------------------------
+    def _build_bundle(self, stage: str) -> StageBundle:
+        """[lock 보유]"""
+        stages = self._stages
+        if stage not in stages:
+            raise ValueError(
+                f"지원하지 않는 발달 단계입니다: {stage}. "
+                f"지원 단계: {list(stages.keys())}"
+            )
+        prompt_file = stages[stage]["prompt_file"]
+        stage_prompt_path = BUNDLE_DIR / "stages" / prompt_file
+        if not stage_prompt_path.exists():
+            raise FileNotFoundError(
+                f"단계별 프롬프트 파일을 찾을 수 없습니다: {stage_prompt_path}"
+            )
+
+        files = [self._read(stage_prompt_path)] + [
+            self._read(BUNDLE_DIR / "common" / filename) for filename in COMMON_FILES
+        ]
+        bundle = StageBundle(stage, prompt_file, files)
+        self._bundles[stage] = bundle
+        return bundle
+
+    def load_all(self) -> int:
+        """전체 단계 번들 로드 + 검증 (누락 파일이 있으면 예외)"""
+        with self._lock:
+            stages = self._load_config()
+            for stage in stages:
+                self._build_bundle(stage)
+            self._read(BUNDLE_DIR / "common" / HEADER_FILE)
+            self._read(BUNDLE_DIR / "extraction" / "vlm_metadata.ko.txt")
+            print(
+                f"[프롬프트 레지스트리] 단계 번들 {len(self._bundles)}개 로드 "
+                f"(번들 버전: {self._bundle_version_locked()})"
+            )
+            return len(self._bundles)
+
+    def get_bundle(self, stage: str) -> StageBundle:
+        with self._lock:
+            if self._due("config"):
+                self._load_config()
+            bundle = self._bundles.get(stage)
+            if bundle is not None and self._due(f"stage:{stage}"):
+                if any(self._files.get(path) is not self._read(path) for path in bundle.paths):
+                    bundle = None
+            if bundle is None:
+                if not self._stages:
+                    self._load_config()
+                bundle = self._build_bundle(stage)
+            return bundle
+
+    # ------------------------------------------------------------------
+    # 단일 프롬프트 파일
+    # ------------------------------------------------------------------
+    def _resolve(self, filename: str) -> Path:
+        """[lock 보유] 파일 이름 → 경로 (한 번 찾은 경로는 기억)"""
+        path = self._resolved.get(filename)
+        if path is not None:
+            return path
+        for directory in SEARCH_DIRS:
+            path = directory / filename
+            if path.exists():
+                self._resolved[filename] = path
+                return path
+        raise FileNotFoundError(f"프롬프트 파일을 찾을 수 없습니다: {filename}")
+
+    def get_prompt(self, filename: str) -> str:
+        """prompts/ 아래 파일 (직접 경로 → common → stages → extraction 순으로 검색)"""
+        with self._lock:
+            path = self._resolve(filename)
+            cached = self._files.get(path)
+            if cached is not None and not self._due(f"file:{filename}"):
+                return cached.content
+            return self._read(path).content
+
+    def file_version(self, filename: str) -> str:
+        with self._lock:
+            self.get_prompt(filename)
+            return self._files[self._resolve(filename)].version
+
+    # ------------------------------------------------------------------
+    # 버전
+    # ------------------------------------------------------------------
+    def _bundle_version_locked(self) -> str:
+        parts = [self._config.version if self._config else ""]
+        parts += [f"{stage}:{self._bundles[stage].version}" for stage in sorted(self._bundles)]
+        header = self._files.get(BUNDLE_DIR / "common" / HEADER_FILE)
+        parts.append(header.version if header else "")
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def bundle_version(self) -> str:
+        """2/3단계 프롬프트 전체 버전 (config.yaml + 11개 단계 번들 + header)"""
+        with self._lock:
+            self._load_config()
+            for stage in list(self._stages):
+                self.get_bundle(stage)
+            self.get_prompt(HEADER_FILE)
+            return self._bundle_version_locked()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "bundles": len(self._bundles),
+                "files": len(self._files),
+                "reloads": self.reload_count,
+                "bundle_versions": {stage: bundle.version for stage, bundle in self._bundles.items()},
+            }
+
+
+# 모듈 전역 레지스트리
+_prompt_registry: Optional[PromptRegistry] = None
+_prompt_registry_lock = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """프롬프트 레지스트리 인스턴스를 반환합니다."""
+    global _prompt_registry
+    with _prompt_registry_lock:
+        if _prompt_registry is None:
+            _prompt_registry = PromptRegistry()
+        return _prompt_registry
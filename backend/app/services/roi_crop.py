@@ -0,0 +1,257 @@
+"""
+관심 영역(ROI) 크롭 - 아이 주변만 잘라서 Gemini로 전송
+
+스냅샷은 640x480 전체 프레임, 세그먼트는 전체 화면 영상을 보내는데 대부분은 움직이지 않는 가구다.
+- 영역: 움직임 게이트(MotionGate)의 배경 차분 박스를 여백을 붙여 넓히고 EMA로 흔들림을 줄임
+- 스냅샷: 아이 주변 확대 이미지 + 전체 장면 저해상도 썸네일(확대 영역 표시) 2장
+  Gemini 이미지 토큰은 두 변이 384px 이하면 258개, 더 크면 768px 타일 단위로 늘어나
+  640x480 1장(4타일, 약 1032토큰) 대신 384px 이하 2장(약 516토큰)으로 줄어든다.
+- 세그먼트: 1fps로 훑어 움직임 박스의 5~95% 범위를 고정 크롭 영역으로 쓰고, 전체 장면 썸네일 1장을 함께 보냄
+  (영상 토큰은 프레임당 고정이라 크롭의 이득은 전송 크기와 아이 주변 해상도)
+- 움직임이 없거나 영역이 화면 대부분이면 크롭하지 않음 (전체 프레임 그대로)
+"""
+
+import math
+import os
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.live_monitoring.motion_gate import MotionGate
+
+
+Region = Tuple[int, int, int, int]  # x, y, w, h (원본 프레임 좌표)
+
+MAX_IMAGE_SIDE = 384       # 이 크기 이하 이미지는 258토큰 1개
+CONTEXT_WIDTH = 256        # 전체 장면 썸네일 폭
+TOKENS_PER_TILE = 258
+
+ROI_PROMPT_NOTE = (
+    "\n\n[이미지 구성]\n"
+    "- 첫 번째 이미지: 방 전체를 작게 줄인 장면 (빨간 상자가 확대한 영역)\n"
+    "- 두 번째 이미지/영상: 아이 주변을 잘라 확대한 장면\n"
+    "- 활동/발달은 확대 장면으로 판단하고, 위험 구역 접근 여부는 전체 장면과 함께 판단하세요.\n"
+)
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Gemini 이미지 입력 토큰 추정 (384px 이하 258개, 그 외 min(w,h)/1.5 단위 타일마다 258개)"""
+    if width <= MAX_IMAGE_SIDE and height <= MAX_IMAGE_SIDE:
+        return TOKENS_PER_TILE
+    unit = max(1, int(min(width, height) / 1.5))
+    return math.ceil(width / unit) * math.ceil(height / unit) * TOKENS_PER_TILE
+
+
+def expand_region(
+    bbox: Region,
+    frame_width: int,
+    frame_height: int,
+    padding: float = 0.25,
+    min_fraction: float = 0.3,
+) -> Region:
+    """움직임 박스에 여백을 붙이고 최소 크기(프레임의 min_fraction)를 보장, 프레임 안으로 자름"""
+    x, y, w, h = bbox
+    w = max(w * (1 + 2 * padding), frame_width * min_fraction)
+    h = max(h * (1 + 2 * padding), frame_height * min_fraction)
+    cx, cy = bbox[0] + bbox[2] / 2, bbox[1] + bbox[3] / 2
+    w, h = min(w, frame_width), min(h, frame_height)
+    x = min(max(0.0, cx - w / 2), frame_width - w)
+    y = min(max(0.0, cy - h / 2), frame_height - h)
+    return int(x), int(y), int(w), int(h)
+
+
+def area_ratio(region: Region, frame_width: int, frame_height: int) -> float:
+    return (region[2] * region[3]) / float(frame_width * frame_height) if frame_width and frame_height else 1.0
+
+
+def _fit(image: np.ndarray, max_side: int) -> np.ndarray:
+    """긴 변이 max_side를 넘으면 축소 (확대는 하지 않음)"""
+    height, width = image.shape[:2]
+    scale = max_side / float(max(width, height))
+    if scale >= 1.0:
+        return image
+    return cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+def context_thumbnail(frame: np.ndarray, region: Region, width: int = CONTEXT_WIDTH) -> np.ndarray:
+    """전체 장면 저해상도 썸네일 + 크롭 영역 빨간 상자"""
+    height = max(1, int(frame.shape[0] * width / float(frame.shape[1])))
+    thumbnail = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    scale = width / float(frame.shape[1])
+    x, y, w, h = region
+    cv2.rectangle(
+        thumbnail,
+        (int(x * scale), int(y * scale)),
+        (int((x + w) * scale) - 1, int((y + h) * scale) - 1),
+        (0, 0, 255),
+        2,
+    )
+    return thumbnail
+
+
+def snapshot_images(frame: np.ndarray, region: Region, quality: int = 85) -> Optional[Tuple[bytes, bytes]]:
+    """
+    스냅샷 1장 → (확대 JPEG, 전체 장면 썸네일 JPEG), 인코딩 실패 시 None
+    """
+    x, y, w, h = region
+    crop = _fit(frame[y:y + h, x:x + w], MAX_IMAGE_SIDE)
+    ok_crop, crop_buffer = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    ok_context, context_buffer = cv2.imencode(
+        ".jpg", context_thumbnail(frame, region), [cv2.IMWRITE_JPEG_QUALITY, 75]
+    )
+    if not (ok_crop and ok_context):
+        return None
+    return crop_buffer.tobytes(), context_buffer.tobytes()
+
+
+class RoiTracker:
+    """
+    카메라 1대의 아이 주변 영역 추적 (움직임 박스 기반)
+
+    - update(bbox, frame_shape): 프레임마다 게이트의 움직임 박스로 갱신 (움직임이 없으면 마지막 영역 유지)
+    - region(): 크롭할 영역, 마지막 움직임이 hold_seconds보다 오래됐거나 영역이 너무 크면 None
+    """
+
+    def __init__(
+        self,
+        hold_seconds: Optional[float] = None,
+        smoothing: float = 0.3,
+        max_area_ratio: Optional[float] = None,
+    ):
+        self.hold_seconds = hold_seconds or float(os.getenv("REALTIME_ROI_HOLD_SECONDS", "120"))
+        self.smoothing = smoothing
+        self.max_area_ratio = max_area_ratio or float(os.getenv("ROI_MAX_AREA_RATIO", "0.6"))
+
+        self._box: Optional[np.ndarray] = None  # x1, y1, x2, y2 (float)
+        self._frame_size: Tuple[int, int] = (0, 0)
+        self._updated: Optional[float] = None
+
+        # 통계
+        self.cropped = 0
+        self.full_frame = 0
+        self.tokens_saved = 0
+
+    def update(self, bbox: Optional[Region], frame_shape: Tuple[int, ...]):
+        height, width = frame_shape[:2]
+        if (width, height) != self._frame_size:
+            self._frame_size = (width, height)
+            self._box = None
+        if bbox is None:
+            return
+
+        x, y, w, h = expand_region(bbox, width, height)
+        box = np.array([x, y, x + w, y + h], dtype=np.float32)
+        if self._box is None:
+            self._box = box
+        else:
+            # 새 움직임 쪽으로 확장은 바로, 축소는 천천히 (아이가 잠깐 영역 밖으로 나가도 잘리지 않게)
+            grow = np.array([
+                min(box[0], self._box[0]), min(box[1], self._box[1]),
+                max(box[2], self._box[2]), max(box[3], self._box[3]),
+            ], dtype=np.float32)
+            self._box = grow + self.smoothing * (box - grow)
+        self._updated = time.monotonic()
+
+    def region(self) -> Optional[Region]:
+        if self._box is None or self._updated is None:
+            return None
+        if time.monotonic() - self._updated > self.hold_seconds:
+            return None
+        width, height = self._frame_size
+        x1, y1, x2, y2 = (int(round(v)) for v in self._box)
+        region = (x1, y1, max(1, x2 - x1), max(1, y2 - y1))
+        if area_ratio(region, width, height) > self.max_area_ratio:
+            return None
+        return region
+
+    def record(self, region: Optional[Region]):
+        """스냅샷 전송 1회 기록 (크롭 여부, 전체 프레임 대비 절감 토큰)"""
+        width, height = self._frame_size
+        if region is None:
+            self.full_frame += 1
+            return
+        self.cropped += 1
+        crop_side = max(region[2], region[3])
+        scale = min(1.0, MAX_IMAGE_SIDE / float(crop_side))
+        sent = (
+            estimate_image_tokens(int(region[2] * scale), int(region[3] * scale))
+            + estimate_image_tokens(CONTEXT_WIDTH, int(height * CONTEXT_WIDTH / float(width)))
+        )
+        self.tokens_saved += max(0, estimate_image_tokens(width, height) - sent)
+
+    def get_stats(self) -> dict:
+        sent = self.cropped + self.full_frame
+        region = self.region()
+        return {
+            "region": list(region) if region else None,
+            "cropped": self.cropped,
+            "full_frame": self.full_frame,
+            "crop_rate": round(self.cropped / sent, 3) if sent else 0.0,
+            "estimated_tokens_saved": self.tokens_saved,
+        }
+
+
+def find_video_roi(
+    path: str,
+    fps: float,
+    start_seconds: float = 0.0,
+    end_seconds: Optional[float] = None,
+    sample_fps: float = 1.0,
+    max_area_ratio: Optional[float] = None,
+    min_samples: int = 3,
+) -> Tuple[Optional[Region], Optional[np.ndarray]]:
+    """
+    [워커 프로세스] 영상 구간을 sample_fps로 훑어 고정 크롭 영역과 전체 장면 썸네일(마지막 움직임 프레임)을 구함
+
+    움직임 박스 가장자리의 5~95% 범위를 써서 잠깐 스친 움직임(커튼, 어른)에 끌려가지 않게 함
+
+    Returns:
+        (크롭 영역 또는 None, 썸네일 또는 None)
+    """
+    max_area_ratio = max_area_ratio or float(os.getenv("ROI_MAX_AREA_RATIO", "0.6"))
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None, None
+
+    step = max(1, int(fps / sample_fps)) if fps > 0 else 1
+    start_frame = int(start_seconds * fps) if fps > 0 else 0
+    end_frame = int(end_seconds * fps) if end_seconds is not None and fps > 0 else None
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    gate = MotionGate()
+    boxes = []
+    context_frame = None
+    width = height = 0
+    count = 0
+    try:
+        while end_frame is None or start_frame + count < end_frame:
+            if count % step != 0:
+                if not cap.grab():
+                    break
+                count += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count += 1
+            height, width = frame.shape[:2]
+            sample = gate.update(frame)
+            if sample.moving and sample.bbox is not None:
+                boxes.append(sample.bbox)
+                context_frame = frame
+    finally:
+        cap.release()
+
+    if len(boxes) < min_samples or not width:
+        return None, None
+
+    edges = np.array([[x, y, x + w, y + h] for x, y, w, h in boxes], dtype=np.float32)
+    x1, y1 = np.percentile(edges[:, 0], 5), np.percentile(edges[:, 1], 5)
+    x2, y2 = np.percentile(edges[:, 2], 95), np.percentile(edges[:, 3], 95)
+    region = expand_region((int(x1), int(y1), int(x2 - x1), int(y2 - y1)), width, height, padding=0.15)
+    if area_ratio(region, width, height) > max_area_ratio:
+        return None, None
+    return region, context_thumbnail(context_frame, region)
@@ -0,0 +1,206 @@
+"""
+발달 단계 캐시 (사용자/카메라별)
+
+아이의 발달 단계는 몇 달 단위로 바뀌므로 10분 세그먼트마다 2단계(header.ko.txt) 판단 LLM을 다시 부를 필요가 없다.
+- 키: "user:{user_id}" 또는 "camera:{camera_id}"
+- 시드: User.child_birthdate → 개월 수 → 개월 수 기반 단계 (검증 전이라 첫 분석에서 2단계 호출)
+- 갱신: 2단계 판단 결과(stage_determination_result)의 단계 + 신뢰도
+- 재검증: 신뢰도별 유효 시간이 지났거나, 신뢰도가 낮거나, 개월 수 기반 단계가 바뀌었을 때만
+"""
+
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+# 신뢰도별 재검증 주기 (시간). 0이면 다음 분석에서 바로 재검증
+CONFIDENCE_TTL_HOURS = {
+    "높음": float(os.getenv("STAGE_CACHE_TTL_HOURS_HIGH", "24")),
+    "중간": float(os.getenv("STAGE_CACHE_TTL_HOURS_MEDIUM", "6")),
+    "낮음": 0.0,
+}
+
+SOURCE_AGE = "age"  # 생년월일 기반 시드 (미검증)
+SOURCE_LLM = "llm"  # 2단계 판단 결과
+
+
+def age_months_from_birthdate(birthdate: date, today: Optional[date] = None) -> int:
+    """생년월일로부터 현재 개월 수 계산 (development 라우터와 같은 규칙)"""
+    today = today or datetime.now().date()
+    months = (today.year - birthdate.year) * 12 + (today.month - birthdate.month)
+    if today.day < birthdate.day:
+        months -= 1
+    return max(0, months)
+
+
+class StageEstimate:
+    """캐시된 발달 단계 1건"""
+
+    def __init__(
+        self,
+        stage: str,
+        source: str,
+        confidence: Optional[str] = None,
+        age_months: Optional[int] = None,
+        age_stage: Optional[str] = None,
+        evidence: Optional[list] = None,
+        validated_at: Optional[float] = None,
+    ):
+        self.stage = stage
+        self.source = source
+        self.confidence = confidence
+        self.age_months = age_months  # 제공된 개월 수 또는 2단계 추정값
+        self.age_stage = age_stage    # 검증 당시 개월 수 기반 단계 (바뀌면 재검증)
+        self.evidence = evidence or []
+        self.validated_at = validated_at
+        self.updated_at = time.time()
+
+    def ttl_seconds(self) -> float:
+        if self.source != SOURCE_LLM:
+            return 0.0
+        return CONFIDENCE_TTL_HOURS.get(self.confidence, 0.0) * 3600
+
+    def to_determination(self) -> dict:
+        """analyze_video_vlm의 stage_determination_result 형식"""
+        return {
+            "detected_stage": self.stage,
+            "confidence": self.confidence,
+            "evidence": self.evidence,
+            "alternative_stages": [],
+            "age_months_estimate": self.age_months,
+            "cached": True,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.stage,
+            "source": self.source,
+            "confidence": self.confidence,
+            "age_months": self.age_months,
+            "age_stage": self.age_stage,
+            "validated_at": (
+                datetime.fromtimestamp(self.validated_at).isoformat() if self.validated_at else None
+            ),
+            "updated_at": datetime.fromtimestamp(self.updated_at).isoformat(),
+        }
+
+
+class StageCache:
+    """
+    사용자/카메라별 발달 단계 캐시 (프로세스 메모리)
+
+    - lookup(): (캐시된 단계 또는 None, 재검증 사유) 반환 → 단계가 있으면 2단계 LLM 생략
+    - seed(): 생년월일 기반 초기값 (검증 전)
+    - update(): 2단계 판단 결과 반영
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, StageEstimate] = {}
+        self._lock = threading.Lock()
+
+        # 통계
+        self.skipped_count = 0  # 2단계 LLM 생략
+        self.validation_reasons: Dict[str, int] = {}  # 재검증 사유별 횟수
+        self.changed_count = 0  # 재검증 결과 단계가 바뀐 횟수
+
+    def seed(self, key: str, stage: str, age_months: int):
+        """생년월일 기반 초기 단계 (이미 검증된 항목은 유지)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.source == SOURCE_LLM:
+                return
+            self._entries[key] = StageEstimate(
+                stage=stage, source=SOURCE_AGE, age_months=age_months, age_stage=stage
+            )
+
+    def lookup(self, key: str, age_stage: Optional[str] = None) -> Tuple[Optional[StageEstimate], str]:
+        """
+        2단계 판단을 생략해도 되는 캐시 항목 조회
+
+        Args:
+            age_stage: 현재 개월 수 기반 단계 (검증 당시와 다르면 재검증)
+
+        Returns:
+            (항목, "") - 캐시 사용 / (None, 사유) - 2단계 판단 필요
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                reason = "no_entry"
+            elif entry.source != SOURCE_LLM:
+                reason = "unvalidated_seed"
+            elif entry.confidence not in CONFIDENCE_TTL_HOURS or entry.ttl_seconds() <= 0:
+                reason = "low_confidence"
+            elif age_stage is not None and entry.age_stage is not None and age_stage != entry.age_stage:
+                reason = "age_stage_changed"
+            elif time.time() - (entry.validated_at or 0.0) >= entry.ttl_seconds():
+                reason = "expired"
+            else:
+                self.skipped_count += 1
+                return entry, ""
+
+            self.validation_reasons[reason] = self.validation_reasons.get(reason, 0) + 1
+            return None, reason
+
+    def update(
+        self,
+        key: str,
+        determination: dict,
+        age_months: Optional[int] = None,
+        age_stage: Optional[str] = None,
+    ) -> StageEstimate:
+        """2단계 판단 결과 반영"""
+        stage = str(determination.get("detected_stage"))
+        entry = StageEstimate(
+            stage=stage,
+            source=SOURCE_LLM,
+            confidence=determination.get("confidence"),
+            age_months=age_months if age_months is not None else determination.get("age_months_estimate"),
+            age_stage=age_stage,
+            evidence=determination.get("evidence", []),
+            validated_at=time.time(),
+        )
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous.source == SOURCE_LLM and previous.stage != stage:
+                self.changed_count += 1
+                print(f"[단계 캐시] {key}: {previous.stage}단계 → {stage}단계로 변경")
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get(self, key: str) -> Optional[StageEstimate]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            validations = sum(self.validation_reasons.values())
+            lookups = self.skipped_count + validations
+            return {
+                "entries": {key: entry.to_dict() for key, entry in self._entries.items()},
+                "skipped_stage_calls": self.skipped_count,
+                "validations": validations,
+                "validation_reasons": dict(self.validation_reasons),
+                "skip_rate": round(self.skipped_count / lookups, 3) if lookups else 0.0,
+                "stage_changes": self.changed_count,
+                "ttl_hours": dict(CONFIDENCE_TTL_HOURS),
+            }
+
+
+# 싱글톤 인스턴스
+_stage_cache: Optional[StageCache] = None
+_stage_cache_lock = threading.Lock()
+
+
+def get_stage_cache() -> StageCache:
+    """발달 단계 캐시 인스턴스를 반환합니다."""
+    global _stage_cache
+    with _stage_cache_lock:
+        if _stage_cache is None:
+            _stage_cache = StageCache()
+        return _stage_cache
@@ -0,0 +1,662 @@
+"""
+비디오 전처리 (Gemini 분석 0단계) - 프로세스 풀에서 실행
+
+analyze_video_vlm의 CPU 작업(디코딩/리사이즈/인코딩)을 이벤트 루프 밖의 ProcessPoolExecutor에서 실행한다.
+- 프로브 1회로 길이/FPS/해상도를 함께 얻음
+- 업로드 바이트는 임시 폴더에 한 번만 쓰고, 프로브/최적화가 같은 파일을 사용
+- 경로로 들어온 비디오(스케줄러)는 임시 파일 없이 그대로 사용
+- 대기 시간(queue wait)과 처리 시간을 결과/통계로 보고
+- keep_file=True면 결과 파일을 디스크에 남기고 경로만 반환 (File API 스트리밍 업로드, 메모리 사본 없음)
+- 긴 영상은 preprocess_chunks()로 구간별 서브 클립을 워커들이 동시에 만들어 반환 (1시간 분석 청크 모드)
+- roi=True면 움직임 영역(아이 주변)을 고정 크롭하고 전체 장면 썸네일을 함께 남김 (roi_crop.find_video_roi)
+
+홈캠 업로드 라우터와 분석 스케줄러가 get_video_preprocessor() 싱글톤 풀을 공유한다.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+
+from app.services.roi_crop import find_video_roi
+
+
+# 최적화 목표 (기존 GeminiService._optimize_video와 동일)
+TARGET_HEIGHT = 480
+TARGET_FPS = 1.0
+SKIP_MAX_FPS = 2.0  # 높이 <= 480, fps <= 2면 원본 사용
+
+
+class VideoProbe:
+    """프로브 1회 결과"""
+
+    def __init__(self, duration: Optional[float], fps: float, frame_count: int, width: int, height: int):
+        self.duration = duration
+        self.fps = fps
+        self.frame_count = frame_count
+        self.width = width
+        self.height = height
+
+    def to_dict(self) -> dict:
+        return {
+            "duration": self.duration,
+            "fps": self.fps,
+            "frame_count": self.frame_count,
+            "width": self.width,
+            "height": self.height,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "VideoProbe":
+        return cls(
+            duration=data.get("duration"),
+            fps=float(data.get("fps", 0.0)),
+            frame_count=int(data.get("frame_count", 0)),
+            width=int(data.get("width", 0)),
+            height=int(data.get("height", 0)),
+        )
+
+
+def probe_video(path: str) -> Optional[VideoProbe]:
+    """길이/FPS/해상도를 한 번에 조회 (열 수 없으면 None)"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        duration = frame_count / fps if fps > 0 and frame_count > 0 else None
+        return VideoProbe(
+            duration=duration,
+            fps=fps,
+            frame_count=frame_count,
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+    finally:
+        cap.release()
+
+
+def needs_optimization(probe: VideoProbe, target_height: int = TARGET_HEIGHT) -> bool:
+    return not (probe.height <= target_height and probe.fps <= SKIP_MAX_FPS)
+
+
+def downsample_video(
+    input_path: str,
+    output_path: str,
+    probe: VideoProbe,
+    target_height: int = TARGET_HEIGHT,
+    target_fps: float = TARGET_FPS,
+    start_seconds: float = 0.0,
+    end_seconds: Optional[float] = None,
+    crop: Optional[Tuple[int, int, int, int]] = None,
+) -> bool:
+    """
+    높이 target_height(비율 유지) / target_fps로 다운샘플링
+
+    버릴 프레임은 grab()으로 디코딩 없이 건너뜀
+    start_seconds/end_seconds를 주면 해당 구간만 잘라서 저장 (청크 모드)
+    crop(x, y, w, h)을 주면 그 영역만 잘라서 저장 (영역보다 크게 확대하지 않음)
+    """
+    if crop:
+        target_height = max(2, min(target_height, crop[3]) // 2 * 2)
+        target_width = max(2, int(crop[2] * target_height / float(crop[3])) // 2 * 2)
+    else:
+        scale = target_height / float(probe.height)
+        target_width = int(probe.width * scale)
+
+    step = int(probe.fps / target_fps) if probe.fps > 0 else 1
+    if step < 1:
+        step = 1
+
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        return False
+
+    start_frame = int(start_seconds * probe.fps) if probe.fps > 0 else 0
+    end_frame = int(end_seconds * probe.fps) if end_seconds is not None and probe.fps > 0 else None
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    out = cv2.VideoWriter(
+        output_path, cv2.VideoWriter_fourcc(*"mp4v"), target_fps, (target_width, target_height)
+    )
+    processed_frames = 0
+    count = 0
+    resized = None
+    try:
+        while end_frame is None or start_frame + count < end_frame:
+            if count % step != 0:
+                if not cap.grab():
+                    break
+                count += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if crop:
+                x, y, w, h = crop
+                frame = frame[y:y + h, x:x + w]
+            resized = cv2.resize(frame, (target_width, target_height), dst=resized)
+            out.write(resized)
+            processed_frames += 1
+            count += 1
+    finally:
+        cap.release()
+        out.release()
+
+    return processed_frames > 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0
+
+
+def _find_roi(input_path: str, output_path: str, probe: VideoProbe, start: float = 0.0, end: Optional[float] = None):
+    """크롭 영역 탐색 + 썸네일을 output_path 옆에 저장 → (영역, 썸네일 경로), 크롭하지 않으면 (None, None)"""
+    region, thumbnail = find_video_roi(input_path, probe.fps, start, end)
+    if region is None:
+        return None, None
+    context_path = os.path.splitext(output_path)[0] + "_context.jpg"
+    if not cv2.imwrite(context_path, thumbnail, [cv2.IMWRITE_JPEG_QUALITY, 75]):
+        return None, None
+    return region, context_path
+
+
+def preprocess_video_file(input_path: str, output_path: str, submitted_at: float, roi: bool = False) -> dict:
+    """
+    [워커 프로세스] 프로브 1회 + 필요 시 다운샘플링 (roi=True면 움직임 영역 크롭)
+
+    결과는 경로/숫자만 담아 반환 (비디오 바이트를 프로세스 간에 주고받지 않음)
+    """
+    started_at = time.time()
+    probe = probe_video(input_path)
+    optimized = False
+    region, context_path = None, None
+
+    if probe is not None and probe.height > 0 and roi:
+        region, context_path = _find_roi(input_path, output_path, probe)
+        if region is not None:
+            optimized = downsample_video(input_path, output_path, probe, crop=region)
+            if not optimized:
+                region, context_path = None, None
+
+    if not optimized and probe is not None and probe.height > 0 and needs_optimization(probe):
+        optimized = downsample_video(input_path, output_path, probe)
+
+    return {
+        "probe": probe.to_dict() if probe else None,
+        "optimized": optimized,
+        "roi": list(region) if region else None,
+        "context_path": context_path,
+        "queue_wait_seconds": max(0.0, started_at - submitted_at),
+        "processing_seconds": time.time() - started_at,
+    }
+
+
+def preprocess_video_chunk(
+    input_path: str,
+    output_path: str,
+    submitted_at: float,
+    start_seconds: float,
+    end_seconds: float,
+    roi: bool = False,
+) -> dict:
+    """
+    [워커 프로세스] 원본의 [start_seconds, end_seconds) 구간을 서브 클립으로 다운샘플링
+
+    청크는 원본이 이미 작아도 항상 새로 인코딩 (구간을 잘라야 하므로), 해상도는 키우지 않음
+    roi=True면 청크 구간의 움직임 영역으로 크롭 (청크마다 영역이 다를 수 있음)
+    """
+    started_at = time.time()
+    probe = probe_video(input_path)
+    optimized = False
+    chunk_probe = None
+    region, context_path = None, None
+
+    if probe is not None and probe.height > 0:
+        if roi:
+            region, context_path = _find_roi(input_path, output_path, probe, start_seconds, end_seconds)
+        optimized = downsample_video(
+            input_path,
+            output_path,
+            probe,
+            target_height=min(TARGET_HEIGHT, probe.height),
+            start_seconds=start_seconds,
+            end_seconds=end_seconds,
+            crop=region,
+        )
+        chunk_probe = VideoProbe(
+            duration=end_seconds - start_seconds,
+            fps=probe.fps,
+            frame_count=int((end_seconds - start_seconds) * probe.fps),
+            width=probe.width,
+            height=probe.height,
+        )
+
+    return {
+        "probe": chunk_probe.to_dict() if chunk_probe else None,
+        "optimized": optimized,
+        "roi": list(region) if region else None,
+        "context_path": context_path,
+        "queue_wait_seconds": max(0.0, started_at - submitted_at),
+        "processing_seconds": time.time() - started_at,
+    }
+
+
+def plan_chunks(duration: float, chunk_seconds: float) -> List[Tuple[float, float]]:
+    """
+    [0, duration)를 chunk_seconds 단위 구간으로 분할
+
+    마지막 구간이 chunk_seconds의 절반보다 짧으면 앞 구간에 합침
+    """
+    if duration <= chunk_seconds * 1.5:
+        return [(0.0, duration)]
+    ranges = []
+    start = 0.0
+    while start < duration:
+        end = min(duration, start + chunk_seconds)
+        if duration - end < chunk_seconds / 2:
+            end = duration
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+class PreprocessResult:
+    """
+    전처리 결과 (Gemini로 보낼 바이트 또는 파일 경로 + 프로브 + 소요 시간)
+
+    keep_file 모드에서는 video_bytes 대신 video_path가 채워지고, 다 쓴 뒤 cleanup()으로 임시 폴더를 지운다.
+    """
+
+    def __init__(
+        self,
+        video_bytes: Optional[bytes],
+        probe: Optional[VideoProbe],
+        optimized: bool,
+        original_size: int,
+        queue_wait_seconds: float,
+        processing_seconds: float,
+        offset_seconds: float = 0.0,
+        video_path: Optional[str] = None,
+        work_dir: Optional[str] = None,
+        roi: Optional[List[int]] = None,
+        context_path: Optional[str] = None,
+    ):
+        self.video_bytes = video_bytes
+        self.video_path = video_path
+        self.work_dir = work_dir  # cleanup() 시 삭제할 임시 폴더 (호출자가 넘긴 원본 경로는 삭제하지 않음)
+        self.size = len(video_bytes) if video_bytes is not None else os.path.getsize(video_path)
+        self.offset_seconds = offset_seconds  # 원본 영상 기준 시작 시각 (청크 모드)
+        self.roi = roi                        # 크롭 영역 [x, y, w, h] (원본 좌표, 크롭하지 않았으면 None)
+        self.context_path = context_path      # 크롭 시 전체 장면 썸네일 JPEG (work_dir 안)
+        self.probe = probe
+        self.optimized = optimized
+        self.original_size = original_size
+        self.queue_wait_seconds = queue_wait_seconds
+        self.processing_seconds = processing_seconds
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.probe.duration if self.probe else None
+
+    def read_bytes(self) -> bytes:
+        return self.video_bytes if self.video_bytes is not None else Path(self.video_path).read_bytes()
+
+    def read_context(self) -> Optional[bytes]:
+        return Path(self.context_path).read_bytes() if self.context_path else None
+
+    def cleanup(self):
+        if self.work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
+
+    def to_dict(self) -> dict:
+        return {
+            "probe": self.probe.to_dict() if self.probe else None,
+            "optimized": self.optimized,
+            "original_bytes": self.original_size,
+            "optimized_bytes": self.size,
+            "queue_wait_seconds": round(self.queue_wait_seconds, 3),
+            "processing_seconds": round(self.processing_seconds, 3),
+            "offset_seconds": self.offset_seconds,
+            "roi": self.roi,
+        }
+
+
+class ChunkedPreprocessResult:
+    """
+    preprocess_chunks() 결과 (성공한 청크 + 계획한 구간)
+
+    인코딩에 실패한 청크는 chunks에서 빠지고 missing_ranges에 남는다.
+    partial이면 원본 영상 일부가 분석에서 빠진 것이므로 호출자가 결과에 표시해야 한다.
+    """
+
+    def __init__(
+        self,
+        chunks: List[PreprocessResult],
+        planned_ranges: List[Tuple[float, float]],
+        duration: Optional[float],
+    ):
+        self.chunks = chunks                  # offset_seconds 순
+        self.planned_ranges = planned_ranges  # 분할하지 않았으면 [(0, duration)] 1개
+        self.duration = duration              # 원본 영상 길이 (프로브, 알 수 없으면 None)
+        done = {chunk.offset_seconds for chunk in chunks}
+        self.missing_ranges = [(start, end) for start, end in planned_ranges if start not in done]
+
+    @property
+    def chunked(self) -> bool:
+        """실제로 구간을 나눴는지 (살아남은 청크 수와 무관, 오프셋 보정/병합 여부 기준)"""
+        return len(self.planned_ranges) > 1
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.missing_ranges)
+
+    def to_dict(self) -> dict:
+        return {
+            "chunks": [chunk.to_dict() for chunk in self.chunks],
+            "planned_ranges": [[start, end] for start, end in self.planned_ranges],
+            "missing_ranges": [[start, end] for start, end in self.missing_ranges],
+            "partial": self.partial,
+        }
+
+
+class VideoPreprocessor:
+    """
+    비디오 전처리 프로세스 풀 (최대 max_workers개 동시 처리, 나머지는 대기)
+
+    - preprocess(): 바이트 또는 경로를 받아 PreprocessResult 반환
+    - 프로세스 풀이 깨지면 재생성하고, 그 요청은 스레드에서 처리
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("VIDEO_PREPROCESS_WORKERS", "2"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # 통계
+        self.submitted_count = 0
+        self.completed_count = 0
+        self.failed_count = 0
+        self.in_flight = 0
+        self.total_queue_wait = 0.0
+        self.total_processing = 0.0
+        self.max_queue_wait = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                print(f"[비디오 전처리] 프로세스 풀 시작 (워커 {self.max_workers}개)")
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func, input_path: str, output_path: str, *extra):
+        """워커 프로세스에서 func(input_path, output_path, submitted_at, *extra) 실행 (풀 손상 시 스레드에서 처리)"""
+        args = (input_path, output_path, time.time()) + extra
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            print("[비디오 전처리] ⚠️ 프로세스 풀 손상 → 재생성, 이번 요청은 스레드에서 처리")
+            self._reset_executor()
+            return await asyncio.to_thread(func, *args)
+
+    async def preprocess(
+        self,
+        video_bytes: Optional[bytes] = None,
+        video_path: Optional[str] = None,
+        keep_file: bool = False,
+        roi: bool = False,
+    ) -> PreprocessResult:
+        """
+        비디오 전처리 (프로브 + 480p/1fps 다운샘플링)
+
+        Args:
+            video_bytes: 업로드된 비디오 바이트 (임시 파일에 1회 기록)
+            video_path: 디스크에 있는 비디오 경로 (있으면 video_bytes보다 우선, 임시 입력 파일 없음)
+            keep_file: 결과를 바이트로 읽지 않고 파일 경로로 반환 (호출자가 result.cleanup() 호출)
+            roi: 움직임 영역(아이 주변)으로 크롭 + 전체 장면 썸네일 (keep_file일 때만 썸네일 경로 유지)
+        """
+        if video_path is None and video_bytes is None:
+            raise ValueError("video_bytes 또는 video_path가 필요합니다.")
+
+        work_dir = tempfile.mkdtemp(prefix="dailycam_preprocess_")
+        output_path = os.path.join(work_dir, "optimized.mp4")
+        with self._lock:
+            self.submitted_count += 1
+            self.in_flight += 1
+
+        keep_work_dir = False
+        try:
+            if video_path is not None:
+                input_path = str(video_path)
+            else:
+                input_path = os.path.join(work_dir, "input.mp4")
+                await asyncio.to_thread(Path(input_path).write_bytes, video_bytes)
+
+            outcome = await self._run(preprocess_video_file, input_path, output_path, roi)
+
+            # Gemini로 보낼 바이트 (최적화되지 않았으면 원본)
+            source_path = output_path if outcome["optimized"] else input_path
+            if keep_file:
+                result_bytes = None
+                keep_work_dir = True
+            elif outcome["optimized"] or video_bytes is None:
+                result_bytes = await asyncio.to_thread(Path(source_path).read_bytes)
+            else:
+                result_bytes = video_bytes
+            original_size = len(video_bytes) if video_bytes is not None else os.path.getsize(input_path)
+
+            result = PreprocessResult(
+                video_bytes=result_bytes,
+                video_path=source_path if keep_file else None,
+                work_dir=work_dir if keep_file else None,
+                probe=VideoProbe.from_dict(outcome["probe"]) if outcome["probe"] else None,
+                optimized=outcome["optimized"],
+                original_size=original_size,
+                queue_wait_seconds=outcome["queue_wait_seconds"],
+                processing_seconds=outcome["processing_seconds"],
+                roi=outcome["roi"],
+                context_path=outcome["context_path"] if keep_file else None,
+            )
+
+            with self._lock:
+                self.completed_count += 1
+                self.total_queue_wait += result.queue_wait_seconds
+                self.total_processing += result.processing_seconds
+                self.max_queue_wait = max(self.max_queue_wait, result.queue_wait_seconds)
+
+            self._log_result(result)
+            return result
+        except Exception:
+            with self._lock:
+                self.failed_count += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            if not keep_work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def preprocess_chunks(
+        self,
+        video_bytes: Optional[bytes] = None,
+        video_path: Optional[str] = None,
+        chunk_seconds: float = 600.0,
+        keep_file: bool = False,
+        roi: bool = False,
+    ) -> ChunkedPreprocessResult:
+        """
+        긴 비디오를 chunk_seconds 단위 서브 클립으로 나눠 전처리 (청크별로 워커에서 동시 처리)
+
+        chunk_seconds * 1.5 이하 길이이거나 길이를 알 수 없으면 preprocess()와 같은 단일 결과 1개.
+        실패한 청크는 chunks에서 빠지고 missing_ranges에 남으며, 모든 청크가 실패하면 예외.
+        keep_file/roi는 preprocess()와 같음 (청크마다 임시 폴더를 따로 두고 cleanup()으로 삭제, 크롭 영역은 청크별).
+
+        Returns:
+            ChunkedPreprocessResult (chunks는 offset_seconds 순)
+        """
+        if video_path is None and video_bytes is None:
+            raise ValueError("video_bytes 또는 video_path가 필요합니다.")
+
+        work_dir = tempfile.mkdtemp(prefix="dailycam_chunks_")
+        try:
+            if video_path is not None:
+                input_path = str(video_path)
+            else:
+                input_path = os.path.join(work_dir, "input.mp4")
+                await asyncio.to_thread(Path(input_path).write_bytes, video_bytes)
+
+            probe = await asyncio.to_thread(probe_video, input_path)
+            if probe is None or not probe.duration or probe.duration <= chunk_seconds * 1.5:
+                result = await self.preprocess(video_path=input_path, keep_file=keep_file, roi=roi)
+                if result.video_path == input_path and video_path is None:
+                    # 최적화가 필요 없던 업로드 바이트: 입력 임시 파일을 결과가 소유
+                    result.work_dir, work_dir = work_dir, None
+                duration = probe.duration if probe is not None else result.duration
+                return ChunkedPreprocessResult([result], [(0.0, duration)], duration)
+
+            ranges = plan_chunks(probe.duration, chunk_seconds)
+            original_size = len(video_bytes) if video_bytes is not None else os.path.getsize(input_path)
+            print(
+                f"[비디오 전처리] 청크 분할: {probe.duration:.0f}초 → {len(ranges)}개 "
+                f"({chunk_seconds:.0f}초 단위, 워커 {self.max_workers}개)"
+            )
+
+            async def run_chunk(index: int, start: float, end: float) -> Optional[PreprocessResult]:
+                chunk_dir = tempfile.mkdtemp(prefix="dailycam_chunk_", dir=work_dir if not keep_file else None)
+                output_path = os.path.join(chunk_dir, f"chunk_{index:03d}.mp4")
+                with self._lock:
+                    self.submitted_count += 1
+                    self.in_flight += 1
+                try:
+                    outcome = await self._run(preprocess_video_chunk, input_path, output_path, start, end, roi)
+                    if not outcome["optimized"]:
+                        raise RuntimeError(f"{start:.0f}~{end:.0f}초 구간 인코딩 실패")
+                    chunk_bytes = None
+                    if not keep_file:
+                        chunk_bytes = await asyncio.to_thread(Path(output_path).read_bytes)
+                        os.remove(output_path)
+                except Exception as e:
+                    shutil.rmtree(chunk_dir, ignore_errors=True)
+                    print(f"[비디오 전처리] ⚠️ 청크 {index} 건너뜀: {e}")
+                    with self._lock:
+                        self.failed_count += 1
+                    return None
+                finally:
+                    with self._lock:
+                        self.in_flight -= 1
+
+                result = PreprocessResult(
+                    video_bytes=chunk_bytes,
+                    video_path=output_path if keep_file else None,
+                    work_dir=chunk_dir if keep_file else None,
+                    probe=VideoProbe.from_dict(outcome["probe"]) if outcome["probe"] else None,
+                    optimized=True,
+                    original_size=int(original_size * (end - start) / probe.duration),
+                    queue_wait_seconds=outcome["queue_wait_seconds"],
+                    processing_seconds=outcome["processing_seconds"],
+                    offset_seconds=start,
+                    roi=outcome["roi"],
+                    context_path=outcome["context_path"] if keep_file else None,
+                )
+                with self._lock:
+                    self.completed_count += 1
+                    self.total_queue_wait += result.queue_wait_seconds
+                    self.total_processing += result.processing_seconds
+                    self.max_queue_wait = max(self.max_queue_wait, result.queue_wait_seconds)
+                return result
+
+            results = await asyncio.gather(
+                *(run_chunk(index, start, end) for index, (start, end) in enumerate(ranges))
+            )
+            chunks = [result for result in results if result is not None]
+            if not chunks:
+                raise ValueError("모든 청크 전처리에 실패했습니다.")
+
+            chunked = ChunkedPreprocessResult(chunks, ranges, probe.duration)
+            total_bytes = sum(chunk.size for chunk in chunks)
+            print(
+                f"[비디오 전처리] 청크 {len(chunks)}/{len(ranges)}개 완료, "
+                f"{original_size/1024/1024:.2f}MB -> {total_bytes/1024/1024:.2f}MB"
+                + (
+                    f" (누락 구간: {', '.join(f'{start:.0f}~{end:.0f}초' for start, end in chunked.missing_ranges)})"
+                    if chunked.partial
+                    else ""
+                )
+            )
+            return chunked
+        finally:
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _log_result(self, result: PreprocessResult):
+        probe = result.probe
+        if probe is None:
+            print("[비디오 전처리] 비디오 열기 실패, 원본 사용")
+        elif result.optimized:
+            reduction_ratio = (1 - result.size / result.original_size) * 100 if result.original_size else 0.0
+            print(
+                f"[비디오 최적화 완료] {probe.width}x{probe.height} {probe.fps}fps → {TARGET_HEIGHT}p {TARGET_FPS}fps, "
+                f"{result.original_size/1024/1024:.2f}MB -> {result.size/1024/1024:.2f}MB "
+                f"({reduction_ratio:.1f}% 감소)"
+            )
+        else:
+            print(f"[비디오 최적화] 이미 최적화된 상태 ({probe.width}x{probe.height}, {probe.fps}fps)")
+        if result.roi:
+            x, y, w, h = result.roi
+            print(
+                f"[비디오 전처리] ROI 크롭: ({x}, {y}) {w}x{h} "
+                f"(전체 {probe.width}x{probe.height}의 {w * h / float(probe.width * probe.height) * 100:.0f}%)"
+            )
+        print(
+            f"[비디오 전처리] 대기 {result.queue_wait_seconds:.2f}초, 처리 {result.processing_seconds:.2f}초"
+        )
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            completed = self.completed_count
+            return {
+                "max_workers": self.max_workers,
+                "submitted": self.submitted_count,
+                "completed": completed,
+                "failed": self.failed_count,
+                "in_flight": self.in_flight,
+                "avg_queue_wait_seconds": round(self.total_queue_wait / completed, 3) if completed else 0.0,
+                "max_queue_wait_seconds": round(self.max_queue_wait, 3),
+                "avg_processing_seconds": round(self.total_processing / completed, 3) if completed else 0.0,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 싱글톤 인스턴스 (홈캠 라우터와 분석 스케줄러가 공유)
+_video_preprocessor: Optional[VideoPreprocessor] = None
+_video_preprocessor_lock = threading.Lock()
+
+
+def get_video_preprocessor() -> VideoPreprocessor:
+    """비디오 전처리 풀 인스턴스를 반환합니다."""
+    global _video_preprocessor
+    with _video_preprocessor_lock:
+        if _video_preprocessor is None:
+            _video_preprocessor = VideoPreprocessor()
+        return _video_preprocessor
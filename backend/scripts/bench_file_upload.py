@@ -0,0 +1,149 @@
+"""File API 업로드 벤치마크 (로컬 대역 서버)
+
+Gemini File API의 resumable 업로드/상태 조회/삭제를 흉내 내는 로컬 HTTP 서버를 띄우고
+GeminiFileStore를 GEMINI_FILE_API_BASE_URL 대신 이 서버로 연결해 비교한다.
+
+- 인라인: 최적화 영상 바이트를 읽어 base64 파트 생성 (기존 방식)
+- 참조: 디스크에서 스트리밍 업로드 후 file_uri 파트 생성, 같은 내용은 재사용
+- 지표: tracemalloc 최대 할당량(영상 사본 수), 소요 시간, 재사용/만료 정리 동작
+
+실행: python scripts/bench_file_upload.py [영상 경로] [--size-mb 50]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.gemini_files import GeminiFileStore
+
+
+class StandInFileApi(BaseHTTPRequestHandler):
+    """start → upload, finalize → get(PROCESSING 1회 후 ACTIVE) → delete"""
+
+    files = {}
+    sessions = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        if self.headers.get("X-Goog-Upload-Command") == "start":
+            self.rfile.read(length)
+            session = uuid.uuid4().hex
+            with self.lock:
+                self.sessions[session] = self.headers.get("X-Goog-Upload-Header-Content-Type")
+            upload_url = f"http://{self.headers['Host']}/upload-session/{session}"
+            self._json(200, {}, {"X-Goog-Upload-URL": upload_url})
+            return
+
+        session = self.path.rsplit("/", 1)[-1]
+        received = 0
+        while received < length:
+            block = self.rfile.read(min(1024 * 1024, length - received))
+            if not block:
+                break
+            received += len(block)
+        name = f"files/{uuid.uuid4().hex[:12]}"
+        info = {
+            "name": name,
+            "uri": f"http://{self.headers['Host']}/v1beta/{name}",
+            "mimeType": self.sessions.pop(session, "video/mp4"),
+            "sizeBytes": str(received),
+            "state": "PROCESSING",
+        }
+        with self.lock:
+            self.files[name] = info
+        self._json(200, {"file": info})
+
+    def do_GET(self):
+        name = self.path.split("/v1beta/", 1)[-1]
+        with self.lock:
+            info = self.files.get(name)
+            if info is None:
+                self._json(404, {"error": "not found"})
+                return
+            response = dict(info)
+            info["state"] = "ACTIVE"
+        self._json(200, response)
+
+    def do_DELETE(self):
+        name = self.path.split("/v1beta/", 1)[-1]
+        with self.lock:
+            found = self.files.pop(name, None) is not None
+        self._json(200 if found else 404, {})
+
+
+def measure(label: str, func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<20}{elapsed:>10.3f}초{peak/1024/1024:>12.2f}MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="File API 업로드 벤치마크 (로컬 대역 서버)")
+    parser.add_argument("video", nargs="?", help="영상 경로 (없으면 --size-mb 크기의 임의 파일)")
+    parser.add_argument("--size-mb", type=float, default=50)
+    args = parser.parse_args()
+
+    path = args.video
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=".mp4")
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(int(args.size_mb)):
+                f.write(os.urandom(1024 * 1024))
+    size = os.path.getsize(path)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInFileApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    store = GeminiFileStore(api_key="local", base_url=f"http://127.0.0.1:{server.server_port}", ttl_seconds=3600)
+    store.poll_interval = 0.05
+
+    print(f"영상 {size/1024/1024:.1f}MB, 대역 서버 {store.base_url}")
+    print("=" * 42)
+    print(f"{'방식':<20}{'시간':>11}{'최대 할당':>12}")
+    print("=" * 42)
+    measure("인라인(base64)", lambda: {"data": base64.b64encode(Path(path).read_bytes()).decode("utf-8")})
+    first = measure("참조(첫 업로드)", lambda: store.ensure_uploaded(path, "video/mp4"))
+    second = measure("참조(재사용)", lambda: store.ensure_uploaded(path, "video/mp4"))
+    print("-" * 42)
+    print(f"재사용 핸들 동일: {first.name == second.name}, 파트: {first.to_part()}")
+
+    first.expires_at = time.time() - 1
+    print(f"만료 정리: {store.cleanup_expired()}개 삭제, 서버에 남은 파일 {len(StandInFileApi.files)}개")
+    print(json.dumps({k: v for k, v in store.get_stats().items() if k != "handles"}, ensure_ascii=False))
+
+    server.shutdown()
+    if args.video is None:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
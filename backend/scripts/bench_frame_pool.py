@@ -0,0 +1,99 @@
+"""프레임 버퍼 풀 마이크로 벤치마크
+
+스트림 생성기의 프레임 1개 처리(리사이즈 → 파이프 쓰기 → 탐지기 전달)를
+기존 방식(새 배열 할당 + tobytes() + copy())과 풀 방식(미리 할당된 버퍼 + memoryview + 참조)으로 비교한다.
+
+실행: python scripts/bench_frame_pool.py [--frames 300]
+"""
+
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.live_monitoring.clip_cache import fit_frame
+from app.services.live_monitoring.frame_pool import FrameBufferPool, write_frame
+
+
+WIDTH, HEIGHT = 640, 480
+# 원본 해상도: 크롭(와이드), 패딩(세로형), 동일 해상도
+SOURCE_SHAPES = [(720, 1280, 3), (1080, 1440, 3), (480, 640, 3)]
+
+
+class NullPipe(io.RawIOBase):
+    """FFmpeg stdin 대용 (받은 바이트 수만 셈)"""
+
+    def __init__(self):
+        self.total = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        count = len(data)
+        self.total += count
+        return count
+
+
+def legacy_step(source, pipe):
+    frame = fit_frame(source, WIDTH, HEIGHT)
+    pipe.write(frame.tobytes())
+    return frame.copy()  # 탐지기 last_analyzed_frame / Gemini용 복사
+
+
+def pooled_step(source, pipe, pool):
+    frame = pool.fit_into(source, pool.acquire())
+    write_frame(pipe, frame)
+    return frame  # 참조만 전달
+
+
+def measure(step, sources, frames):
+    # 워밍업 (중간 버퍼 등 최초 1회 할당은 측정에서 제외)
+    for source in sources:
+        step(source)
+
+    tracemalloc.start()
+    allocated = 0
+    started = time.perf_counter()
+    for i in range(frames):
+        # 프레임 1개 처리 중 최대 추가 할당량 (바로 해제되는 임시 배열 포함)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        step(sources[i % len(sources)])
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += max(0, peak - current)
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    return allocated / frames, elapsed / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="프레임 버퍼 풀 벤치마크")
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    sources = [rng.integers(0, 255, shape, dtype=np.uint8) for shape in SOURCE_SHAPES]
+    pipe = NullPipe()
+    pool = FrameBufferPool(WIDTH, HEIGHT, size=4)
+
+    legacy_bytes, legacy_ms = measure(lambda s: legacy_step(s, pipe), sources, args.frames)
+    pooled_bytes, pooled_ms = measure(lambda s: pooled_step(s, pipe, pool), sources, args.frames)
+
+    print("=" * 60)
+    print(f"프레임 버퍼 풀 벤치마크 ({args.frames}프레임, 출력 {WIDTH}x{HEIGHT})")
+    print("=" * 60)
+    print(f"{'방식':<10}{'프레임당 할당(KB)':>20}{'프레임당 시간(ms)':>20}")
+    print(f"{'기존':<10}{legacy_bytes / 1024:>20.1f}{legacy_ms:>20.3f}")
+    print(f"{'풀':<10}{pooled_bytes / 1024:>20.1f}{pooled_ms:>20.3f}")
+    print(f"\n풀 상태: {pool.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
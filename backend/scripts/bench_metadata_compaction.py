@@ -0,0 +1,194 @@
+"""메타데이터 압축 벤치마크
+
+기록된 VLM 메타데이터(분석 캐시의 metadata/*.json 등)에 대해
+기존 방식(앞에서부터 400/150개 자르기)과 압축 방식(구간 병합 + 시간 구간 샘플링 + 토큰 예산)을 비교한다.
+
+지표
+- 추정 토큰 수, 관찰 수
+- 시간대 커버리지: 원본에 관찰이 있던 1분 구간 중 결과에 남은 비율
+- 행동 분포 차이: 원본 대비 (category, action) 분포의 total variation distance (0이면 동일)
+- 주의 이상 안전 관찰 보존율
+- --stage-runs N: 실제 Gemini 2단계(발달 단계 판단)를 N회씩 호출해 판단 단계의 일관성 비교 (GEMINI_API_KEY 필요)
+
+실행: python scripts/bench_metadata_compaction.py [메타데이터.json 또는 폴더 ...] [--synthetic-minutes 60] [--stage-runs 0]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.metadata_compaction import (
+    KEEP_ALL_ABOVE,
+    bucket_coverage,
+    compact_metadata,
+    estimate_tokens,
+    format_timestamp,
+    parse_timestamp,
+    severity_level,
+)
+
+
+MAX_TIMELINE_OBS = 400
+MAX_SAFETY_OBS = 150
+DEFAULT_METADATA_DIR = Path("temp_videos/analysis_cache/metadata")
+
+ACTIONS = [
+    ("대근육", "배밀이"), ("대근육", "네발 기기"), ("대근육", "잡고 서기"),
+    ("소근육", "물건 잡기"), ("소근육", "손 옮기기"), ("인지", "물건 탐색"),
+    ("언어", "옹알이"), ("사회정서", "보호자 보고 웃기"),
+]
+RISKS = ["추락", "충돌", "질식/삼킴", "끼임", "넘어짐"]
+
+
+def truncate(metadata: dict) -> dict:
+    """기존 방식: 앞에서부터 자르기"""
+    result = dict(metadata)
+    result["timeline_observations"] = list(metadata.get("timeline_observations") or [])[:MAX_TIMELINE_OBS]
+    result["safety_observations"] = list(metadata.get("safety_observations") or [])[:MAX_SAFETY_OBS]
+    return result
+
+
+def synthetic_metadata(minutes: int, seed: int = 0) -> dict:
+    """긴 영상 메타데이터 생성 (같은 행동이 몇 번씩 이어지는 패턴)"""
+    rng = random.Random(seed)
+    timeline, safety = [], []
+    t = 0
+    while t < minutes * 60:
+        category, action = rng.choice(ACTIONS)
+        for _ in range(rng.randint(1, 4)):
+            timeline.append({
+                "timestamp": format_timestamp(t),
+                "category": category,
+                "action": action,
+                "detail": f"{action} 동작을 {rng.randint(2, 20)}초간 안정적으로 반복하며 주변 물건에 관심을 보임",
+                "duration_seconds": rng.randint(2, 20),
+                "skill_level": rng.choice(["초기", "중간"]),
+                "success": rng.random() > 0.3,
+                "importance": rng.randint(1, 10),
+            })
+            t += rng.randint(3, 12)
+        if rng.random() < 0.15:
+            safety.append({
+                "timestamp": format_timestamp(t),
+                "risk_type": rng.choice(RISKS),
+                "severity": rng.choices(["권장", "주의", "위험", "사고발생"], [70, 20, 8, 2])[0],
+                "description": "소파 모서리 근처에서 몸을 일으키다 균형을 잃을 뻔함",
+                "trigger_behavior": "잡고 서기",
+                "environment_factor": "보호대 없는 모서리",
+                "has_safety_device": False,
+                "adult_intervention": rng.random() > 0.5,
+            })
+    return {
+        "video_metadata": {"total_duration_seconds": minutes * 60},
+        "timeline_observations": timeline,
+        "safety_observations": safety,
+    }
+
+
+def action_distribution(observations) -> Counter:
+    counter = Counter()
+    for obs in observations:
+        counter[(obs.get("category"), obs.get("action"))] += obs.get("run_count", 1)
+    return counter
+
+
+def total_variation(a: Counter, b: Counter) -> float:
+    total_a, total_b = sum(a.values()) or 1, sum(b.values()) or 1
+    keys = set(a) | set(b)
+    return 0.5 * sum(abs(a[k] / total_a - b[k] / total_b) for k in keys)
+
+
+def evaluate(original: dict, result: dict) -> dict:
+    timeline = original.get("timeline_observations") or []
+    kept = result.get("timeline_observations") or []
+    critical = [obs for obs in original.get("safety_observations") or [] if severity_level(obs) > KEEP_ALL_ABOVE]
+    kept_critical = [obs for obs in result.get("safety_observations") or [] if severity_level(obs) > KEEP_ALL_ABOVE]
+    last = max((parse_timestamp(obs.get("end_timestamp") or obs.get("timestamp")) or 0 for obs in kept), default=0)
+    return {
+        "tokens": estimate_tokens(result),
+        "timeline": len(kept),
+        "coverage": bucket_coverage(timeline, kept, 60.0),
+        "last": format_timestamp(last),
+        "tv": total_variation(action_distribution(timeline), action_distribution(kept)),
+        "critical": f"{len(kept_critical)}/{len(critical)}",
+    }
+
+
+async def stage_stability(metadata_variants: dict, runs: int, age_months) -> dict:
+    """실제 2단계 판단을 반복 호출해 최빈 단계 비율(일관성) 계산"""
+    from app.services.gemini_client import PRIORITY_UPLOAD
+    from app.services.gemini_service import get_gemini_service
+
+    service = get_gemini_service()
+    initial = service._determine_stage_from_age_months(age_months) if age_months is not None else None
+    stability = {}
+    for name, metadata in metadata_variants.items():
+        stages = []
+        for _ in range(runs):
+            result = await service._determine_stage(metadata, age_months, initial, PRIORITY_UPLOAD)
+            stages.append(str(result.get("detected_stage")))
+        mode, count = Counter(stages).most_common(1)[0]
+        stability[name] = {"stages": stages, "mode": mode, "agreement": count / runs}
+    return stability
+
+
+def load_inputs(paths) -> list:
+    files = []
+    for raw in paths:
+        path = Path(raw)
+        files.extend(sorted(path.glob("*.json")) if path.is_dir() else [path])
+    inputs = []
+    for path in files:
+        try:
+            inputs.append((path.name[:24], json.loads(path.read_text(encoding="utf-8"))))
+        except (OSError, ValueError) as e:
+            print(f"건너뜀 {path}: {e}")
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="메타데이터 압축 벤치마크")
+    parser.add_argument("paths", nargs="*", help="메타데이터 JSON 파일 또는 폴더 (기본: 분석 캐시 metadata 폴더)")
+    parser.add_argument("--synthetic-minutes", type=int, default=60, help="기록된 메타데이터가 없을 때 생성할 영상 길이 (분)")
+    parser.add_argument("--stage-runs", type=int, default=0, help="2단계 판단 반복 횟수 (0이면 생략)")
+    parser.add_argument("--age-months", type=int, default=None)
+    args = parser.parse_args()
+
+    paths = args.paths or ([DEFAULT_METADATA_DIR] if DEFAULT_METADATA_DIR.exists() else [])
+    inputs = load_inputs(paths)
+    if not inputs:
+        print(f"기록된 메타데이터가 없어 {args.synthetic_minutes}분 분량 합성 메타데이터로 실행합니다.")
+        inputs = [(f"synthetic_{args.synthetic_minutes}m", synthetic_metadata(args.synthetic_minutes))]
+
+    print("=" * 96)
+    print(f"{'입력':<26}{'방식':<8}{'토큰':>8}{'타임라인':>10}{'커버리지':>10}{'마지막 관찰':>12}{'분포차(TV)':>12}{'주의 이상':>10}")
+    print("=" * 96)
+    for name, metadata in inputs:
+        duration = (metadata.get("video_metadata") or {}).get("total_duration_seconds")
+        variants = {
+            "원본": metadata,
+            "자르기": truncate(metadata),
+            "압축": compact_metadata(metadata, duration, MAX_TIMELINE_OBS, MAX_SAFETY_OBS)[0],
+        }
+        for label, result in variants.items():
+            row = evaluate(metadata, result)
+            print(
+                f"{name:<26}{label:<8}{row['tokens']:>8}{row['timeline']:>10}{row['coverage']:>10.0%}"
+                f"{row['last']:>12}{row['tv']:>12.3f}{row['critical']:>10}"
+            )
+
+        if args.stage_runs > 0:
+            stability = asyncio.run(stage_stability(variants, args.stage_runs, args.age_months))
+            for label, item in stability.items():
+                print(f"  2단계 판단 [{label}] {item['stages']} → 최빈 {item['mode']}단계, 일치율 {item['agreement']:.0%}")
+        print("-" * 96)
+
+
+if __name__ == "__main__":
+    main()